@@ -2,26 +2,102 @@
 Analysis helpers for Spotify GDPR exports.
 """
 
+from spotify_gdpr_analysis.analysis.engine import (
+    ReportAggregator,
+    ReportAnalyses,
+    run_analyses,
+)
+from spotify_gdpr_analysis.analysis.parallel import parallel_run_analyses
+from spotify_gdpr_analysis.analysis.sessions import (
+    ListeningSessions,
+    ListeningSessionsState,
+    listening_sessions,
+)
 from spotify_gdpr_analysis.analysis.temporal import (
+    HourlyAverageState,
+    HourlyPlaytimeState,
+    MonthlyAverageState,
+    MonthlyNewArtistsState,
+    MonthlyPlaytimeState,
+    MonthlyUniqueArtistsSketchState,
+    MonthlyUniqueArtistsState,
+    WeekdayAverageState,
+    WeekdayPlaytimeState,
+    hourly_average_minutes,
     hourly_average_streams,
+    iter_monthly_new_artists,
+    monthly_average_minutes,
     monthly_average_streams,
     monthly_new_artists,
     monthly_unique_artists,
+    weekday_average_minutes,
     weekday_average_streams,
 )
+from spotify_gdpr_analysis.analysis.timestamps import DEFAULT_TIMEZONE
 from spotify_gdpr_analysis.analysis.top import (
-    top_albums, 
-    top_artists, 
-    top_songs
+    ApproximateTopAlbumsState,
+    ApproximateTopArtistsState,
+    ApproximateTopSongsState,
+    TopAlbumsPlaytimeState,
+    TopAlbumsState,
+    TopArtistsPlaytimeState,
+    TopArtistsState,
+    TopSongsPlaytimeState,
+    TopSongsState,
+    approximate_top_albums,
+    approximate_top_artists,
+    approximate_top_songs,
+    top_albums,
+    top_albums_by_playtime,
+    top_artists,
+    top_artists_by_playtime,
+    top_songs,
+    top_songs_by_playtime,
 )
 
 __all__ = [
+    "DEFAULT_TIMEZONE",
+    "ApproximateTopAlbumsState",
+    "ApproximateTopArtistsState",
+    "ApproximateTopSongsState",
+    "HourlyAverageState",
+    "HourlyPlaytimeState",
+    "ListeningSessions",
+    "ListeningSessionsState",
+    "MonthlyAverageState",
+    "MonthlyNewArtistsState",
+    "MonthlyPlaytimeState",
+    "MonthlyUniqueArtistsSketchState",
+    "MonthlyUniqueArtistsState",
+    "TopAlbumsPlaytimeState",
+    "TopAlbumsState",
+    "TopArtistsPlaytimeState",
+    "TopArtistsState",
+    "TopSongsPlaytimeState",
+    "TopSongsState",
+    "WeekdayAverageState",
+    "WeekdayPlaytimeState",
+    "ReportAggregator",
+    "ReportAnalyses",
+    "parallel_run_analyses",
+    "run_analyses",
+    "hourly_average_minutes",
     "hourly_average_streams",
+    "listening_sessions",
+    "iter_monthly_new_artists",
+    "monthly_average_minutes",
     "monthly_average_streams",
     "monthly_new_artists",
     "monthly_unique_artists",
+    "weekday_average_minutes",
     "weekday_average_streams",
+    "approximate_top_albums",
+    "approximate_top_artists",
+    "approximate_top_songs",
     "top_albums",
+    "top_albums_by_playtime",
     "top_artists",
+    "top_artists_by_playtime",
     "top_songs",
+    "top_songs_by_playtime",
 ]
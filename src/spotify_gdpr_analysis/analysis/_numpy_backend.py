@@ -0,0 +1,96 @@
+"""
+NumPy implementations of the temporal analyses.
+
+Each function takes the local time columns built by ``analysis.timestamps`` and
+returns exactly what the pure-Python implementation in ``analysis.temporal``
+returns for the same plays.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
+
+import numpy as np
+
+from spotify_gdpr_analysis.analysis.timestamps import LocalTimeColumns
+from spotify_gdpr_analysis.io.table import MISSING
+
+
+def weekday_average_streams(columns: LocalTimeColumns) -> list[float]:
+    weeks = _column(columns.iso_year).astype(np.int64) * 100 + _column(columns.iso_week)
+    totals = np.bincount(_column(columns.weekday), minlength=7)
+    return _averages(totals, np.unique(weeks).size)
+
+
+def monthly_average_streams(columns: LocalTimeColumns) -> list[float]:
+    totals = np.bincount(_column(columns.month), minlength=13)[1:]
+    return _averages(totals, np.unique(_column(columns.year)).size)
+
+
+def hourly_average_streams(columns: LocalTimeColumns) -> list[float]:
+    totals = np.bincount(_column(columns.hour), minlength=24)
+    return _averages(totals, np.unique(_column(columns.day_number)).size)
+
+
+def monthly_unique_artists(
+    columns: LocalTimeColumns, artists: Sequence
+) -> list[tuple[str, int]]:
+    month_keys, codes = _month_keys_and_artist_codes(columns, artists)
+    if codes.size == 0:
+        return []
+    artist_count = int(codes.max()) + 1
+    month_artist_pairs = np.unique(month_keys * artist_count + codes)
+    months, counts = np.unique(month_artist_pairs // artist_count, return_counts=True)
+    return _monthly_counts(months, counts)
+
+
+def monthly_new_artists(
+    columns: LocalTimeColumns, artists: Sequence
+) -> list[tuple[str, int]]:
+    month_keys, codes = _month_keys_and_artist_codes(columns, artists)
+    if codes.size == 0:
+        return []
+    unseen = np.iinfo(np.int64).max
+    first_seen = np.full(int(codes.max()) + 1, unseen, dtype=np.int64)
+    np.minimum.at(first_seen, codes, month_keys)
+    months, counts = np.unique(first_seen[first_seen != unseen], return_counts=True)
+    return _monthly_counts(months, counts)
+
+
+def _column(values: array) -> np.ndarray:
+    return np.frombuffer(values, dtype=values.typecode)
+
+
+def _averages(totals: np.ndarray, periods_count: int) -> list[float]:
+    return [int(total) / periods_count for total in totals]
+
+
+def _month_keys_and_artist_codes(
+    columns: LocalTimeColumns, artists: Sequence
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return ``year * 12 + month - 1`` and artist codes for plays with an artist.
+    """
+    month_keys = _column(columns.year).astype(np.int64) * 12 + _column(columns.month) - 1
+    if isinstance(artists, array):
+        codes = _column(artists).astype(np.int64)
+    else:
+        interned: dict[str, int] = {}
+        codes = np.fromiter(
+            (
+                MISSING if artist == MISSING else interned.setdefault(artist, len(interned))
+                for artist in artists
+            ),
+            dtype=np.int64,
+            count=len(artists),
+        )
+    present = codes != MISSING
+    return month_keys[present], codes[present]
+
+
+def _monthly_counts(months: np.ndarray, counts: np.ndarray) -> list[tuple[str, int]]:
+    return [
+        (f"{month_key // 12}-{month_key % 12 + 1:02d}", int(count))
+        for month_key, count in zip(months.tolist(), counts.tolist())
+    ]
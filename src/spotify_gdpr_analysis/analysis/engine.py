@@ -0,0 +1,400 @@
+"""
+Single-pass evaluation of every report analysis.
+
+Each record is visited exactly once and feeds all aggregates together, so the
+input can be a lazy iterator such as ``streaming_history`` without first being
+materialized into a list. Aggregates of separate chunks can be merged, which
+lets export files be processed independently.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import tzinfo
+from typing import Iterator
+from zoneinfo import ZoneInfo
+
+from spotify_gdpr_analysis.analysis import sql
+from spotify_gdpr_analysis.analysis.sessions import (
+    SESSION_FIELDS,
+    ListeningSessions,
+    listening_sessions,
+)
+from spotify_gdpr_analysis.analysis.sql import PlaySource
+from spotify_gdpr_analysis.analysis.temporal import (
+    HourlyAverageState,
+    HourlyPlaytimeState,
+    MonthlyAverageState,
+    MonthlyNewArtistsState,
+    MonthlyPlaytimeState,
+    MonthlyUniqueArtistsState,
+    WeekdayAverageState,
+    WeekdayPlaytimeState,
+    hourly_average_minutes,
+    hourly_average_streams,
+    monthly_average_minutes,
+    monthly_average_streams,
+    monthly_new_artists,
+    monthly_unique_artists,
+    weekday_average_minutes,
+    weekday_average_streams,
+)
+from spotify_gdpr_analysis.analysis.timestamps import (
+    DEFAULT_TIMEZONE,
+    local_time_columns,
+    local_time_converter,
+)
+from spotify_gdpr_analysis.analysis.top import (
+    _ALBUM_KEY,
+    _ARTIST_KEY,
+    _TRACK_KEY,
+    TopAlbumsPlaytimeState,
+    TopAlbumsState,
+    TopArtistsPlaytimeState,
+    TopArtistsState,
+    TopSongsPlaytimeState,
+    TopSongsState,
+    top_albums,
+    top_albums_by_playtime,
+    top_artists,
+    top_artists_by_playtime,
+    top_songs,
+    top_songs_by_playtime,
+)
+from spotify_gdpr_analysis.io.play_store import PlaySelection
+from spotify_gdpr_analysis.io.table import MISSING, StreamingHistory, parse_epoch_seconds
+from spotify_gdpr_analysis.profiling import Profiler, profile_stage
+
+
+_TS_KEY = "ts"
+_MS_PLAYED_KEY = "ms_played"
+
+ANALYSIS_FIELDS: dict[Callable, tuple[str, ...]] = {
+    top_songs: (_TRACK_KEY, _ARTIST_KEY),
+    top_albums: (_ALBUM_KEY, _ARTIST_KEY),
+    top_artists: (_ARTIST_KEY,),
+    weekday_average_streams: (_TS_KEY,),
+    monthly_average_streams: (_TS_KEY,),
+    hourly_average_streams: (_TS_KEY,),
+    monthly_unique_artists: (_TS_KEY, _ARTIST_KEY),
+    monthly_new_artists: (_TS_KEY, _ARTIST_KEY),
+    top_songs_by_playtime: (_TRACK_KEY, _ARTIST_KEY, _MS_PLAYED_KEY),
+    top_albums_by_playtime: (_ALBUM_KEY, _ARTIST_KEY, _MS_PLAYED_KEY),
+    top_artists_by_playtime: (_ARTIST_KEY, _MS_PLAYED_KEY),
+    weekday_average_minutes: (_TS_KEY, _MS_PLAYED_KEY),
+    monthly_average_minutes: (_TS_KEY, _MS_PLAYED_KEY),
+    hourly_average_minutes: (_TS_KEY, _MS_PLAYED_KEY),
+    listening_sessions: SESSION_FIELDS,
+}
+
+
+def analysis_fields(analyses: Iterable[Callable]) -> tuple[str, ...]:
+    """
+    Return the record fields read by ``analyses``, for projecting records that are kept.
+    """
+    fields: dict[str, None] = {}
+    for analysis in analyses:
+        if analysis not in ANALYSIS_FIELDS:
+            raise ValueError(f"No field projection is known for {analysis!r}")
+        fields.update(dict.fromkeys(ANALYSIS_FIELDS[analysis]))
+    return tuple(fields)
+
+
+@dataclass
+class ReportAnalyses:
+    """
+    Results of every analysis shown in the HTML report.
+
+    The ``*_minutes`` fields weight each play by its ``ms_played``, like the
+    play-count field of the same name. ``sessions`` needs plays in time order,
+    so it is computed in a separate pass (see ``analysis.sessions``) and is
+    ``None`` unless requested.
+    """
+
+    songs: list[tuple[str, str, int]]
+    albums: list[tuple[str, str, int]]
+    artists: list[tuple[str, int]]
+    weekday_averages: list[float]
+    monthly_averages: list[float]
+    hourly_averages: list[float]
+    monthly_unique_artists: list[tuple[str, int]]
+    monthly_new_artists: list[tuple[str, int]]
+    song_minutes: list[tuple[str, str, float]] = field(default_factory=list)
+    album_minutes: list[tuple[str, str, float]] = field(default_factory=list)
+    artist_minutes: list[tuple[str, float]] = field(default_factory=list)
+    weekday_minutes: list[float] = field(default_factory=list)
+    monthly_minutes: list[float] = field(default_factory=list)
+    hourly_minutes: list[float] = field(default_factory=list)
+    sessions: ListeningSessions | None = None
+
+
+class ReportAggregator:
+    """
+    Mergeable running state of every report analysis.
+
+    The aggregator holds one state object per analysis and fills all of them
+    in a single pass. Merging the aggregators of consecutive chunks, in order,
+    finalizes to the same results as aggregating the concatenated records.
+
+    Plays are bucketed by local time in ``timezone``, the report's time zone
+    unless given; only aggregators of the same time zone can be merged.
+    """
+
+    def __init__(self, timezone: tzinfo | None = None) -> None:
+        self.timezone = DEFAULT_TIMEZONE if timezone is None else timezone
+        self.songs = TopSongsState()
+        self.albums = TopAlbumsState()
+        self.artists = TopArtistsState()
+        self.weekday = WeekdayAverageState()
+        self.monthly = MonthlyAverageState()
+        self.hourly = HourlyAverageState()
+        self.unique_artists = MonthlyUniqueArtistsState()
+        self.new_artists = MonthlyNewArtistsState()
+        self.song_minutes = TopSongsPlaytimeState()
+        self.album_minutes = TopAlbumsPlaytimeState()
+        self.artist_minutes = TopArtistsPlaytimeState()
+        self.weekday_minutes = WeekdayPlaytimeState()
+        self.monthly_minutes = MonthlyPlaytimeState()
+        self.hourly_minutes = HourlyPlaytimeState()
+
+    def update(self, records: Iterable[dict] | StreamingHistory) -> None:
+        """
+        Fold ``records`` into every analysis state in a single pass.
+        """
+        converter = local_time_converter(self.timezone)
+        songs = self.songs.counts
+        albums = self.albums.counts
+        artists = self.artists.counts
+        weekly = self.weekday.periods
+        yearly = self.monthly.periods
+        daily = self.hourly.periods
+        monthly_artists = self.unique_artists.monthly_artists
+        first_seen = self.new_artists.first_seen
+        song_ms = self.song_minutes.counts
+        album_ms = self.album_minutes.counts
+        artist_ms = self.artist_minutes.counts
+        weekly_ms = self.weekday_minutes.periods
+        yearly_ms = self.monthly_minutes.periods
+        daily_ms = self.hourly_minutes.periods
+
+        for epoch, ms_played, track_name, artist_name, album_name in _plays(records):
+            day, hour = converter.local_day_and_hour(epoch)
+            week_key = (day.iso_year, day.iso_week)
+            weekly[week_key][day.weekday] += 1
+            yearly[day.year][day.month] += 1
+            daily[day.day_number][hour] += 1
+            weekly_ms[week_key][day.weekday] += ms_played
+            yearly_ms[day.year][day.month] += ms_played
+            daily_ms[day.day_number][hour] += ms_played
+
+            if not artist_name:
+                continue
+            artists[artist_name] += 1
+            artist_ms[artist_name] += ms_played
+            if track_name:
+                song_key = (track_name, artist_name)
+                songs[song_key] += 1
+                song_ms[song_key] += ms_played
+            if album_name:
+                album_key = (album_name, artist_name)
+                albums[album_key] += 1
+                album_ms[album_key] += ms_played
+
+            month_key = (day.year, day.month)
+            monthly_artists[month_key].add(artist_name)
+            if artist_name not in first_seen or month_key < first_seen[artist_name]:
+                first_seen[artist_name] = month_key
+
+    def merge(self, other: ReportAggregator) -> None:
+        """
+        Fold the aggregates of a later chunk into this one.
+        """
+        if other.timezone != self.timezone:
+            raise ValueError(
+                f"Cannot merge aggregates in {other.timezone} into aggregates in {self.timezone}"
+            )
+        for name in _STATE_NAMES:
+            getattr(self, name).merge(getattr(other, name))
+
+    def finalize(self, limit: int = 25) -> ReportAnalyses:
+        """
+        Return the report results for everything aggregated so far.
+        """
+        return ReportAnalyses(
+            songs=self.songs.finalize(limit),
+            albums=self.albums.finalize(limit),
+            artists=self.artists.finalize(limit),
+            weekday_averages=self.weekday.finalize(),
+            monthly_averages=self.monthly.finalize(),
+            hourly_averages=self.hourly.finalize(),
+            monthly_unique_artists=self.unique_artists.finalize(),
+            monthly_new_artists=self.new_artists.finalize(),
+            song_minutes=self.song_minutes.finalize(limit),
+            album_minutes=self.album_minutes.finalize(limit),
+            artist_minutes=self.artist_minutes.finalize(limit),
+            weekday_minutes=self.weekday_minutes.finalize(),
+            monthly_minutes=self.monthly_minutes.finalize(),
+            hourly_minutes=self.hourly_minutes.finalize(),
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of every analysis state.
+
+        The time zone is stored by its IANA key, so it must be a ``ZoneInfo``.
+        """
+        key = getattr(self.timezone, "key", None)
+        if key is None:
+            raise ValueError(
+                f"Cannot serialize aggregates in {self.timezone}, which has no IANA key"
+            )
+        return {
+            "timezone": key,
+            **{name: getattr(self, name).to_dict() for name in _STATE_NAMES},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> ReportAggregator:
+        """
+        Rebuild an aggregator from ``to_dict`` output.
+
+        Output without a time zone is read in the report's time zone.
+        """
+        timezone = data.get("timezone")
+        aggregator = cls(None if timezone is None else ZoneInfo(timezone))
+        for name in _STATE_NAMES:
+            state = getattr(aggregator, name)
+            setattr(aggregator, name, type(state).from_dict(data[name]))
+        return aggregator
+
+
+REPORT_FIELDS = analysis_fields(
+    [
+        top_songs,
+        top_albums,
+        top_artists,
+        weekday_average_streams,
+        monthly_average_streams,
+        hourly_average_streams,
+        monthly_unique_artists,
+        monthly_new_artists,
+        top_songs_by_playtime,
+        top_albums_by_playtime,
+        top_artists_by_playtime,
+        weekday_average_minutes,
+        monthly_average_minutes,
+        hourly_average_minutes,
+    ]
+)
+
+_STATE_NAMES = (
+    "songs",
+    "albums",
+    "artists",
+    "weekday",
+    "monthly",
+    "hourly",
+    "unique_artists",
+    "new_artists",
+    "song_minutes",
+    "album_minutes",
+    "artist_minutes",
+    "weekday_minutes",
+    "monthly_minutes",
+    "hourly_minutes",
+)
+
+
+def run_analyses(
+    records: Iterable[dict] | StreamingHistory | PlaySource,
+    limit: int = 25,
+    profiler: Profiler | None = None,
+) -> ReportAnalyses:
+    """
+    Compute every report analysis in a single pass over ``records``.
+
+    Results are identical to calling ``top_songs``, ``top_albums``,
+    ``top_artists``, their ``*_by_playtime`` variants and the functions in
+    ``analysis.temporal`` one by one. Play counts and milliseconds played are
+    accumulated together, as integers, in the same pass, which also covers a
+    ``StreamingHistory`` table.
+
+    With a ``profiler``, records are first decoded into a table and each
+    analysis runs separately over its columns, so that timestamp conversion
+    and every analysis can be measured as separate stages.
+    A ``PlayStore`` or ``PlaySelection`` runs each analysis as SQL aggregates.
+    """
+    selection = sql.as_selection(records)
+    if selection is not None:
+        return _run_each_analysis(selection, limit, profiler)
+    if profiler is not None:
+        if not isinstance(records, StreamingHistory):
+            with profiler.stage("decode") as stage:
+                records = StreamingHistory.from_records(records)
+                stage.records = len(records)
+        return _run_each_analysis(records, limit, profiler)
+
+    aggregator = ReportAggregator()
+    aggregator.update(records)
+    return aggregator.finalize(limit)
+
+
+def _run_each_analysis(
+    table: StreamingHistory | PlaySelection, limit: int, profiler: Profiler | None = None
+) -> ReportAnalyses:
+    records = len(table)
+
+    def run(function, *args):
+        with profile_stage(profiler, f"analysis {function.__name__}", records):
+            return function(table, *args)
+
+    if profiler is not None and isinstance(table, StreamingHistory):
+        with profiler.stage("local_time", records):
+            local_time_columns(table, DEFAULT_TIMEZONE)
+    return ReportAnalyses(
+        songs=run(top_songs, limit),
+        albums=run(top_albums, limit),
+        artists=run(top_artists, limit),
+        weekday_averages=run(weekday_average_streams),
+        monthly_averages=run(monthly_average_streams),
+        hourly_averages=run(hourly_average_streams),
+        monthly_unique_artists=run(monthly_unique_artists),
+        monthly_new_artists=run(monthly_new_artists),
+        song_minutes=run(top_songs_by_playtime, limit),
+        album_minutes=run(top_albums_by_playtime, limit),
+        artist_minutes=run(top_artists_by_playtime, limit),
+        weekday_minutes=run(weekday_average_minutes),
+        monthly_minutes=run(monthly_average_minutes),
+        hourly_minutes=run(hourly_average_minutes),
+    )
+
+
+def _plays(
+    records: Iterable[dict] | StreamingHistory,
+) -> Iterator[tuple[int, int, str | None, str | None, str | None]]:
+    """
+    Yield ``(epoch, ms_played, track, artist, album)`` per play from dicts or a table.
+    """
+    if isinstance(records, StreamingHistory):
+        columns = [records.encoded(key) for key in (_TRACK_KEY, _ARTIST_KEY, _ALBUM_KEY)]
+        (tracks, track_names), (artists, artist_names), (albums, album_names) = columns
+        plays = zip(records.ts, records.ms_played, tracks, artists, albums)
+        for epoch, ms_played, track, artist, album in plays:
+            yield (
+                epoch,
+                ms_played,
+                None if track == MISSING else track_names[track],
+                None if artist == MISSING else artist_names[artist],
+                None if album == MISSING else album_names[album],
+            )
+        return
+
+    for record in records:
+        yield (
+            parse_epoch_seconds(record.get("ts")),
+            record.get(_MS_PLAYED_KEY) or 0,
+            record.get(_TRACK_KEY),
+            record.get(_ARTIST_KEY),
+            record.get(_ALBUM_KEY),
+        )
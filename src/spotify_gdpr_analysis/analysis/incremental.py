@@ -0,0 +1,273 @@
+"""
+Incremental report updates backed by a persisted aggregate snapshot.
+
+The snapshot keeps one serialized ``ReportAggregator`` of every play folded in
+so far, plus a descriptor per export file: its path, size, mtime, content
+digest, play count and ``ts`` range. A later run skips files whose contents
+are already folded in and folds new files into the stored aggregate.
+
+A folded file cannot be taken back out of the aggregate, so a file that
+changed in place rebuilds it. Files that disappeared may have been replaced by
+a fresh export that re-splits the same plays: if the vanished files' plays are
+found again inside their ``ts`` range, only the later plays are folded in, and
+otherwise the aggregate is rebuilt.
+"""
+
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from pathlib import Path
+from typing import NamedTuple
+
+from spotify_gdpr_analysis.analysis.engine import ReportAggregator
+from spotify_gdpr_analysis.analysis.timestamps import DEFAULT_TIMEZONE
+from spotify_gdpr_analysis.io.archive import ArchiveMember
+from spotify_gdpr_analysis.io.cache import ExportCache, atomic_write, file_digest
+from spotify_gdpr_analysis.io.streaming_history import (
+    iter_streaming_history_json,
+    streaming_history_paths,
+)
+from spotify_gdpr_analysis.io.table import (
+    StreamingHistory,
+    format_epoch_seconds,
+    parse_epoch_seconds,
+)
+
+SNAPSHOT_SUFFIX = ".snapshot.json"
+
+_SNAPSHOT_VERSION = 3
+
+
+@dataclass
+class IncrementalUpdate:
+    """
+    Outcome of ``incremental_aggregate``.
+
+    ``dropped`` counts the folded files that changed or disappeared, and
+    ``rebuilt`` tells whether every file had to be aggregated again.
+    """
+
+    aggregator: ReportAggregator
+    reused: list[Path] = field(default_factory=list)
+    ingested: list[Path] = field(default_factory=list)
+    dropped: int = 0
+    rebuilt: bool = False
+
+
+class _FileFold(NamedTuple):
+    """
+    One export file's partial aggregate and the counts used to check an overlap.
+    """
+
+    aggregator: ReportAggregator
+    plays: int
+    min_ts: int | None
+    max_ts: int | None
+    covered: int
+    conflicting: int
+
+
+def snapshot_path_for(output_path: str | Path) -> Path:
+    """
+    Return the snapshot path stored next to a report at ``output_path``.
+    """
+    output = Path(output_path)
+    return output.with_name(output.name + SNAPSHOT_SUFFIX)
+
+
+def incremental_aggregate(
+    data_dir: str | Path,
+    snapshot_path: str | Path,
+    jobs: int | None = 1,
+    cache_dir: str | Path | None = None,
+) -> IncrementalUpdate:
+    """
+    Aggregate ``data_dir``, reading only files not already folded into the snapshot.
+
+    New files are folded in after the ones already in the snapshot. When folded
+    files are gone, the new files' plays up to the latest folded ``ts`` must
+    all fall in the vanished files' ``ts`` range and match their play count;
+    they are then taken as already folded. Otherwise, or when a folded file
+    changed in place, the aggregate is rebuilt. The snapshot at
+    ``snapshot_path`` is rewritten to describe exactly the files currently in
+    ``data_dir``.
+    """
+    snapshot_file = Path(snapshot_path)
+    snapshot = _read_snapshot(snapshot_file)
+    known_paths = {entry["path"]: entry for entry in snapshot["files"]}
+    unmatched: dict[str, list[dict]] = {}
+    for entry in snapshot["files"]:
+        unmatched.setdefault(entry["digest"], []).append(entry)
+
+    update = IncrementalUpdate(ReportAggregator())
+    paths = streaming_history_paths(data_dir)
+    digests = [_digest(path, known_paths.get(str(path.resolve()))) for path in paths]
+    folded_entries: dict[int, dict] = {}
+    new_rows = []
+    for row, digest in enumerate(digests):
+        matches = unmatched.get(digest)
+        if matches:
+            folded_entries[row] = matches.pop()
+        else:
+            new_rows.append(row)
+    vanished = [entry for entries in unmatched.values() for entry in entries]
+    update.dropped = len(vanished)
+
+    current = {str(path.resolve()) for path in paths}
+    if any(entry["path"] in current for entry in vanished):
+        rebuild = True
+    else:
+        overlap = _overlap(vanished, snapshot["files"])
+        folds = _fold_files([paths[row] for row in new_rows], jobs, cache_dir, overlap)
+        rebuild = overlap is not None and (
+            any(fold.conflicting for fold in folds)
+            or sum(fold.covered for fold in folds) != sum(entry["plays"] for entry in vanished)
+        )
+    if rebuild:
+        folded_entries = {}
+        new_rows = list(range(len(paths)))
+        folds = _fold_files(paths, jobs, cache_dir, None)
+        update.rebuilt = True
+    elif snapshot["aggregate"] is not None:
+        update.aggregator = ReportAggregator.from_dict(snapshot["aggregate"])
+
+    new_folds = dict(zip(new_rows, folds))
+    files = []
+    for row, (path, digest) in enumerate(zip(paths, digests)):
+        if row in folded_entries:
+            entry = folded_entries[row]
+            files.append(_describe(path, digest, entry["plays"], entry["min_ts"], entry["max_ts"]))
+            update.reused.append(path)
+            continue
+        fold = new_folds[row]
+        update.aggregator.merge(fold.aggregator)
+        files.append(
+            _describe(
+                path,
+                digest,
+                fold.plays,
+                None if fold.min_ts is None else format_epoch_seconds(fold.min_ts),
+                None if fold.max_ts is None else format_epoch_seconds(fold.max_ts),
+            )
+        )
+        update.ingested.append(path)
+
+    _write_snapshot(snapshot_file, {"aggregate": update.aggregator.to_dict(), "files": files})
+    return update
+
+
+def _digest(path: Path | ArchiveMember, known: dict | None) -> str:
+    """
+    Return the content digest of ``path``, trusting the snapshot while size and mtime match.
+    """
+    stat = path.stat()
+    if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+        return known["digest"]
+    return file_digest(path)
+
+
+def _overlap(vanished: list[dict], folded: list[dict]) -> tuple[int, int, int] | None:
+    """
+    Return the vanished files' ``ts`` range and the latest folded ``ts``, in epoch seconds.
+
+    Returns ``None`` when no vanished file held any plays.
+    """
+    ranges = [(entry["min_ts"], entry["max_ts"]) for entry in vanished if entry["plays"]]
+    if not ranges:
+        return None
+    latest = max(entry["max_ts"] for entry in folded if entry["plays"])
+    return (
+        parse_epoch_seconds(min(start for start, _ in ranges)),
+        parse_epoch_seconds(max(end for _, end in ranges)),
+        parse_epoch_seconds(latest),
+    )
+
+
+def _fold_files(
+    paths: list[Path | ArchiveMember],
+    jobs: int | None,
+    cache_dir: str | Path | None,
+    overlap: tuple[int, int, int] | None,
+) -> list[_FileFold]:
+    if jobs == 1 or len(paths) <= 1:
+        return [_fold_export_file(path, cache_dir, overlap) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_fold_export_file, paths, repeat(cache_dir), repeat(overlap)))
+
+
+def _fold_export_file(
+    path: Path | ArchiveMember,
+    cache_dir: str | Path | None,
+    overlap: tuple[int, int, int] | None,
+) -> _FileFold:
+    """
+    Aggregate one export file, or with ``overlap`` only its plays after the latest folded one.
+
+    With ``overlap``, earlier plays are counted as ``covered`` when they fall in
+    the vanished files' range and as ``conflicting`` otherwise.
+    """
+    if cache_dir is None:
+        table = StreamingHistory.from_records(iter_streaming_history_json(path))
+    else:
+        table = ExportCache(cache_dir).load(path)
+    ts = table.ts
+    aggregator = ReportAggregator()
+    covered = conflicting = 0
+    if overlap is None:
+        aggregator.update(table)
+    else:
+        start, end, latest = overlap
+        later = []
+        for row, epoch in enumerate(ts):
+            if epoch > latest:
+                later.append(row)
+            elif start <= epoch <= end:
+                covered += 1
+            else:
+                conflicting += 1
+        aggregator.update(table.take(later))
+    return _FileFold(
+        aggregator, len(ts), min(ts, default=None), max(ts, default=None), covered, conflicting
+    )
+
+
+def _describe(
+    path: Path | ArchiveMember, digest: str, plays: int, min_ts: str | None, max_ts: str | None
+) -> dict:
+    """
+    Return the snapshot descriptor of one folded file.
+    """
+    stat = path.stat()
+    return {
+        "path": str(path.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "digest": digest,
+        "plays": plays,
+        "min_ts": min_ts,
+        "max_ts": max_ts,
+    }
+
+
+def _read_snapshot(path: Path) -> dict:
+    empty = {"aggregate": None, "files": []}
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            snapshot = json.load(handle)
+    except (OSError, ValueError):
+        return empty
+    if (
+        not isinstance(snapshot, dict)
+        or snapshot.get("version") != _SNAPSHOT_VERSION
+        or snapshot.get("timezone") != str(DEFAULT_TIMEZONE)
+    ):
+        return empty
+    return snapshot
+
+
+def _write_snapshot(path: Path, snapshot: dict) -> None:
+    payload = {"version": _SNAPSHOT_VERSION, "timezone": str(DEFAULT_TIMEZONE), **snapshot}
+    atomic_write(path, json.dumps(payload).encode("utf-8"))
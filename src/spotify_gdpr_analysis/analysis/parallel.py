@@ -0,0 +1,84 @@
+"""
+Process-pool ingestion and aggregation across export files.
+
+Each worker parses one export file and returns its partial
+``ReportAggregator``. The main process merges the partials in file order, which
+gives exactly the results of a serial run.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Iterator
+
+from spotify_gdpr_analysis.analysis.engine import ReportAggregator, ReportAnalyses
+from spotify_gdpr_analysis.io.cache import ExportCache
+from spotify_gdpr_analysis.io.streaming_history import (
+    iter_streaming_history_json,
+    streaming_history_paths,
+)
+
+
+def parallel_run_analyses(
+    data_dir: str | Path,
+    jobs: int | None = None,
+    limit: int = 25,
+    cache_dir: str | Path | None = None,
+) -> ReportAnalyses:
+    """
+    Compute every report analysis with one worker process per export file.
+
+    ``jobs`` caps the number of workers and defaults to the CPU count. When
+    ``cache_dir`` is given, workers load files through an ``ExportCache``,
+    whose lock file serializes their index updates.
+    """
+    aggregator = parallel_aggregate(streaming_history_paths(data_dir), jobs, cache_dir)
+    return aggregator.finalize(limit)
+
+
+def parallel_aggregate(
+    paths: Sequence[str | Path],
+    jobs: int | None = None,
+    cache_dir: str | Path | None = None,
+) -> ReportAggregator:
+    """
+    Aggregate ``paths`` in a process pool and merge the partials in order.
+    """
+    aggregator = ReportAggregator()
+    for partial in aggregate_export_files(paths, jobs, cache_dir):
+        aggregator.merge(partial)
+    return aggregator
+
+
+def aggregate_export_files(
+    paths: Sequence[str | Path],
+    jobs: int | None = None,
+    cache_dir: str | Path | None = None,
+) -> Iterator[ReportAggregator]:
+    """
+    Yield one partial aggregator per path, in order.
+
+    ``jobs=1`` aggregates in this process; otherwise a process pool is used.
+    """
+    if not paths:
+        return
+    if jobs == 1:
+        for path in paths:
+            yield _aggregate_export_file(path, cache_dir)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(_aggregate_export_file, paths, repeat(cache_dir))
+
+
+def _aggregate_export_file(
+    path: str | Path, cache_dir: str | Path | None
+) -> ReportAggregator:
+    aggregator = ReportAggregator()
+    if cache_dir is None:
+        aggregator.update(iter_streaming_history_json(path))
+    else:
+        aggregator.update(ExportCache(cache_dir).load(path))
+    return aggregator
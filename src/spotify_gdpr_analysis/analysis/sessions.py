@@ -0,0 +1,175 @@
+"""
+Listening sessions: runs of plays separated by gaps of silence.
+
+A play's ``ts`` is when it stopped and ``ms_played`` how long it ran, so each
+play covers ``[ts - ms_played, ts]``. A play that starts more than the session
+gap after the previous play ended opens a new session. Sessions are built in
+one forward pass over time-ordered records (see
+``io.ordered_streaming_history``); only the open session is held, and every
+closed session is folded into fixed-size distributions.
+"""
+
+from __future__ import annotations
+
+import copy
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from spotify_gdpr_analysis.analysis.timestamps import DEFAULT_TIMEZONE, local_time_converter
+from spotify_gdpr_analysis.io.table import parse_epoch_seconds
+
+DEFAULT_SESSION_GAP_MINUTES = 30
+
+# Upper bounds (exclusive) of the session length buckets, in minutes.
+SESSION_LENGTH_BOUNDS = (15, 30, 60, 120, 240)
+SESSION_LENGTH_LABELS = ("<15 min", "15–30 min", "30–60 min", "1–2 h", "2–4 h", "4 h+")
+# Upper bounds (inclusive) of the plays-per-session buckets.
+SESSION_PLAYS_BOUNDS = (1, 5, 10, 25)
+SESSION_PLAYS_LABELS = ("1", "2–5", "6–10", "11–25", "26+")
+
+SESSION_FIELDS = ("ts", "ms_played", "skipped")
+
+
+@dataclass
+class ListeningSessions:
+    """
+    Distributions of listening sessions.
+
+    ``lengths`` and ``plays_per_session`` pair bucket labels with session
+    counts; ``by_hour`` (0 .. 23) and ``by_weekday`` (Mon=0 .. Sun=6) count
+    sessions by their local start; ``skip_density_by_length`` is the share of
+    skipped plays in sessions of each length bucket.
+    """
+
+    sessions: int
+    plays: int
+    skipped_plays: int
+    listening_seconds: int
+    lengths: list[tuple[str, int]]
+    plays_per_session: list[tuple[str, int]]
+    by_hour: list[int]
+    by_weekday: list[int]
+    skip_density_by_length: list[tuple[str, float]]
+
+    @property
+    def skip_density(self) -> float:
+        return self.skipped_plays / self.plays if self.plays else 0.0
+
+    @property
+    def mean_minutes(self) -> float:
+        return self.listening_seconds / 60 / self.sessions if self.sessions else 0.0
+
+    @property
+    def mean_plays(self) -> float:
+        return self.plays / self.sessions if self.sessions else 0.0
+
+
+class ListeningSessionsState:
+    """
+    Running sessionization of time-ordered plays.
+
+    Successive ``update`` calls continue the same stream, so records may be
+    fed in chunks as long as the chunks are in time order.
+    """
+
+    def __init__(self, gap_minutes: float = DEFAULT_SESSION_GAP_MINUTES) -> None:
+        if gap_minutes <= 0:
+            raise ValueError(f"Session gap must be positive, got {gap_minutes}")
+        self.gap_seconds = gap_minutes * 60
+        self.sessions = 0
+        self.plays = 0
+        self.skipped_plays = 0
+        self.listening_seconds = 0
+        self.length_counts = [0] * len(SESSION_LENGTH_LABELS)
+        self.length_plays = [0] * len(SESSION_LENGTH_LABELS)
+        self.length_skips = [0] * len(SESSION_LENGTH_LABELS)
+        self.plays_counts = [0] * len(SESSION_PLAYS_LABELS)
+        self.by_hour = [0] * 24
+        self.by_weekday = [0] * 7
+        # The open session: [start, end, plays, skips], or None.
+        self.current: list[int] | None = None
+        self._last_ts: int | None = None
+
+    def update(self, records: Iterable[dict]) -> None:
+        """
+        Extend the sessions with ``records``, which must continue in ``ts`` order.
+        """
+        gap_seconds = self.gap_seconds
+        current = self.current
+        last_ts = self._last_ts
+        for record in records:
+            end = parse_epoch_seconds(record.get("ts"))
+            if last_ts is not None and end < last_ts:
+                raise ValueError(
+                    f"Records are not in time order: {record.get('ts')} follows a later play"
+                )
+            last_ts = end
+            start = end - (record.get("ms_played") or 0) // 1000
+            skipped = 1 if record.get("skipped") else 0
+            if current is None or start - current[1] > gap_seconds:
+                if current is not None:
+                    self._close(current)
+                current = [start, end, 1, skipped]
+            else:
+                current[0] = min(current[0], start)
+                current[1] = end
+                current[2] += 1
+                current[3] += skipped
+        self.current = current
+        self._last_ts = last_ts
+
+    def finalize(self) -> ListeningSessions:
+        """
+        Return the distributions, counting the open session as finished.
+        """
+        closed = copy.deepcopy(self)
+        if closed.current is not None:
+            closed._close(closed.current)
+        return ListeningSessions(
+            sessions=closed.sessions,
+            plays=closed.plays,
+            skipped_plays=closed.skipped_plays,
+            listening_seconds=closed.listening_seconds,
+            lengths=list(zip(SESSION_LENGTH_LABELS, closed.length_counts)),
+            plays_per_session=list(zip(SESSION_PLAYS_LABELS, closed.plays_counts)),
+            by_hour=closed.by_hour,
+            by_weekday=closed.by_weekday,
+            skip_density_by_length=[
+                (label, skips / plays if plays else 0.0)
+                for label, skips, plays in zip(
+                    SESSION_LENGTH_LABELS, closed.length_skips, closed.length_plays
+                )
+            ],
+        )
+
+    def _close(self, session: list[int]) -> None:
+        start, end, plays, skips = session
+        seconds = end - start
+        length_bucket = bisect_right(SESSION_LENGTH_BOUNDS, seconds / 60)
+        day, hour = local_time_converter(DEFAULT_TIMEZONE).local_day_and_hour(start)
+        self.sessions += 1
+        self.plays += plays
+        self.skipped_plays += skips
+        self.listening_seconds += seconds
+        self.length_counts[length_bucket] += 1
+        self.length_plays[length_bucket] += plays
+        self.length_skips[length_bucket] += skips
+        self.plays_counts[bisect_left(SESSION_PLAYS_BOUNDS, plays)] += 1
+        self.by_hour[hour] += 1
+        self.by_weekday[day.weekday] += 1
+
+
+def listening_sessions(
+    records: Iterable[dict], gap_minutes: float = DEFAULT_SESSION_GAP_MINUTES
+) -> ListeningSessions:
+    """
+    Return listening session distributions for time-ordered ``records``.
+
+    Plays separated by more than ``gap_minutes`` of silence belong to
+    different sessions. Records must be in ``ts`` order, as yielded by
+    ``io.ordered_streaming_history``; otherwise ``ValueError`` is raised.
+    """
+    state = ListeningSessionsState(gap_minutes)
+    state.update(records)
+    return state.finalize()
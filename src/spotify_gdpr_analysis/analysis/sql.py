@@ -0,0 +1,256 @@
+"""
+The report analyses as SQL aggregates over an ``io.PlayStore``.
+
+Each function matches its counterpart in ``analysis.top`` or
+``analysis.temporal`` on the same plays: ties in the top lists break by
+first play in export order, like the in-memory counters' first-seen order.
+The public analysis functions dispatch here when given a store or selection.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Union
+
+from spotify_gdpr_analysis.io.play_store import PlaySelection, PlayStore
+from spotify_gdpr_analysis.io.table import MS_PER_MINUTE
+
+PlaySource = Union[PlayStore, PlaySelection]
+
+_PLAYS = "COUNT(*)"
+_PLAYTIME = "COALESCE(SUM(ms_played), 0)"
+
+
+def as_selection(records: object) -> PlaySelection | None:
+    """
+    Return ``records`` as a ``PlaySelection`` if it is a store or selection, else ``None``.
+    """
+    if isinstance(records, PlayStore):
+        return records.select()
+    if isinstance(records, PlaySelection):
+        return records
+    return None
+
+
+def top_songs(selection: PlaySelection, limit: int = 25) -> list[tuple[str, str, int]]:
+    """
+    Return the most-played songs as (track_name, artist_name, play_count).
+    """
+    return _top_rows(
+        selection,
+        "track_id",
+        "tracks.name, artists.name",
+        "JOIN tracks ON tracks.id = counts.key_id",
+        limit,
+    )
+
+
+def top_albums(selection: PlaySelection, limit: int = 25) -> list[tuple[str, str, int]]:
+    """
+    Return the most-played albums as (album_name, artist_name, play_count).
+    """
+    return _top_rows(
+        selection,
+        "album_id",
+        "albums.name, artists.name",
+        "JOIN albums ON albums.id = counts.key_id",
+        limit,
+    )
+
+
+def top_artists(selection: PlaySelection, limit: int = 25) -> list[tuple[str, int]]:
+    """
+    Return the most-played artists as (artist_name, play_count).
+    """
+    return _top_rows(selection, "artist_id", "artists.name", "", limit)
+
+
+def top_songs_by_playtime(selection: PlaySelection, limit: int = 25) -> list[tuple[str, str, float]]:
+    """
+    Return the songs listened to longest as (track_name, artist_name, minutes).
+    """
+    return _minutes(
+        _top_rows(
+            selection,
+            "track_id",
+            "tracks.name, artists.name",
+            "JOIN tracks ON tracks.id = counts.key_id",
+            limit,
+            _PLAYTIME,
+        )
+    )
+
+
+def top_albums_by_playtime(selection: PlaySelection, limit: int = 25) -> list[tuple[str, str, float]]:
+    """
+    Return the albums listened to longest as (album_name, artist_name, minutes).
+    """
+    return _minutes(
+        _top_rows(
+            selection,
+            "album_id",
+            "albums.name, artists.name",
+            "JOIN albums ON albums.id = counts.key_id",
+            limit,
+            _PLAYTIME,
+        )
+    )
+
+
+def top_artists_by_playtime(selection: PlaySelection, limit: int = 25) -> list[tuple[str, float]]:
+    """
+    Return the artists listened to longest as (artist_name, minutes).
+    """
+    return _minutes(_top_rows(selection, "artist_id", "artists.name", "", limit, _PLAYTIME))
+
+
+def weekday_average_streams(selection: PlaySelection) -> list[float]:
+    """
+    Return average listens per weekday across weeks (Mon=0 .. Sun=6).
+    """
+    return _slot_averages(selection, "weekday", "iso_year * 100 + iso_week", range(7))
+
+
+def monthly_average_streams(selection: PlaySelection) -> list[float]:
+    """
+    Return average listens per month across years (Jan=1 .. Dec=12).
+    """
+    return _slot_averages(selection, "month", "year", range(1, 13))
+
+
+def hourly_average_streams(selection: PlaySelection) -> list[float]:
+    """
+    Return average listens per hour across days (0 .. 23).
+    """
+    return _slot_averages(selection, "hour", "day_number", range(24))
+
+
+def weekday_average_minutes(selection: PlaySelection) -> list[float]:
+    """
+    Return average minutes listened per weekday across weeks (Mon=0 .. Sun=6).
+    """
+    return _minutes_per_slot(
+        _slot_averages(selection, "weekday", "iso_year * 100 + iso_week", range(7), _PLAYTIME)
+    )
+
+
+def monthly_average_minutes(selection: PlaySelection) -> list[float]:
+    """
+    Return average minutes listened per month across years (Jan=1 .. Dec=12).
+    """
+    return _minutes_per_slot(_slot_averages(selection, "month", "year", range(1, 13), _PLAYTIME))
+
+
+def hourly_average_minutes(selection: PlaySelection) -> list[float]:
+    """
+    Return average minutes listened per hour across days (0 .. 23).
+    """
+    return _minutes_per_slot(_slot_averages(selection, "hour", "day_number", range(24), _PLAYTIME))
+
+
+def monthly_unique_artists(selection: PlaySelection) -> list[tuple[str, int]]:
+    """
+    Return unique artist counts per month as (YYYY-MM, count).
+    """
+    return _monthly_counts(
+        _rows(
+            selection,
+            """
+            SELECT year, month, COUNT(DISTINCT artist_id)
+            FROM plays
+            WHERE {where} AND artist_id IS NOT NULL
+            GROUP BY year, month
+            ORDER BY year, month
+            """,
+        )
+    )
+
+
+def monthly_new_artists(selection: PlaySelection) -> list[tuple[str, int]]:
+    """
+    Return new artist counts per month as (YYYY-MM, count).
+    """
+    return _monthly_counts(
+        _rows(
+            selection,
+            """
+            SELECT first_month / 100, first_month % 100, COUNT(*)
+            FROM (
+                SELECT MIN(year * 100 + month) AS first_month
+                FROM plays
+                WHERE {where} AND artist_id IS NOT NULL
+                GROUP BY artist_id
+            )
+            GROUP BY first_month
+            ORDER BY first_month
+            """,
+        )
+    )
+
+
+def _slot_averages(
+    selection: PlaySelection,
+    slot: str,
+    period: str,
+    slots: Iterable[int],
+    total: str = _PLAYS,
+) -> list[float]:
+    condition, params = selection.where()
+    connection = selection.store.connection
+    periods_count = connection.execute(
+        f"SELECT COUNT(DISTINCT {period}) FROM plays WHERE {condition}", params
+    ).fetchone()[0]
+    totals = dict(
+        connection.execute(
+            f"SELECT {slot}, {total} FROM plays WHERE {condition} GROUP BY {slot}", params
+        )
+    )
+    if not periods_count:
+        return [0.0 for _ in slots]
+    return [totals.get(slot_value, 0) / periods_count for slot_value in slots]
+
+
+def _top_rows(
+    selection: PlaySelection, key: str, names: str, joins: str, limit: int, total: str = _PLAYS
+) -> list[tuple]:
+    """
+    Total plays per ``key`` among plays with an artist, then look up names of the top ones.
+
+    ``total`` is the aggregate ranked on: the play count or the milliseconds played.
+    """
+    return _rows(
+        selection,
+        f"""
+        SELECT {names}, counts.total
+        FROM (
+            SELECT {key} AS key_id, artist_id, {total} AS total, MIN(position) AS first_play
+            FROM plays
+            WHERE {{where}} AND {key} IS NOT NULL AND artist_id IS NOT NULL
+            GROUP BY {key}
+            ORDER BY total DESC, first_play
+            LIMIT ?
+        ) AS counts
+        {joins}
+        JOIN artists ON artists.id = counts.artist_id
+        ORDER BY counts.total DESC, counts.first_play
+        """,
+        limit,
+    )
+
+
+def _rows(selection: PlaySelection, sql: str, *extra: object) -> list[tuple]:
+    condition, params = selection.where()
+    rows = selection.store.connection.execute(sql.format(where=condition), [*params, *extra])
+    return [tuple(row) for row in rows]
+
+
+def _minutes(rows: list[tuple]) -> list[tuple]:
+    return [(*row[:-1], row[-1] / MS_PER_MINUTE) for row in rows]
+
+
+def _minutes_per_slot(averages: list[float]) -> list[float]:
+    return [average / MS_PER_MINUTE for average in averages]
+
+
+def _monthly_counts(rows: list[tuple]) -> list[tuple[str, int]]:
+    return [(f"{year}-{month:02d}", count) for year, month, count in rows]
@@ -1,115 +1,683 @@
 """
-A collection of numerical, temporal analytics. 
+A collection of numerical, temporal analytics.
 
-By temporal, we mean that, if plotted, the data has time on the x-axis. 
+By temporal, we mean that, if plotted, the data has time on the x-axis.
 """
 
 from __future__ import annotations
 
+from abc import ABC, abstractmethod
+from array import array
+from dataclasses import fields
 from collections import Counter, defaultdict
-from collections.abc import Iterable
-from datetime import datetime
-from zoneinfo import ZoneInfo
+from collections.abc import Hashable, Iterable, Sequence
+from types import ModuleType
+from typing import Iterator
+
+from spotify_gdpr_analysis.analysis import sql
+from spotify_gdpr_analysis.analysis.sketches import HyperLogLog
+from spotify_gdpr_analysis.analysis.sql import PlaySource
+from spotify_gdpr_analysis.analysis.timestamps import (
+    DEFAULT_TIMEZONE,
+    LocalTimeColumns,
+    local_time_columns,
+    local_time_converter,
+)
+from spotify_gdpr_analysis.io.table import (
+    MISSING,
+    MS_PER_MINUTE,
+    StreamingHistory,
+    parse_epoch_seconds,
+)
 
-_TIMEZONE = ZoneInfo("America/Los_Angeles")
 _ARTIST_KEY = "master_metadata_album_artist_name"
+_BACKENDS = ("python", "numpy")
+
+DEFAULT_SKETCH_PRECISION = 12
+# Timestamps of record dicts are converted to local time this many at a time.
+_LOCAL_TIME_CHUNK_SIZE = 1 << 16
+_backend = "python"
+
 
-def weekday_average_streams(records: Iterable[dict]) -> list[float]:
+def set_backend(backend: str) -> None:
     """
-    Return average listens per weekday across weeks (Mon=0 .. Sun=6).
+    Select the default backend for temporal analyses: "python" or "numpy".
     """
-    counters = defaultdict(Counter)
+    global _backend
+    _numpy_backend_module(backend)
+    _backend = backend
 
-    for record in records:
-        timestamp = record.get('ts').replace("Z", "+00:00")
-        dt = datetime.fromisoformat(timestamp).astimezone(_TIMEZONE)
-        week = dt.isocalendar()
-        counters[(week.year, week.week)][dt.weekday()] += 1
 
-    totals = Counter()
-    for week_counter in counters.values():
-        totals.update(week_counter)
+def get_backend() -> str:
+    """
+    Return the default backend for temporal analyses.
+    """
+    return _backend
 
-    weeks_count = len(counters)
-    return [totals.get(day, 0) / weeks_count for day in range(7)]
 
-def monthly_average_streams(records: Iterable[dict]) -> list[float]:
+class _SlotAverageState(ABC):
     """
-    Return average listens per month across years (Jan=1 .. Dec=12).
+    Mergeable per-period slot counts behind an average-per-slot analysis.
+
+    ``periods`` maps each period (a week, year or day) to a Counter of plays
+    per slot (a weekday, month or hour). Subclasses define ``slots`` and
+    ``_period_slots``, which maps local time columns to (period, slot) pairs.
     """
-    counters = defaultdict(Counter)
 
-    for record in records:
-        timestamp = record.get('ts').replace("Z", "+00:00")
-        dt = datetime.fromisoformat(timestamp).astimezone(_TIMEZONE)
-        counters[dt.year][dt.month] += 1
+    slots: range = range(0)
 
-    totals = Counter()
-    for year_counter in counters.values():
-        totals.update(year_counter)
+    def __init__(self) -> None:
+        self.periods: defaultdict[Hashable, Counter] = defaultdict(Counter)
+
+    def update(self, records: Iterable[dict] | StreamingHistory) -> None:
+        """
+        Count the plays in ``records``.
+        """
+        for columns, _, _ in _temporal_chunks(records):
+            self._fold(columns)
+
+    def merge(self, other: _SlotAverageState) -> None:
+        """
+        Add the counts of another chunk.
+        """
+        for period, counter in other.periods.items():
+            self.periods[period].update(counter)
+
+    def finalize(self) -> list[float]:
+        return _slot_averages(self.periods, self.slots)
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the state.
+        """
+        return {
+            "periods": [
+                [_period_to_json(period), sorted(counter.items())]
+                for period, counter in self.periods.items()
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> _SlotAverageState:
+        """
+        Rebuild a state from ``to_dict`` output.
+        """
+        state = cls()
+        for period, slot_counts in data["periods"]:
+            state.periods[_period_from_json(period)].update(dict(slot_counts))
+        return state
+
+    def _fold(self, columns: LocalTimeColumns) -> None:
+        periods = self.periods
+        for period, slot in self._period_slots(columns):
+            periods[period][slot] += 1
+
+    @abstractmethod
+    def _period_slots(self, columns: LocalTimeColumns) -> Iterator[tuple[Hashable, int]]:
+        """
+        Yield the (period, slot) pair of every play in ``columns``.
+        """
+
+
+class WeekdayAverageState(_SlotAverageState):
+    """
+    Mergeable state of ``weekday_average_streams``, keyed by ISO (year, week).
+    """
+
+    slots = range(7)
+
+    def _period_slots(self, columns: LocalTimeColumns) -> Iterator[tuple[Hashable, int]]:
+        for iso_year, iso_week, weekday in zip(columns.iso_year, columns.iso_week, columns.weekday):
+            yield (iso_year, iso_week), weekday
+
+
+class MonthlyAverageState(_SlotAverageState):
+    """
+    Mergeable state of ``monthly_average_streams``, keyed by year.
+    """
+
+    slots = range(1, 13)
+
+    def _period_slots(self, columns: LocalTimeColumns) -> Iterator[tuple[Hashable, int]]:
+        return zip(columns.year, columns.month)
+
+
+class HourlyAverageState(_SlotAverageState):
+    """
+    Mergeable state of ``hourly_average_streams``, keyed by local day number.
+    """
+
+    slots = range(24)
+
+    def _period_slots(self, columns: LocalTimeColumns) -> Iterator[tuple[Hashable, int]]:
+        return zip(columns.day_number, columns.hour)
+
+
+class _SlotPlaytimeState(_SlotAverageState):
+    """
+    Mergeable per-period milliseconds played per slot.
+
+    Periods are the same as in the play-count state, so ``finalize`` averages
+    over every period with a play and reports minutes.
+    """
+
+    def update(self, records: Iterable[dict] | StreamingHistory) -> None:
+        """
+        Add up the milliseconds played in ``records``.
+        """
+        for columns, ms_played in _playtime_chunks(records):
+            self._fold_playtime(columns, ms_played)
+
+    def finalize(self) -> list[float]:
+        return [average / MS_PER_MINUTE for average in _slot_averages(self.periods, self.slots)]
+
+    def _fold_playtime(self, columns: LocalTimeColumns, ms_played: Sequence[int]) -> None:
+        periods = self.periods
+        for (period, slot), milliseconds in zip(self._period_slots(columns), ms_played):
+            periods[period][slot] += milliseconds
+
+
+class WeekdayPlaytimeState(_SlotPlaytimeState, WeekdayAverageState):
+    """
+    Mergeable state of ``weekday_average_minutes``.
+    """
+
+
+class MonthlyPlaytimeState(_SlotPlaytimeState, MonthlyAverageState):
+    """
+    Mergeable state of ``monthly_average_minutes``.
+    """
+
+
+class HourlyPlaytimeState(_SlotPlaytimeState, HourlyAverageState):
+    """
+    Mergeable state of ``hourly_average_minutes``.
+    """
+
+
+class MonthlyUniqueArtistsState:
+    """
+    Mergeable state of ``monthly_unique_artists``: the artist names per (year, month).
+    """
+
+    def __init__(self) -> None:
+        self.monthly_artists: defaultdict[tuple[int, int], set[str]] = defaultdict(set)
+
+    def update(self, records: Iterable[dict] | StreamingHistory) -> None:
+        """
+        Record the artists played in ``records``.
+        """
+        for columns, artists, names in _temporal_chunks(records):
+            for month_key, month_artists in _monthly_artist_sets(columns, artists).items():
+                self.monthly_artists[month_key].update(_artist_names(month_artists, names))
+
+    def merge(self, other: MonthlyUniqueArtistsState) -> None:
+        """
+        Add the artists of another chunk.
+        """
+        for month_key, month_artists in other.monthly_artists.items():
+            self.monthly_artists[month_key].update(month_artists)
+
+    def finalize(self) -> list[tuple[str, int]]:
+        return _monthly_counts(
+            {month_key: len(month_artists) for month_key, month_artists in self.monthly_artists.items()}
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the state.
+        """
+        return {
+            "months": [
+                [year, month, sorted(month_artists)]
+                for (year, month), month_artists in self.monthly_artists.items()
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> MonthlyUniqueArtistsState:
+        """
+        Rebuild a state from ``to_dict`` output.
+        """
+        state = cls()
+        for year, month, month_artists in data["months"]:
+            state.monthly_artists[(year, month)].update(month_artists)
+        return state
+
+
+class MonthlyUniqueArtistsSketchState:
+    """
+    Fixed-memory variant of ``MonthlyUniqueArtistsState``: one HyperLogLog per (year, month).
+
+    Memory grows with months only, not distinct artists, and states merge
+    across files and listeners. Counts are estimates; see ``HyperLogLog``.
+    """
+
+    def __init__(self, precision: int = DEFAULT_SKETCH_PRECISION) -> None:
+        HyperLogLog(precision)  # Reject a bad precision before any data arrives.
+        self.precision = precision
+        self.monthly_sketches: dict[tuple[int, int], HyperLogLog] = {}
+
+    def update(self, records: Iterable[dict] | StreamingHistory) -> None:
+        """
+        Record the artists played in ``records``.
+        """
+        for columns, artists, names in _temporal_chunks(records):
+            for month_key, month_artists in _monthly_artist_sets(columns, artists).items():
+                sketch = self._sketch(month_key)
+                for name in _artist_names(month_artists, names):
+                    sketch.add(name)
+
+    def merge(self, other: MonthlyUniqueArtistsSketchState) -> None:
+        """
+        Add the artists of another chunk.
+        """
+        for month_key, sketch in other.monthly_sketches.items():
+            self._sketch(month_key).merge(sketch)
+
+    def finalize(self) -> list[tuple[str, int]]:
+        return _monthly_counts(
+            {
+                month_key: round(sketch.estimate())
+                for month_key, sketch in self.monthly_sketches.items()
+            }
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the state.
+        """
+        return {
+            "precision": self.precision,
+            "months": [
+                [year, month, sketch.to_dict()["registers"]]
+                for (year, month), sketch in self.monthly_sketches.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> MonthlyUniqueArtistsSketchState:
+        """
+        Rebuild a state from ``to_dict`` output.
+        """
+        state = cls(data["precision"])
+        for year, month, registers in data["months"]:
+            state.monthly_sketches[(year, month)] = HyperLogLog.from_dict(
+                {"precision": state.precision, "registers": registers}
+            )
+        return state
 
-    years_count = len(counters)
-    return [totals.get(month, 0) / years_count for month in range(1, 13)]
+    def _sketch(self, month_key: tuple[int, int]) -> HyperLogLog:
+        sketch = self.monthly_sketches.get(month_key)
+        if sketch is None:
+            sketch = self.monthly_sketches[month_key] = HyperLogLog(self.precision)
+        return sketch
 
 
-def hourly_average_streams(records: Iterable[dict]) -> list[float]:
+class MonthlyNewArtistsState:
+    """
+    Mergeable state of ``monthly_new_artists``: each artist's first (year, month).
+    """
+
+    def __init__(self) -> None:
+        self.first_seen: dict[str, tuple[int, int]] = {}
+
+    def update(self, records: Iterable[dict] | StreamingHistory) -> None:
+        """
+        Record the first month each artist in ``records`` was played.
+        """
+        for columns, artists, names in _temporal_chunks(records):
+            first_seen = _first_seen_months(columns, artists)
+            if names is not None:
+                first_seen = {names[code]: month_key for code, month_key in first_seen.items()}
+            self._fold(first_seen)
+
+    def merge(self, other: MonthlyNewArtistsState) -> None:
+        """
+        Keep the earlier first-seen month of every artist in another chunk.
+        """
+        self._fold(other.first_seen)
+
+    def finalize(self) -> list[tuple[str, int]]:
+        return _monthly_counts(Counter(self.first_seen.values()))
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the state.
+        """
+        return {
+            "first_seen": [
+                [artist, year, month] for artist, (year, month) in self.first_seen.items()
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> MonthlyNewArtistsState:
+        """
+        Rebuild a state from ``to_dict`` output.
+        """
+        state = cls()
+        state.first_seen = {artist: (year, month) for artist, year, month in data["first_seen"]}
+        return state
+
+    def _fold(self, first_seen: dict[str, tuple[int, int]]) -> None:
+        mine = self.first_seen
+        for artist, month_key in first_seen.items():
+            if artist not in mine or month_key < mine[artist]:
+                mine[artist] = month_key
+
+
+def weekday_average_streams(
+    records: Iterable[dict] | StreamingHistory | PlaySource,
+    backend: str | None = None,
+) -> list[float]:
+    """
+    Return average listens per weekday across weeks (Mon=0 .. Sun=6).
+    """
+    return _average_streams(WeekdayAverageState(), records, backend, "weekday_average_streams")
+
+def monthly_average_streams(
+    records: Iterable[dict] | StreamingHistory | PlaySource,
+    backend: str | None = None,
+) -> list[float]:
+    """
+    Return average listens per month across years (Jan=1 .. Dec=12).
+    """
+    return _average_streams(MonthlyAverageState(), records, backend, "monthly_average_streams")
+
+
+def hourly_average_streams(
+    records: Iterable[dict] | StreamingHistory | PlaySource,
+    backend: str | None = None,
+) -> list[float]:
     """
     Return average listens per hour across days (0 .. 23).
     """
-    counters = defaultdict(Counter)
+    return _average_streams(HourlyAverageState(), records, backend, "hourly_average_streams")
 
-    for record in records:
-        timestamp = record.get("ts").replace("Z", "+00:00")
-        dt = datetime.fromisoformat(timestamp).astimezone(_TIMEZONE)
-        counters[dt.date()][dt.hour] += 1
 
-    totals = Counter()
-    for day_counter in counters.values():
-        totals.update(day_counter)
+def weekday_average_minutes(records: Iterable[dict] | StreamingHistory | PlaySource) -> list[float]:
+    """
+    Return average minutes listened per weekday across weeks (Mon=0 .. Sun=6).
+    """
+    return _average_minutes(WeekdayPlaytimeState(), records, "weekday_average_minutes")
+
 
-    days_count = len(counters)
-    return [totals.get(hour, 0) / days_count for hour in range(24)]
+def monthly_average_minutes(records: Iterable[dict] | StreamingHistory | PlaySource) -> list[float]:
+    """
+    Return average minutes listened per month across years (Jan=1 .. Dec=12).
+    """
+    return _average_minutes(MonthlyPlaytimeState(), records, "monthly_average_minutes")
 
 
-def monthly_unique_artists(records: Iterable[dict]) -> list[tuple[str, int]]:
+def hourly_average_minutes(records: Iterable[dict] | StreamingHistory | PlaySource) -> list[float]:
+    """
+    Return average minutes listened per hour across days (0 .. 23).
+    """
+    return _average_minutes(HourlyPlaytimeState(), records, "hourly_average_minutes")
+
+
+def monthly_unique_artists(
+    records: Iterable[dict] | StreamingHistory | PlaySource,
+    backend: str | None = None,
+    sketch_precision: int | None = None,
+) -> list[tuple[str, int]]:
     """
     Return unique artist counts per month as (YYYY-MM, count).
+
+    With ``sketch_precision`` set, counts are HyperLogLog estimates computed in
+    fixed memory per month (see ``MonthlyUniqueArtistsSketchState``).
     """
-    monthly_artists: dict[tuple[int, int], set[str]] = defaultdict(set)
+    selection = sql.as_selection(records)
+    if selection is not None:
+        if sketch_precision is None:
+            return sql.monthly_unique_artists(selection)
+        records = selection.records()
+    if sketch_precision is not None:
+        state = MonthlyUniqueArtistsSketchState(sketch_precision)
+    else:
+        numpy_result = _run_numpy_backend(backend, records, "monthly_unique_artists", True)
+        if numpy_result is not None:
+            return numpy_result
+        state = MonthlyUniqueArtistsState()
+    state.update(records)
+    return state.finalize()
+
 
+def monthly_new_artists(
+    records: Iterable[dict] | StreamingHistory | PlaySource,
+    backend: str | None = None,
+) -> list[tuple[str, int]]:
+    """
+    Return new artist counts per month as (YYYY-MM, count).
+    """
+    selection = sql.as_selection(records)
+    if selection is not None:
+        return sql.monthly_new_artists(selection)
+    numpy_result = _run_numpy_backend(backend, records, "monthly_new_artists", True)
+    if numpy_result is not None:
+        return numpy_result
+    state = MonthlyNewArtistsState()
+    state.update(records)
+    return state.finalize()
+
+
+def iter_monthly_new_artists(records: Iterable[dict]) -> Iterator[tuple[str, int]]:
+    """
+    Yield new artist counts per month as (YYYY-MM, count) from time-ordered records.
+
+    Each month is yielded as soon as a play from a later month arrives, so
+    results appear while the export is still being read. ``records`` must be
+    in time order, as from ``io.ordered_streaming_history``; a play from a
+    month before the current one raises ``ValueError``. The output matches
+    ``monthly_new_artists``.
+    """
+    converter = local_time_converter(DEFAULT_TIMEZONE)
+    seen: set[str] = set()
+    current: tuple[int, int] | None = None
+    count = 0
     for record in records:
-        timestamp = record.get("ts").replace("Z", "+00:00")
-        dt = datetime.fromisoformat(timestamp).astimezone(_TIMEZONE)
-        artist_name = record.get(_ARTIST_KEY)
-        if not artist_name:
-            continue
-        monthly_artists[(dt.year, dt.month)].add(artist_name)
+        local_day, _ = converter.local_day_and_hour(parse_epoch_seconds(record.get("ts")))
+        month_key = (local_day.year, local_day.month)
+        if month_key != current:
+            if current is not None and month_key < current:
+                raise ValueError(
+                    f"Records are not in time order: {record.get('ts')} follows a later month"
+                )
+            if count:
+                yield from _monthly_counts({current: count})
+            current, count = month_key, 0
+        artist = record.get(_ARTIST_KEY)
+        if artist and artist not in seen:
+            seen.add(artist)
+            count += 1
+    if count:
+        yield from _monthly_counts({current: count})
+
+
+def _average_streams(
+    state: _SlotAverageState,
+    records: Iterable[dict] | StreamingHistory | PlaySource,
+    backend: str | None,
+    name: str,
+) -> list[float]:
+    selection = sql.as_selection(records)
+    if selection is not None:
+        return getattr(sql, name)(selection)
+    numpy_result = _run_numpy_backend(backend, records, name)
+    if numpy_result is not None:
+        return numpy_result
+    state.update(records)
+    return state.finalize()
 
-    monthly_counts = []
-    for (year, month) in sorted(monthly_artists):
-        label = f"{year}-{month:02d}"
-        monthly_counts.append((label, len(monthly_artists[(year, month)])))
-    return monthly_counts
 
+def _average_minutes(
+    state: _SlotPlaytimeState,
+    records: Iterable[dict] | StreamingHistory | PlaySource,
+    name: str,
+) -> list[float]:
+    selection = sql.as_selection(records)
+    if selection is not None:
+        return getattr(sql, name)(selection)
+    state.update(records)
+    return state.finalize()
 
-def monthly_new_artists(records: Iterable[dict]) -> list[tuple[str, int]]:
+
+def _playtime_chunks(
+    records: Iterable[dict] | StreamingHistory,
+) -> Iterator[tuple[LocalTimeColumns, Sequence[int]]]:
     """
-    Return new artist counts per month as (YYYY-MM, count).
+    Yield local time columns and a parallel column of milliseconds played.
+
+    A ``StreamingHistory`` table is yielded whole; record dicts are converted
+    ``_LOCAL_TIME_CHUNK_SIZE`` at a time.
     """
-    first_seen: dict[str, tuple[int, int]] = {}
+    if isinstance(records, StreamingHistory):
+        yield local_time_columns(records, DEFAULT_TIMEZONE), records.ms_played
+        return
 
+    converter = local_time_converter(DEFAULT_TIMEZONE)
+    epochs = array("q")
+    ms_played = array("q")
     for record in records:
-        timestamp = record.get("ts").replace("Z", "+00:00")
-        dt = datetime.fromisoformat(timestamp).astimezone(_TIMEZONE)
-        artist_name = record.get(_ARTIST_KEY)
-        if not artist_name:
+        epochs.append(parse_epoch_seconds(record.get("ts")))
+        ms_played.append(record.get("ms_played") or 0)
+        if len(epochs) == _LOCAL_TIME_CHUNK_SIZE:
+            yield converter.columns(epochs), ms_played
+            epochs = array("q")
+            ms_played = array("q")
+    if epochs:
+        yield converter.columns(epochs), ms_played
+
+
+def _temporal_chunks(
+    records: Iterable[dict] | StreamingHistory,
+) -> Iterator[tuple[LocalTimeColumns, Sequence, list[str] | None]]:
+    """
+    Yield local time columns, a parallel artist column and its lookup list.
+
+    For record dicts the artist column holds names and the lookup list is
+    ``None``, converted ``_LOCAL_TIME_CHUNK_SIZE`` records at a time. A
+    ``StreamingHistory`` table is yielded whole, with interned codes into the
+    lookup list. ``MISSING`` marks plays without an artist.
+    """
+    if isinstance(records, StreamingHistory):
+        artist_codes, artist_names = records.encoded(_ARTIST_KEY)
+        yield local_time_columns(records, DEFAULT_TIMEZONE), artist_codes, artist_names
+        return
+
+    converter = local_time_converter(DEFAULT_TIMEZONE)
+    epochs = array("q")
+    artists = []
+    for record in records:
+        epochs.append(parse_epoch_seconds(record.get("ts")))
+        artists.append(record.get(_ARTIST_KEY) or MISSING)
+        if len(epochs) == _LOCAL_TIME_CHUNK_SIZE:
+            yield converter.columns(epochs), artists, None
+            epochs = array("q")
+            artists = []
+    if epochs:
+        yield converter.columns(epochs), artists, None
+
+
+def _monthly_artist_sets(
+    columns: LocalTimeColumns, artists: Sequence
+) -> dict[tuple[int, int], set]:
+    monthly_artists: dict[tuple[int, int], set] = defaultdict(set)
+    for year, month, artist in zip(columns.year, columns.month, artists):
+        if artist == MISSING:
+            continue
+        monthly_artists[(year, month)].add(artist)
+    return monthly_artists
+
+
+def _first_seen_months(
+    columns: LocalTimeColumns, artists: Sequence
+) -> dict[object, tuple[int, int]]:
+    first_seen: dict[object, tuple[int, int]] = {}
+    for year, month, artist in zip(columns.year, columns.month, artists):
+        if artist == MISSING:
             continue
-        month_key = (dt.year, dt.month)
-        if artist_name not in first_seen or month_key < first_seen[artist_name]:
-            first_seen[artist_name] = month_key
+        month_key = (year, month)
+        if artist not in first_seen or month_key < first_seen[artist]:
+            first_seen[artist] = month_key
+    return first_seen
+
+
+def _artist_names(artists: Iterable, names: list[str] | None) -> Iterable[str]:
+    if names is None:
+        return artists
+    return (names[code] for code in artists)
+
+
+def _period_to_json(period: Hashable) -> list[int]:
+    return list(period) if isinstance(period, tuple) else [period]
+
+
+def _period_from_json(period: list[int]) -> Hashable:
+    return tuple(period) if len(period) > 1 else period[0]
+
+
+def _run_numpy_backend(
+    backend: str | None,
+    records: Iterable[dict] | StreamingHistory,
+    name: str,
+    with_artists: bool = False,
+) -> object | None:
+    """
+    Return ``name`` computed by the NumPy backend, or ``None`` to use Python.
+
+    The NumPy backend needs whole columns, so record dicts are gathered in
+    full; ``None`` is also returned when there is no data to process.
+    """
+    numpy_backend = _numpy_backend_module(_backend if backend is None else backend)
+    if numpy_backend is None:
+        return None
+    chunks = list(_temporal_chunks(records))
+    if len(chunks) == 1:
+        columns, artists, _ = chunks[0]
+    else:
+        columns = LocalTimeColumns()
+        artists = []
+        for chunk_columns, chunk_artists, _ in chunks:
+            for column in fields(LocalTimeColumns):
+                getattr(columns, column.name).extend(getattr(chunk_columns, column.name))
+            artists.extend(chunk_artists)
+    if not len(columns):
+        return None
+    function = getattr(numpy_backend, name)
+    return function(columns, artists) if with_artists else function(columns)
+
+
+def _numpy_backend_module(backend: str) -> ModuleType | None:
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown temporal backend {backend!r}, expected one of {_BACKENDS}")
+    if backend == "python":
+        return None
+    try:
+        from spotify_gdpr_analysis.analysis import _numpy_backend
+    except ImportError as error:
+        raise ImportError(
+            "The numpy temporal backend requires NumPy; install it or use backend='python'."
+        ) from error
+    return _numpy_backend
+
+
+def _slot_averages(
+    counters: dict[Hashable, Counter], slots: Iterable[int]
+) -> list[float]:
+    totals = Counter()
+    for period_counter in counters.values():
+        totals.update(period_counter)
+
+    periods_count = len(counters)
+    if not periods_count:
+        return [0.0 for _ in slots]
+    return [totals.get(slot, 0) / periods_count for slot in slots]
+
 
-    monthly_counts: Counter = Counter(first_seen.values())
+def _monthly_counts(counts: dict[tuple[int, int], int]) -> list[tuple[str, int]]:
     return [
-        (f"{year}-{month:02d}", monthly_counts[(year, month)])
-        for (year, month) in sorted(monthly_counts)
+        (f"{year}-{month:02d}", counts[(year, month)])
+        for (year, month) in sorted(counts)
     ]
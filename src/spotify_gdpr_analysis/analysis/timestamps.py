@@ -0,0 +1,210 @@
+"""
+Shared timestamp stage for the temporal analyses.
+
+Export timestamps are parsed once into UTC epoch seconds. Local calendar fields
+are then derived from a precomputed table of the zone's UTC-offset transitions
+and a cache of per-day fields, instead of a ``datetime.astimezone`` call per
+play.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone, tzinfo
+from typing import NamedTuple
+from weakref import WeakKeyDictionary
+from zoneinfo import ZoneInfo
+
+from spotify_gdpr_analysis.io.table import StreamingHistory
+
+# Time zone in which reports bucket plays by local hour, weekday and month.
+DEFAULT_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+_SECONDS_PER_DAY = 86400
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_CONVERTERS: dict[tzinfo, LocalTimeConverter] = {}
+_TABLE_COLUMNS: WeakKeyDictionary = WeakKeyDictionary()
+
+
+class LocalDay(NamedTuple):
+    """
+    Calendar fields of one local day; ``day_number`` counts days since 1970-01-01.
+    """
+
+    day_number: int
+    year: int
+    month: int
+    day: int
+    weekday: int
+    iso_year: int
+    iso_week: int
+
+
+@dataclass
+class LocalTimeColumns:
+    """
+    Local calendar fields of a batch of plays, one integer array per field.
+    """
+
+    day_number: array = field(default_factory=lambda: array("i"))
+    year: array = field(default_factory=lambda: array("h"))
+    month: array = field(default_factory=lambda: array("b"))
+    day: array = field(default_factory=lambda: array("b"))
+    hour: array = field(default_factory=lambda: array("b"))
+    weekday: array = field(default_factory=lambda: array("b"))
+    iso_year: array = field(default_factory=lambda: array("h"))
+    iso_week: array = field(default_factory=lambda: array("b"))
+
+    def __len__(self) -> int:
+        return len(self.day_number)
+
+
+class LocalTimeConverter:
+    """
+    Convert UTC epoch seconds to local calendar fields for one time zone.
+
+    UTC-offset transitions are located once per covered year and looked up by
+    bisection, so a conversion costs a bisect and a dict lookup.
+    """
+
+    def __init__(self, zone: tzinfo) -> None:
+        self.zone = zone
+        self._transitions = array("q")
+        self._offsets = array("q")
+        self._first_year: int | None = None
+        self._last_year: int | None = None
+        self._covered_start = 0
+        self._covered_end = 0
+        self._days: dict[int, LocalDay] = {}
+
+    def utc_offset(self, epoch: int) -> int:
+        """
+        Return the zone's UTC offset in seconds at ``epoch``.
+        """
+        if not self._covered_start <= epoch < self._covered_end:
+            self._cover(epoch)
+        return self._offsets[bisect_right(self._transitions, epoch) - 1]
+
+    def local_day_and_hour(self, epoch: int) -> tuple[LocalDay, int]:
+        """
+        Return the local day and hour of ``epoch``.
+        """
+        local = epoch + self.utc_offset(epoch)
+        day_number, seconds = divmod(local, _SECONDS_PER_DAY)
+        local_day = self._days.get(day_number)
+        if local_day is None:
+            local_day = self._days[day_number] = _local_day(day_number)
+        return local_day, seconds // 3600
+
+    def columns(self, epochs: Iterable[int]) -> LocalTimeColumns:
+        """
+        Convert a batch of epochs into local calendar field columns.
+        """
+        columns = LocalTimeColumns()
+        day_number = columns.day_number
+        year = columns.year
+        month = columns.month
+        day = columns.day
+        hour = columns.hour
+        weekday = columns.weekday
+        iso_year = columns.iso_year
+        iso_week = columns.iso_week
+        for epoch in epochs:
+            local_day, local_hour = self.local_day_and_hour(epoch)
+            day_number.append(local_day.day_number)
+            year.append(local_day.year)
+            month.append(local_day.month)
+            day.append(local_day.day)
+            hour.append(local_hour)
+            weekday.append(local_day.weekday)
+            iso_year.append(local_day.iso_year)
+            iso_week.append(local_day.iso_week)
+        return columns
+
+    def _cover(self, epoch: int) -> None:
+        """
+        Extend the transition table so that it covers the year of ``epoch``.
+        """
+        year = datetime.fromtimestamp(epoch, timezone.utc).year
+        first_year = year if self._first_year is None else min(year, self._first_year)
+        last_year = year if self._last_year is None else max(year, self._last_year)
+
+        # Pad by a year on each side so neighbouring epochs do not trigger a rebuild.
+        start = _year_start_epoch(first_year - 1)
+        end = _year_start_epoch(last_year + 2)
+        transitions = array("q", [start])
+        offsets = array("q", [self._offset_at(start)])
+        previous = start
+        for sample in range(start + _SECONDS_PER_DAY, end + 1, _SECONDS_PER_DAY):
+            offset = self._offset_at(sample)
+            if offset != offsets[-1]:
+                transitions.append(self._find_transition(previous, sample, offsets[-1]))
+                offsets.append(offset)
+            previous = sample
+        self._transitions = transitions
+        self._offsets = offsets
+        self._first_year = first_year
+        self._last_year = last_year
+        self._covered_start = start
+        self._covered_end = end
+
+    def _offset_at(self, epoch: int) -> int:
+        return int(datetime.fromtimestamp(epoch, self.zone).utcoffset().total_seconds())
+
+    def _find_transition(self, low: int, high: int, low_offset: int) -> int:
+        """
+        Return the first second in ``(low, high]`` whose offset differs from ``low_offset``.
+        """
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self._offset_at(middle) == low_offset:
+                low = middle
+            else:
+                high = middle
+        return high
+
+
+def local_time_converter(zone: tzinfo) -> LocalTimeConverter:
+    """
+    Return the shared converter for ``zone``, so its tables are built only once.
+    """
+    converter = _CONVERTERS.get(zone)
+    if converter is None:
+        converter = _CONVERTERS[zone] = LocalTimeConverter(zone)
+    return converter
+
+
+def local_time_columns(table: StreamingHistory, zone: tzinfo) -> LocalTimeColumns:
+    """
+    Return the local time columns of ``table`` in ``zone``.
+
+    Columns are cached per table and zone, so every temporal analysis run on
+    the same table reuses a single conversion.
+    """
+    cached = _TABLE_COLUMNS.setdefault(table, {})
+    entry = cached.get(zone)
+    if entry is None or entry[0] != len(table):
+        entry = cached[zone] = (len(table), local_time_converter(zone).columns(table.ts))
+    return entry[1]
+
+
+def _local_day(day_number: int) -> LocalDay:
+    local_date = date.fromordinal(day_number + _UNIX_EPOCH_ORDINAL)
+    iso_year, iso_week, _ = local_date.isocalendar()
+    return LocalDay(
+        day_number,
+        local_date.year,
+        local_date.month,
+        local_date.day,
+        local_date.weekday(),
+        iso_year,
+        iso_week,
+    )
+
+
+def _year_start_epoch(year: int) -> int:
+    return (date(year, 1, 1).toordinal() - _UNIX_EPOCH_ORDINAL) * _SECONDS_PER_DAY
@@ -1,14 +1,303 @@
 from __future__ import annotations
 
 from collections import Counter
-from collections.abc import Iterable
+from collections.abc import Hashable, Iterable
+from typing import Iterator
+
+from spotify_gdpr_analysis.analysis import sql
+from spotify_gdpr_analysis.analysis.sketches import SpaceSaving
+from spotify_gdpr_analysis.analysis.sql import PlaySource
+from spotify_gdpr_analysis.io.table import MISSING, MS_PER_MINUTE, StreamingHistory
 
 _TRACK_KEY = "master_metadata_track_name"
 _ARTIST_KEY = "master_metadata_album_artist_name"
 _ALBUM_KEY = "master_metadata_album_album_name"
 
+DEFAULT_SKETCH_CAPACITY = 10_000
+
+
+class _TopCountState:
+    """
+    Mergeable play counts keyed by one record field or a pair of fields.
+
+    ``counts`` keeps first-seen order, so ties in ``finalize`` break the same
+    way however the input was chunked, merged or serialized.
+    """
+
+    keys: tuple[str, ...] = ()
+
+    def __init__(self) -> None:
+        self.counts: Counter = Counter()
+
+    def update(self, records: Iterable[dict] | StreamingHistory) -> None:
+        """
+        Count the plays in ``records``.
+        """
+        if len(self.keys) == 2:
+            self.counts.update(_pair_counts(records, *self.keys))
+        else:
+            self.counts.update(_single_counts(records, *self.keys))
+
+    def merge(self, other: _TopCountState) -> None:
+        """
+        Add the counts of a later chunk.
+        """
+        self.counts.update(other.counts)
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the state.
+        """
+        if len(self.keys) == 2:
+            return {"counts": [[*key, count] for key, count in self.counts.items()]}
+        return {"counts": [[key, count] for key, count in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> _TopCountState:
+        """
+        Rebuild a state from ``to_dict`` output.
+        """
+        state = cls()
+        if len(cls.keys) == 2:
+            state.counts.update({(left, right): count for left, right, count in data["counts"]})
+        else:
+            state.counts.update({key: count for key, count in data["counts"]})
+        return state
+
+
+class TopSongsState(_TopCountState):
+    """
+    Mergeable state of ``top_songs``.
+    """
+
+    keys = (_TRACK_KEY, _ARTIST_KEY)
+
+    def finalize(self, limit: int = 25) -> list[tuple[str, str, int]]:
+        return [(track, artist, count) for (track, artist), count in self.counts.most_common(limit)]
+
+
+class TopAlbumsState(_TopCountState):
+    """
+    Mergeable state of ``top_albums``.
+    """
+
+    keys = (_ALBUM_KEY, _ARTIST_KEY)
+
+    def finalize(self, limit: int = 25) -> list[tuple[str, str, int]]:
+        return [(album, artist, count) for (album, artist), count in self.counts.most_common(limit)]
+
+
+class TopArtistsState(_TopCountState):
+    """
+    Mergeable state of ``top_artists``.
+    """
+
+    keys = (_ARTIST_KEY,)
+
+    def finalize(self, limit: int = 25) -> list[tuple[str, int]]:
+        return [(artist, count) for artist, count in self.counts.most_common(limit)]
+
+
+class _TopPlaytimeState(_TopCountState):
+    """
+    Mergeable milliseconds played, keyed like ``_TopCountState``.
+
+    ``counts`` holds integer millisecond totals; ``finalize`` reports minutes.
+    """
+
+    def update(self, records: Iterable[dict] | StreamingHistory) -> None:
+        """
+        Add up the milliseconds played in ``records``.
+        """
+        self.counts.update(_playtime_totals(records, self.keys))
+
+    def finalize(self, limit: int = 25) -> list[tuple]:
+        top = self.counts.most_common(limit)
+        if len(self.keys) == 2:
+            return [(left, right, total / MS_PER_MINUTE) for (left, right), total in top]
+        return [(key, total / MS_PER_MINUTE) for key, total in top]
+
+
+class TopSongsPlaytimeState(_TopPlaytimeState):
+    """
+    Mergeable state of ``top_songs_by_playtime``.
+    """
+
+    keys = (_TRACK_KEY, _ARTIST_KEY)
+
+
+class TopAlbumsPlaytimeState(_TopPlaytimeState):
+    """
+    Mergeable state of ``top_albums_by_playtime``.
+    """
+
+    keys = (_ALBUM_KEY, _ARTIST_KEY)
+
+
+class TopArtistsPlaytimeState(_TopPlaytimeState):
+    """
+    Mergeable state of ``top_artists_by_playtime``.
+    """
+
+    keys = (_ARTIST_KEY,)
+
+
+class _ApproximateTopState:
+    """
+    Fixed-memory play counts keyed by one record field or a pair of fields.
+
+    A Space-Saving sketch tracks at most ``capacity`` keys. ``finalize``
+    reports, per item, an estimated count and an error bound such that the true
+    count lies in ``[count - error, count]``; errors never exceed
+    ``plays / capacity``.
+    """
+
+    keys: tuple[str, ...] = ()
+
+    def __init__(self, capacity: int = DEFAULT_SKETCH_CAPACITY) -> None:
+        self.sketch = SpaceSaving(capacity)
+
+    @classmethod
+    def for_error(cls, max_error: float) -> _ApproximateTopState:
+        """
+        Return a state whose error bound is at most ``max_error`` times the plays seen.
+        """
+        state = cls()
+        state.sketch = SpaceSaving.for_error(max_error)
+        return state
+
+    def update(self, records: Iterable[dict] | StreamingHistory) -> None:
+        """
+        Count the plays in ``records`` one at a time, in bounded memory.
+        """
+        add = self.sketch.add
+        for key in _iter_keys(records, self.keys):
+            add(key)
+
+    def merge(self, other: _ApproximateTopState) -> None:
+        """
+        Fold in the sketch of another chunk.
+        """
+        self.sketch.merge(other.sketch)
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the state.
+        """
+        return self.sketch.to_dict()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> _ApproximateTopState:
+        """
+        Rebuild a state from ``to_dict`` output.
+        """
+        state = cls()
+        state.sketch = SpaceSaving.from_dict(data)
+        return state
 
-def _top_pair(records: Iterable[dict], left_key: str, right_key: str, limit: int) -> list[tuple]:
+    def finalize(self, limit: int = 25) -> list[tuple]:
+        if len(self.keys) == 2:
+            return [(*key, count, error) for key, count, error in self.sketch.top(limit)]
+        return [(key, count, error) for key, count, error in self.sketch.top(limit)]
+
+
+class ApproximateTopSongsState(_ApproximateTopState):
+    """
+    Fixed-memory state of ``approximate_top_songs``.
+    """
+
+    keys = (_TRACK_KEY, _ARTIST_KEY)
+
+
+class ApproximateTopAlbumsState(_ApproximateTopState):
+    """
+    Fixed-memory state of ``approximate_top_albums``.
+    """
+
+    keys = (_ALBUM_KEY, _ARTIST_KEY)
+
+
+class ApproximateTopArtistsState(_ApproximateTopState):
+    """
+    Fixed-memory state of ``approximate_top_artists``.
+    """
+
+    keys = (_ARTIST_KEY,)
+
+
+def _iter_keys(records: Iterable[dict] | StreamingHistory, keys: tuple[str, ...]) -> Iterator[Hashable]:
+    """
+    Yield the counting key of every play that has all ``keys`` set.
+
+    Keys are ``(left, right)`` tuples for field pairs and plain values otherwise.
+    """
+    if isinstance(records, StreamingHistory):
+        columns = [records.encoded(key) for key in keys]
+        if len(columns) == 2:
+            (left_codes, left_values), (right_codes, right_values) = columns
+            for left, right in zip(left_codes, right_codes):
+                if left != MISSING and right != MISSING:
+                    yield left_values[left], right_values[right]
+        else:
+            ((codes, values),) = columns
+            for code in codes:
+                if code != MISSING:
+                    yield values[code]
+        return
+
+    if len(keys) == 2:
+        left_key, right_key = keys
+        for record in records:
+            left = record.get(left_key)
+            right = record.get(right_key)
+            if left and right:
+                yield left, right
+    else:
+        (key,) = keys
+        for record in records:
+            value = record.get(key)
+            if value:
+                yield value
+
+
+def _playtime_totals(records: Iterable[dict] | StreamingHistory, keys: tuple[str, ...]) -> Counter:
+    """
+    Return the milliseconds played per counting key, as in ``_iter_keys``.
+    """
+    counter: Counter = Counter()
+    if isinstance(records, StreamingHistory):
+        plays = zip(_iter_row_keys(records, keys), records.ms_played)
+    else:
+        plays = ((_record_key(record, keys), record.get("ms_played") or 0) for record in records)
+    for key, ms_played in plays:
+        if key is not None:
+            counter[key] += ms_played
+    return counter
+
+
+def _iter_row_keys(table: StreamingHistory, keys: tuple[str, ...]) -> Iterator[Hashable | None]:
+    columns = [table.encoded(key) for key in keys]
+    if len(columns) == 2:
+        (left_codes, left_values), (right_codes, right_values) = columns
+        for left, right in zip(left_codes, right_codes):
+            yield None if min(left, right) < 0 else (left_values[left], right_values[right])
+    else:
+        ((codes, values),) = columns
+        for code in codes:
+            yield None if code == MISSING else values[code]
+
+
+def _record_key(record: dict, keys: tuple[str, ...]) -> Hashable | None:
+    if len(keys) == 2:
+        left = record.get(keys[0])
+        right = record.get(keys[1])
+        return (left, right) if left and right else None
+    return record.get(keys[0]) or None
+
+
+def _pair_counts(records: Iterable[dict] | StreamingHistory, left_key: str, right_key: str) -> Counter:
+    if isinstance(records, StreamingHistory):
+        return _pair_counts_encoded(records, left_key, right_key)
     counter: Counter = Counter()
     for record in records:
         left = record.get(left_key)
@@ -16,38 +305,162 @@ def _top_pair(records: Iterable[dict], left_key: str, right_key: str, limit: int
         if not left or not right:
             continue
         counter[(left, right)] += 1
-    return counter.most_common(limit)
+    return counter
 
 
-def _top_single(records: Iterable[dict], key: str, limit: int) -> list[tuple]:
+def _single_counts(records: Iterable[dict] | StreamingHistory, key: str) -> Counter:
+    if isinstance(records, StreamingHistory):
+        return _single_counts_encoded(records, key)
     counter: Counter = Counter()
     for record in records:
         value = record.get(key)
         if not value:
             continue
         counter[value] += 1
-    return counter.most_common(limit)
+    return counter
 
 
-def top_songs(records: Iterable[dict], limit: int = 25) -> list[tuple[str, str, int]]:
+def _pair_counts_encoded(table: StreamingHistory, left_key: str, right_key: str) -> Counter:
+    left_codes, left_values = table.encoded(left_key)
+    right_codes, right_values = table.encoded(right_key)
+    counter = Counter(
+        pair for pair in zip(left_codes, right_codes) if min(pair) >= 0
+    )
+    return Counter(
+        {(left_values[left], right_values[right]): count for (left, right), count in counter.items()}
+    )
+
+
+def _single_counts_encoded(table: StreamingHistory, key: str) -> Counter:
+    codes, values = table.encoded(key)
+    counter = Counter(code for code in codes if code >= 0)
+    return Counter({values[code]: count for code, count in counter.items()})
+
+
+def top_songs(
+    records: Iterable[dict] | StreamingHistory | PlaySource, limit: int = 25
+) -> list[tuple[str, str, int]]:
     """
     Return the most-played songs as (track_name, artist_name, play_count).
     """
-    counts = _top_pair(records, _TRACK_KEY, _ARTIST_KEY, limit)
-    return [(track, artist, count) for (track, artist), count in counts]
+    selection = sql.as_selection(records)
+    if selection is not None:
+        return sql.top_songs(selection, limit)
+    state = TopSongsState()
+    state.update(records)
+    return state.finalize(limit)
 
 
-def top_albums(records: Iterable[dict], limit: int = 25) -> list[tuple[str, str, int]]:
+def top_albums(
+    records: Iterable[dict] | StreamingHistory | PlaySource, limit: int = 25
+) -> list[tuple[str, str, int]]:
     """
     Return the most-played albums as (album_name, artist_name, play_count).
     """
-    counts = _top_pair(records, _ALBUM_KEY, _ARTIST_KEY, limit)
-    return [(album, artist, count) for (album, artist), count in counts]
+    selection = sql.as_selection(records)
+    if selection is not None:
+        return sql.top_albums(selection, limit)
+    state = TopAlbumsState()
+    state.update(records)
+    return state.finalize(limit)
 
 
-def top_artists(records: Iterable[dict], limit: int = 25) -> list[tuple[str, int]]:
+def top_artists(
+    records: Iterable[dict] | StreamingHistory | PlaySource, limit: int = 25
+) -> list[tuple[str, int]]:
     """
     Return the most-played artists as (artist_name, play_count).
     """
-    counts = _top_single(records, _ARTIST_KEY, limit)
-    return [(artist, count) for artist, count in counts]
+    selection = sql.as_selection(records)
+    if selection is not None:
+        return sql.top_artists(selection, limit)
+    state = TopArtistsState()
+    state.update(records)
+    return state.finalize(limit)
+
+
+def top_songs_by_playtime(
+    records: Iterable[dict] | StreamingHistory | PlaySource, limit: int = 25
+) -> list[tuple[str, str, float]]:
+    """
+    Return the songs listened to longest as (track_name, artist_name, minutes).
+    """
+    selection = sql.as_selection(records)
+    if selection is not None:
+        return sql.top_songs_by_playtime(selection, limit)
+    state = TopSongsPlaytimeState()
+    state.update(records)
+    return state.finalize(limit)
+
+
+def top_albums_by_playtime(
+    records: Iterable[dict] | StreamingHistory | PlaySource, limit: int = 25
+) -> list[tuple[str, str, float]]:
+    """
+    Return the albums listened to longest as (album_name, artist_name, minutes).
+    """
+    selection = sql.as_selection(records)
+    if selection is not None:
+        return sql.top_albums_by_playtime(selection, limit)
+    state = TopAlbumsPlaytimeState()
+    state.update(records)
+    return state.finalize(limit)
+
+
+def top_artists_by_playtime(
+    records: Iterable[dict] | StreamingHistory | PlaySource, limit: int = 25
+) -> list[tuple[str, float]]:
+    """
+    Return the artists listened to longest as (artist_name, minutes).
+    """
+    selection = sql.as_selection(records)
+    if selection is not None:
+        return sql.top_artists_by_playtime(selection, limit)
+    state = TopArtistsPlaytimeState()
+    state.update(records)
+    return state.finalize(limit)
+
+
+def approximate_top_songs(
+    records: Iterable[dict] | StreamingHistory,
+    limit: int = 25,
+    capacity: int = DEFAULT_SKETCH_CAPACITY,
+) -> list[tuple[str, str, int, int]]:
+    """
+    Return the most-played songs in fixed memory as (track_name, artist_name, play_count, error).
+
+    The true play count lies in ``[play_count - error, play_count]``.
+    """
+    state = ApproximateTopSongsState(capacity)
+    state.update(records)
+    return state.finalize(limit)
+
+
+def approximate_top_albums(
+    records: Iterable[dict] | StreamingHistory,
+    limit: int = 25,
+    capacity: int = DEFAULT_SKETCH_CAPACITY,
+) -> list[tuple[str, str, int, int]]:
+    """
+    Return the most-played albums in fixed memory as (album_name, artist_name, play_count, error).
+
+    The true play count lies in ``[play_count - error, play_count]``.
+    """
+    state = ApproximateTopAlbumsState(capacity)
+    state.update(records)
+    return state.finalize(limit)
+
+
+def approximate_top_artists(
+    records: Iterable[dict] | StreamingHistory,
+    limit: int = 25,
+    capacity: int = DEFAULT_SKETCH_CAPACITY,
+) -> list[tuple[str, int, int]]:
+    """
+    Return the most-played artists in fixed memory as (artist_name, play_count, error).
+
+    The true play count lies in ``[play_count - error, play_count]``.
+    """
+    state = ApproximateTopArtistsState(capacity)
+    state.update(records)
+    return state.finalize(limit)
@@ -0,0 +1,24 @@
+"""
+Synthetic exports and benchmarks for the report pipeline.
+"""
+
+from spotify_gdpr_analysis.benchmark.runner import (
+    StageResult,
+    find_regressions,
+    format_results,
+    load_results,
+    run_benchmarks,
+    write_results,
+)
+from spotify_gdpr_analysis.benchmark.synthetic import SyntheticExport, generate_streaming_history
+
+__all__ = [
+    "StageResult",
+    "SyntheticExport",
+    "find_regressions",
+    "format_results",
+    "generate_streaming_history",
+    "load_results",
+    "run_benchmarks",
+    "write_results",
+]
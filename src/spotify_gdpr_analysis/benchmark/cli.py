@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import argparse
+
+from spotify_gdpr_analysis.benchmark.runner import (
+    DEFAULT_SCALES,
+    find_regressions,
+    format_results,
+    load_results,
+    run_benchmarks,
+    write_results,
+)
+from spotify_gdpr_analysis.benchmark.synthetic import generate_streaming_history
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the report pipeline on deterministic synthetic exports.",
+    )
+    parser.add_argument(
+        "--work-dir",
+        default="benchmark_data",
+        help="Directory holding generated exports, reused across runs (default: benchmark_data).",
+    )
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_SCALES),
+        help="Record counts to benchmark (default: 10000 100000 1000000).",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0).")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Runs per stage; the fastest is reported (default: 1).",
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="Skip the traced run that measures peak memory per stage.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="benchmark_results.json",
+        help="Output JSON path (default: benchmark_results.json).",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Earlier results JSON; exit with status 1 if any stage got slower.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative slowdown against --baseline (default: 0.2).",
+    )
+    parser.add_argument(
+        "--generate-only",
+        metavar="DATA_DIR",
+        default=None,
+        help="Write one synthetic export of the first scale to DATA_DIR and exit.",
+    )
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.generate_only:
+        export = generate_streaming_history(args.generate_only, args.scales[0], seed=args.seed)
+        print(f"Wrote {export.records} records to {len(export.paths)} file(s) in {export.data_dir}")
+        return 0
+
+    results = run_benchmarks(
+        args.work_dir,
+        args.scales,
+        seed=args.seed,
+        repeat=args.repeat,
+        memory=not args.no_memory,
+    )
+    print(format_results(results))
+    write_results(results, args.output, seed=args.seed)
+    print(f"Wrote results to {args.output}")
+
+    if args.baseline:
+        regressions = find_regressions(results, load_results(args.baseline), args.tolerance)
+        for result, before in regressions:
+            print(
+                f"Regression: {result.stage} at {result.records} records took "
+                f"{result.wall_seconds:.3f}s (baseline {before.wall_seconds:.3f}s)"
+            )
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,213 @@
+"""
+Timing and memory benchmarks of the report pipeline over synthetic exports.
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import time
+import tracemalloc
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from spotify_gdpr_analysis.analysis import (
+    hourly_average_streams,
+    monthly_average_streams,
+    monthly_new_artists,
+    monthly_unique_artists,
+    run_analyses,
+    top_albums,
+    top_artists,
+    top_songs,
+    weekday_average_streams,
+)
+from spotify_gdpr_analysis.analysis.timestamps import (
+    DEFAULT_TIMEZONE,
+    local_time_columns,
+    local_time_converter,
+)
+from spotify_gdpr_analysis.benchmark.synthetic import generate_streaming_history
+from spotify_gdpr_analysis.io.cache import ExportCache
+from spotify_gdpr_analysis.io.streaming_history import streaming_history_paths
+from spotify_gdpr_analysis.io.table import StreamingHistory, streaming_history_table
+from spotify_gdpr_analysis.visualize.report import render_analyses_report, render_html_report
+
+DEFAULT_SCALES = (10_000, 100_000, 1_000_000)
+RESULTS_VERSION = 1
+
+_COMPLETE_MARKER = ".complete"
+_ANALYSES: tuple[tuple[str, Callable], ...] = (
+    ("top_songs", top_songs),
+    ("top_albums", top_albums),
+    ("top_artists", top_artists),
+    ("weekday_average_streams", weekday_average_streams),
+    ("monthly_average_streams", monthly_average_streams),
+    ("hourly_average_streams", hourly_average_streams),
+    ("monthly_unique_artists", monthly_unique_artists),
+    ("monthly_new_artists", monthly_new_artists),
+)
+
+
+@dataclass
+class StageResult:
+    """
+    Measurements of one pipeline stage at one scale.
+
+    ``peak_memory_bytes`` is the tracemalloc peak during the stage, or ``None``
+    when memory profiling was disabled.
+    """
+
+    records: int
+    stage: str
+    wall_seconds: float
+    cpu_seconds: float
+    records_per_second: float
+    peak_memory_bytes: int | None = None
+
+
+def run_benchmarks(
+    work_dir: str | Path,
+    scales: Sequence[int] = DEFAULT_SCALES,
+    seed: int = 0,
+    repeat: int = 1,
+    memory: bool = True,
+) -> list[StageResult]:
+    """
+    Benchmark ingestion, every analysis and report rendering at each scale.
+
+    Exports are generated once per (scale, seed) under ``work_dir`` and reused
+    by later runs. Times are the fastest of ``repeat`` runs; memory is measured
+    in a separate traced run so tracing overhead does not skew the times.
+    The ``local_time`` stage converts timestamps once; temporal analyses then
+    reuse the converted columns, as they do in a report.
+    """
+    if repeat < 1:
+        raise ValueError(f"repeat must be at least 1, got {repeat}")
+    results = []
+    for records in scales:
+        data_dir = synthetic_export_dir(work_dir, records, seed)
+        results.extend(_benchmark_scale(data_dir, records, repeat, memory))
+    return results
+
+
+def synthetic_export_dir(work_dir: str | Path, records: int, seed: int = 0) -> Path:
+    """
+    Return the directory of a synthetic export, generating it if needed.
+    """
+    data_dir = Path(work_dir) / f"records-{records}-seed-{seed}"
+    marker = data_dir / _COMPLETE_MARKER
+    if not marker.exists():
+        for path in streaming_history_paths(data_dir):
+            path.unlink()
+        generate_streaming_history(data_dir, records, seed=seed)
+        marker.touch()
+    return data_dir
+
+
+def write_results(results: Sequence[StageResult], output_path: str | Path, seed: int = 0) -> None:
+    """
+    Write benchmark results with environment details as JSON.
+    """
+    payload = {
+        "version": RESULTS_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": [asdict(result) for result in results],
+    }
+    Path(output_path).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+
+def load_results(path: str | Path) -> list[StageResult]:
+    """
+    Read results written by ``write_results``.
+    """
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    if payload.get("version") != RESULTS_VERSION:
+        raise ValueError(f"Unsupported benchmark results version in {path}: {payload.get('version')}")
+    return [StageResult(**result) for result in payload["results"]]
+
+
+def find_regressions(
+    results: Sequence[StageResult],
+    baseline: Sequence[StageResult],
+    tolerance: float = 0.2,
+) -> list[tuple[StageResult, StageResult]]:
+    """
+    Return (result, baseline) pairs whose wall time grew by more than ``tolerance``.
+    """
+    previous = {(result.records, result.stage): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result.records, result.stage))
+        if before and result.wall_seconds > before.wall_seconds * (1 + tolerance):
+            regressions.append((result, before))
+    return regressions
+
+
+def format_results(results: Sequence[StageResult]) -> str:
+    """
+    Return a plain-text summary table of ``results``.
+    """
+    header = f"{'records':>10}  {'stage':<24} {'wall s':>9} {'cpu s':>9} {'records/s':>12} {'peak MiB':>9}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        peak = "-" if result.peak_memory_bytes is None else f"{result.peak_memory_bytes / 2**20:.1f}"
+        lines.append(
+            f"{result.records:>10}  {result.stage:<24} {result.wall_seconds:>9.3f} "
+            f"{result.cpu_seconds:>9.3f} {result.records_per_second:>12,.0f} {peak:>9}"
+        )
+    return "\n".join(lines)
+
+
+def _benchmark_scale(data_dir: Path, records: int, repeat: int, memory: bool) -> list[StageResult]:
+    cache_dir = data_dir / ".benchmark_cache"
+    paths = streaming_history_paths(data_dir)
+    table = streaming_history_table(data_dir)
+    local_time_columns(table, DEFAULT_TIMEZONE)
+    analyses = run_analyses(table)
+
+    def warm_cache_load() -> StreamingHistory:
+        cache = ExportCache(cache_dir)
+        loaded = StreamingHistory()
+        for path in paths:
+            loaded.extend_table(cache.load(path))
+        return loaded
+
+    stages: list[tuple[str, Callable[[], object]]] = [
+        ("ingest", lambda: streaming_history_table(data_dir)),
+        ("ingest_cached", warm_cache_load),
+        ("local_time", lambda: local_time_converter(DEFAULT_TIMEZONE).columns(table.ts)),
+        *((name, lambda function=function: function(table)) for name, function in _ANALYSES),
+        ("run_analyses", lambda: run_analyses(table)),
+        ("render_analyses_report", lambda: render_analyses_report(analyses)),
+        ("render_html_report", lambda: render_html_report(table)),
+    ]
+    warm_cache_load()
+    return [_measure(records, name, stage, repeat, memory) for name, stage in stages]
+
+
+def _measure(
+    records: int, name: str, stage: Callable[[], object], repeat: int, memory: bool
+) -> StageResult:
+    wall = cpu = float("inf")
+    for _ in range(repeat):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        stage()
+        cpu = min(cpu, time.process_time() - cpu_start)
+        wall = min(wall, time.perf_counter() - wall_start)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            stage()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return StageResult(records, name, wall, cpu, records / wall if wall else 0.0, peak)
@@ -1,6 +1,53 @@
-from .streaming_history import load_streaming_history_json, streaming_history
+from .archive import ArchiveMember
+from .cache import ExportCache, cached_streaming_history_table
+from .dedup import (
+    BloomFilter,
+    PlayKeySet,
+    deduplicate_plays,
+    deduplicated_streaming_history,
+    play_key_hash,
+)
+from .ordered import (
+    OutOfOrderError,
+    files_to_sort_in_memory,
+    merge_by_ts,
+    ordered_streaming_history,
+)
+from .play_store import PlaySelection, PlayStore, StoreUpdate
+from .streaming_history import (
+    iter_streaming_history_json,
+    load_streaming_history_json,
+    min_duration_filter,
+    record_matches,
+    streaming_history,
+    streaming_history_paths,
+    ts_bound,
+)
+from .table import StreamingHistory, streaming_history_table
 
 __all__ = [
+    "ArchiveMember",
+    "BloomFilter",
+    "ExportCache",
+    "OutOfOrderError",
+    "PlayKeySet",
+    "PlaySelection",
+    "PlayStore",
+    "StoreUpdate",
+    "StreamingHistory",
+    "cached_streaming_history_table",
+    "deduplicate_plays",
+    "deduplicated_streaming_history",
+    "files_to_sort_in_memory",
+    "iter_streaming_history_json",
     "load_streaming_history_json",
+    "merge_by_ts",
+    "min_duration_filter",
+    "ordered_streaming_history",
+    "play_key_hash",
+    "record_matches",
     "streaming_history",
+    "streaming_history_paths",
+    "streaming_history_table",
+    "ts_bound",
 ]
@@ -0,0 +1,104 @@
+"""
+Streaming access to export files inside the ZIP archive Spotify delivers.
+
+Members are decompressed on the fly while they are parsed, so an archive is
+processed without extracting anything to disk. ``ArchiveMember`` offers the
+small part of the ``Path`` interface the loaders use (``name``, ``open``,
+``stat`` and ``resolve``) and is picklable, so members can be handed to
+worker processes like ordinary paths.
+"""
+
+from __future__ import annotations
+
+import zipfile
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path, PurePosixPath
+from typing import IO, NamedTuple
+
+
+class MemberStat(NamedTuple):
+    """
+    The ``stat`` fields the loaders use to detect changed inputs.
+
+    ``st_mtime_ns`` is the archive's, so rewriting the archive invalidates
+    every member.
+    """
+
+    st_size: int
+    st_mtime_ns: int
+
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    """
+    One file inside a ZIP archive.
+    """
+
+    archive: Path
+    member: str
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.member).name
+
+    def open(self, mode: str = "rb") -> IO[bytes]:
+        """
+        Return a binary stream that decompresses the member as it is read.
+        """
+        if mode != "rb":
+            raise ValueError(f"Archive members can only be opened with mode 'rb', got {mode!r}")
+        with zipfile.ZipFile(self.archive) as archive:
+            # The member stream keeps the archive file open until it is closed.
+            return archive.open(self.member)
+
+    def stat(self) -> MemberStat:
+        with zipfile.ZipFile(self.archive) as archive:
+            size = archive.getinfo(self.member).file_size
+        return MemberStat(size, self.archive.stat().st_mtime_ns)
+
+    def resolve(self) -> ArchiveMember:
+        return ArchiveMember(self.archive.resolve(), self.member)
+
+    def __str__(self) -> str:
+        return f"{self.archive}/{self.member}"
+
+
+def is_export_archive(path: str | Path) -> bool:
+    """
+    Return whether ``path`` is a ZIP file rather than an export directory.
+    """
+    file_path = Path(path)
+    return file_path.is_file() and zipfile.is_zipfile(file_path)
+
+
+def archive_members(path: str | Path, pattern: str) -> list[ArchiveMember]:
+    """
+    Return the members of the archive at ``path`` whose file name matches ``pattern``.
+
+    Members in any folder of the archive are found; they are ordered by file name.
+    """
+    archive_path = Path(path)
+    with zipfile.ZipFile(archive_path) as archive:
+        names = [info.filename for info in archive.infolist() if not info.is_dir()]
+    members = [
+        ArchiveMember(archive_path, name)
+        for name in names
+        if fnmatchcase(PurePosixPath(name).name, pattern)
+    ]
+    return sorted(members, key=lambda member: (member.name, member.member))
+
+
+def export_source(path: str | Path | ArchiveMember) -> Path | ArchiveMember:
+    """
+    Return ``path`` as a ``Path``, leaving archive members as they are.
+    """
+    return path if isinstance(path, ArchiveMember) else Path(path)
+
+
+def sidecar_dir(data_dir: str | Path) -> Path:
+    """
+    Return the directory for files kept next to an export directory or archive.
+    """
+    base = Path(data_dir)
+    return base.parent if is_export_archive(base) else base
@@ -0,0 +1,356 @@
+"""
+Persistent cache of parsed streaming history files.
+
+Each export file is stored once, in a compact binary columnar format: integer
+columns as raw, 8-byte aligned arrays that can be memory-mapped, and string
+lookup tables as concatenated UTF-8 with an array of end offsets, so any
+string can be stored. Entries are keyed by the SHA-256 of the file contents.
+An index maps each path to its size, mtime and digest, so unchanged files are
+found without re-hashing; processes sharing a cache update it under a lock
+file. The cache is capped in size and evicts least recently used entries.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import secrets
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Iterator
+from contextlib import contextmanager
+from itertools import accumulate, chain
+from pathlib import Path
+from typing import IO
+
+from spotify_gdpr_analysis.io.archive import ArchiveMember, export_source, sidecar_dir
+from spotify_gdpr_analysis.io.streaming_history import (
+    iter_streaming_history_json,
+    streaming_history_paths,
+)
+from spotify_gdpr_analysis.io.table import ENCODED_KEYS, TABLE_FIELDS, StreamingHistory
+from spotify_gdpr_analysis.profiling import Profiler, profile_stage
+
+DEFAULT_CACHE_DIRNAME = ".spotify_gdpr_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_MAGIC = b"SGDCACHE"
+_FORMAT_VERSION = 2
+_HEADER_LENGTH = struct.Struct("<I")
+_INDEX_NAME = "index.json"
+_LOCK_NAME = "index.lock"
+_LOCK_TIMEOUT = 30.0
+_LOCK_POLL_INTERVAL = 0.01
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+class ExportCache:
+    """
+    Size-capped, LRU-evicted cache of parsed streaming history files.
+    """
+
+    def __init__(self, cache_dir: str | Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def load(self, path: str | Path | ArchiveMember) -> StreamingHistory:
+        """
+        Return the parsed contents of ``path``, decoding the JSON only on a cache miss.
+        """
+        file_path = export_source(path).resolve()
+        stat = file_path.stat()
+        entry = self._read_index().get(str(file_path))
+
+        table = None
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            digest = entry["digest"]
+            table = self._read_entry(digest)
+        if table is None:
+            digest = file_digest(file_path)
+            table = self._read_entry(digest)
+        if table is None:
+            table = StreamingHistory.from_records(
+                iter_streaming_history_json(file_path, fields=TABLE_FIELDS)
+            )
+            self._write_entry(digest, table)
+
+        with self._index_lock():
+            index = self._read_index()
+            index[str(file_path)] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "digest": digest,
+                "last_used": time.time(),
+            }
+            self._evict(index, keep=digest)
+            self._write_index(index)
+        return table
+
+    def _entry_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}.bin"
+
+    @contextmanager
+    def _index_lock(self) -> Iterator[None]:
+        """
+        Hold the cache's lock file while the index is read, updated and written.
+
+        A lock older than ``_LOCK_TIMEOUT`` seconds was left by a crashed
+        process and is broken.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        lock_path = self.cache_dir / _LOCK_NAME
+        deadline = time.monotonic() + _LOCK_TIMEOUT
+        while True:
+            try:
+                handle = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    stale = time.time() - lock_path.stat().st_mtime > _LOCK_TIMEOUT
+                except OSError:
+                    continue
+                if stale:
+                    lock_path.unlink(missing_ok=True)
+                elif time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for the cache lock {lock_path}")
+                else:
+                    time.sleep(_LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            os.close(handle)
+            lock_path.unlink(missing_ok=True)
+
+    def _read_index(self) -> dict[str, dict]:
+        try:
+            with (self.cache_dir / _INDEX_NAME).open("r", encoding="utf-8") as handle:
+                index = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _write_index(self, index: dict[str, dict]) -> None:
+        atomic_write(self.cache_dir / _INDEX_NAME, json.dumps(index).encode("utf-8"))
+
+    def _read_entry(self, digest: str) -> StreamingHistory | None:
+        try:
+            with self._entry_path(digest).open("rb") as handle:
+                with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return _decode_entry(mapped)
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+
+    def _write_entry(self, digest: str, table: StreamingHistory) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write(self._entry_path(digest), _encode_entry(table))
+
+    def _evict(self, index: dict[str, dict], keep: str) -> None:
+        """
+        Delete least recently used entries until the cache fits in ``max_bytes``.
+        """
+        last_used: dict[str, float] = {}
+        for entry in index.values():
+            digest = entry["digest"]
+            last_used[digest] = max(entry["last_used"], last_used.get(digest, 0.0))
+
+        sizes = {}
+        for digest in last_used:
+            try:
+                sizes[digest] = self._entry_path(digest).stat().st_size
+            except OSError:
+                sizes[digest] = 0
+        total = sum(sizes.values())
+
+        evicted = set()
+        for digest in sorted(last_used, key=last_used.get):
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            self._entry_path(digest).unlink(missing_ok=True)
+            total -= sizes[digest]
+            evicted.add(digest)
+
+        for path in [path for path, entry in index.items() if entry["digest"] in evicted]:
+            del index[path]
+
+
+def cached_streaming_history_table(
+    data_dir: str | Path,
+    cache_dir: str | Path | None = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    profiler: Profiler | None = None,
+) -> StreamingHistory:
+    """
+    Load every streaming history file in ``data_dir`` through an ``ExportCache``.
+
+    The cache lives in ``default_cache_dir(data_dir)`` unless ``cache_dir`` is
+    given. With a ``profiler``, each file is loaded as its own stage.
+    """
+    cache = ExportCache(default_cache_dir(data_dir) if cache_dir is None else cache_dir, max_bytes)
+    table = StreamingHistory()
+    for path in streaming_history_paths(data_dir):
+        with profile_stage(profiler, f"load {path.name}") as stage:
+            part = cache.load(path)
+            table.extend_table(part)
+            if stage is not None:
+                stage.records = len(part)
+    return table
+
+
+def default_cache_dir(data_dir: str | Path) -> Path:
+    """
+    Return the default cache directory of an export directory or archive.
+    """
+    return sidecar_dir(data_dir) / DEFAULT_CACHE_DIRNAME
+
+
+def _encode_entry(table: StreamingHistory) -> bytes:
+    sections: list[tuple[str, bytes]] = [
+        ("ts", table.ts.tobytes()),
+        ("ms_played", table.ms_played.tobytes()),
+    ]
+    for key in ENCODED_KEYS:
+        codes, values = table.encoded(key)
+        encoded_values = [value.encode("utf-8") for value in values]
+        ends = array("q", accumulate(map(len, encoded_values)))
+        sections.append((f"{key}.codes", codes.tobytes()))
+        sections.append((f"{key}.ends", ends.tobytes()))
+        sections.append((f"{key}.values", b"".join(encoded_values)))
+
+    layout = {}
+    offset = 0
+    for name, payload in sections:
+        layout[name] = [offset, len(payload)]
+        offset = _aligned(offset + len(payload))
+    header = json.dumps(
+        {
+            "version": _FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "itemsizes": {"q": array("q").itemsize, "i": array("i").itemsize},
+            "rows": len(table),
+            "value_counts": {key: len(table.encoded(key)[1]) for key in ENCODED_KEYS},
+            "sections": layout,
+        }
+    ).encode("utf-8")
+
+    data_start = _aligned(len(_MAGIC) + _HEADER_LENGTH.size + len(header))
+    chunks = [_MAGIC, _HEADER_LENGTH.pack(len(header)), header]
+    position = len(_MAGIC) + _HEADER_LENGTH.size + len(header)
+    for name, payload in sections:
+        start = data_start + layout[name][0]
+        chunks.append(b"\0" * (start - position))
+        chunks.append(payload)
+        position = start + len(payload)
+    return b"".join(chunks)
+
+
+def _decode_entry(mapped: mmap.mmap) -> StreamingHistory:
+    if mapped[: len(_MAGIC)] != _MAGIC:
+        raise ValueError("Not a streaming history cache entry")
+    (header_length,) = _HEADER_LENGTH.unpack_from(mapped, len(_MAGIC))
+    header_start = len(_MAGIC) + _HEADER_LENGTH.size
+    header = json.loads(bytes(mapped[header_start:header_start + header_length]))
+    if (
+        header["version"] != _FORMAT_VERSION
+        or header["byteorder"] != sys.byteorder
+        or header["itemsizes"] != {"q": array("q").itemsize, "i": array("i").itemsize}
+    ):
+        raise ValueError("Incompatible streaming history cache entry")
+
+    data_start = _aligned(header_start + header_length)
+    view = memoryview(mapped)
+    try:
+        def section(name: str) -> memoryview:
+            offset, length = header["sections"][name]
+            return view[data_start + offset:data_start + offset + length]
+
+        def int_column(name: str, typecode: str) -> array:
+            column = array(typecode)
+            column.frombytes(section(name))
+            return column
+
+        rows = header["rows"]
+        ts = int_column("ts", "q")
+        ms_played = int_column("ms_played", "q")
+        encoded = {}
+        for key in ENCODED_KEYS:
+            codes = int_column(f"{key}.codes", "i")
+            ends = int_column(f"{key}.ends", "q")
+            blob = bytes(section(f"{key}.values"))
+            if (
+                len(codes) != rows
+                or len(ends) != header["value_counts"][key]
+                or (ends[-1] if ends else 0) != len(blob)
+            ):
+                raise ValueError("Corrupt streaming history cache entry")
+            values = [
+                blob[start:end].decode("utf-8") for start, end in zip(chain((0,), ends), ends)
+            ]
+            encoded[key] = (codes, values)
+        if len(ts) != rows or len(ms_played) != rows:
+            raise ValueError("Corrupt streaming history cache entry")
+    finally:
+        view.release()
+    return StreamingHistory.from_columns(ts, ms_played, encoded)
+
+
+def file_digest(path: Path | ArchiveMember) -> str:
+    """
+    Return the hex SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def atomic_write(path: Path, payload: bytes) -> None:
+    """
+    Replace ``path`` with ``payload`` so readers never see a partial file.
+    """
+    with atomic_open(path) as output:
+        output.write(payload)
+
+
+@contextmanager
+def atomic_open(path: str | Path, mode: str = "wb", encoding: str | None = None) -> Iterator[IO]:
+    """
+    Open a temporary file beside ``path`` that replaces it when the block succeeds.
+
+    If the block raises, the temporary file is removed and ``path`` is left untouched.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temporary = _create_temporary(path)
+    try:
+        with os.fdopen(handle, mode, encoding=encoding) as output:
+            yield output
+        os.replace(temporary, path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+
+
+def _create_temporary(path: Path) -> tuple[int, Path]:
+    """
+    Create a uniquely named file beside ``path`` with the mode ``open`` would give it.
+
+    Unlike ``tempfile.mkstemp``, which always uses 0o600, the current umask applies.
+    """
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0)
+    while True:
+        temporary = path.with_name(f".{path.name}.{secrets.token_hex(8)}")
+        try:
+            return os.open(temporary, flags, 0o666), temporary
+        except FileExistsError:
+            continue
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
@@ -0,0 +1,221 @@
+"""
+Deduplication of plays repeated across overlapping or re-downloaded exports.
+
+A play is identified by its ``ts``, ``spotify_track_uri`` and ``ms_played``,
+hashed to 64 bits. Exact mode keeps every hash seen in ``PlayKeySet``, a flat
+open-addressing table of 8-byte slots (about 16 bytes per play). Bloom mode
+reads the inputs twice: the first pass runs every hash through a
+``BloomFilter`` (about 1.2 bytes per play at a 1% false-positive rate) and
+keeps only the hashes it reports as possibly seen; the second pass verifies
+those candidates exactly, so no unique play is dropped.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from array import array
+from collections.abc import Collection, Iterable, Iterator, Mapping, Sequence
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+
+from spotify_gdpr_analysis.io.streaming_history import (
+    project_record,
+    streaming_history,
+    streaming_history_paths,
+)
+from spotify_gdpr_analysis.io.table import URI_KEY
+
+DEDUP_MODES = ("exact", "bloom")
+DEFAULT_ERROR_RATE = 0.01
+
+# A lower bound on the bytes per record in an export file, for sizing Bloom filters.
+_MIN_RECORD_BYTES = 200
+
+
+def play_key_hash(record: dict) -> int:
+    """
+    Return the nonzero 64-bit hash of a record's (``ts``, track URI, ``ms_played``) key.
+    """
+    key = f"{record.get('ts')}\x1f{record.get(URI_KEY)}\x1f{record.get('ms_played')}"
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class PlayKeySet:
+    """
+    Set of nonzero 64-bit hashes in a linear-probing table of 8-byte slots.
+
+    The table doubles when it is half full.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        size = 1 << max(4, (2 * capacity - 1).bit_length())
+        self._slots = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+
+    def add(self, key_hash: int) -> bool:
+        """
+        Add ``key_hash`` and return whether it was new.
+        """
+        slots = self._slots
+        mask = self._mask
+        index = key_hash & mask
+        while True:
+            slot = slots[index]
+            if slot == key_hash:
+                return False
+            if not slot:
+                break
+            index = (index + 1) & mask
+        slots[index] = key_hash
+        self._count += 1
+        if 2 * self._count > len(slots):
+            self._grow()
+        return True
+
+    def __contains__(self, key_hash: int) -> bool:
+        slots = self._slots
+        mask = self._mask
+        index = key_hash & mask
+        while True:
+            slot = slots[index]
+            if slot == key_hash:
+                return True
+            if not slot:
+                return False
+            index = (index + 1) & mask
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._slots) * self._slots.itemsize
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._slots = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._slots) - 1
+        self._count = 0
+        for key_hash in old:
+            if key_hash:
+                self.add(key_hash)
+
+
+class BloomFilter:
+    """
+    Bloom filter over 64-bit hashes, sized for ``capacity`` items at ``error_rate``.
+
+    Bit positions come from double hashing the two 32-bit halves of each hash.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE) -> None:
+        if not 0 < error_rate < 1:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+        capacity = max(1, capacity)
+        self.bit_count = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self._bits = bytearray((self.bit_count + 7) // 8)
+
+    def add(self, key_hash: int) -> bool:
+        """
+        Add ``key_hash`` and return whether it may have been added before.
+        """
+        bits = self._bits
+        bit_count = self.bit_count
+        first = key_hash & 0xFFFFFFFF
+        step = (key_hash >> 32) | 1
+        present = True
+        for round_number in range(self.hash_count):
+            position = (first + round_number * step) % bit_count
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+        return present
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+def deduplicate_plays(records: Iterable[dict], seen: PlayKeySet | None = None) -> Iterator[dict]:
+    """
+    Yield the first record of every distinct play key in ``records``, in order.
+
+    Passing the same ``seen`` set to several calls deduplicates across them.
+    """
+    seen = PlayKeySet() if seen is None else seen
+    add = seen.add
+    for record in records:
+        if add(play_key_hash(record)):
+            yield record
+
+
+def deduplicated_streaming_history(
+    data_dirs: str | Path | Sequence[str | Path],
+    mode: str = "exact",
+    start: datetime | str | None = None,
+    end: datetime | str | None = None,
+    where: Mapping[str, object] | None = None,
+    fields: Collection[str] | None = None,
+    expected_plays: int | None = None,
+    error_rate: float = DEFAULT_ERROR_RATE,
+) -> Iterator[dict]:
+    """
+    Yield the plays of one or more exports with repeated plays removed.
+
+    The first copy of each play is kept, in the order of ``data_dirs`` and of
+    the files within each. ``mode`` is ``"exact"`` or ``"bloom"``; the Bloom
+    filter is sized for ``expected_plays``, or an upper estimate from the file
+    sizes. ``start``, ``end`` and ``where`` filter the plays as in
+    ``streaming_history``; with ``fields``, each record keeps only those keys.
+    """
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown deduplication mode {mode!r}, expected one of {DEDUP_MODES}")
+    sources = [data_dirs] if isinstance(data_dirs, (str, Path)) else list(data_dirs)
+
+    def read() -> Iterator[dict]:
+        return chain.from_iterable(
+            streaming_history(source, start, end, where)
+            for source in sources
+        )
+
+    if mode == "exact":
+        records = deduplicate_plays(read())
+    else:
+        if expected_plays is None:
+            expected_plays = _estimate_plays(sources)
+        records = _bloom_deduplicate(read, expected_plays, error_rate)
+    if fields is None:
+        yield from records
+    else:
+        for record in records:
+            yield project_record(record, fields)
+
+
+def _bloom_deduplicate(read, expected_plays: int, error_rate: float) -> Iterator[dict]:
+    bloom = BloomFilter(expected_plays, error_rate)
+    candidates = PlayKeySet()
+    for record in read():
+        key_hash = play_key_hash(record)
+        if bloom.add(key_hash):
+            candidates.add(key_hash)
+    del bloom
+
+    kept = PlayKeySet(len(candidates))
+    for record in read():
+        key_hash = play_key_hash(record)
+        if key_hash in candidates and not kept.add(key_hash):
+            continue
+        yield record
+
+
+def _estimate_plays(sources: Iterable[str | Path]) -> int:
+    total_bytes = sum(
+        path.stat().st_size for source in sources for path in streaming_history_paths(source)
+    )
+    return max(1, total_bytes // _MIN_RECORD_BYTES)
@@ -0,0 +1,154 @@
+"""
+Incremental scanner for the top-level JSON array of a streaming history file.
+
+Records are decoded one element at a time from a sliding window of text, so
+callers see each record's position and byte offset, which the time index uses
+to seek straight to blocks of records.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from pathlib import Path
+from typing import BinaryIO, Generator
+
+from spotify_gdpr_analysis.io.archive import ArchiveMember
+
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+_JSON_TYPE_NAMES = {
+    "{": "dict",
+    "[": "list",
+    '"': "str",
+    "t": "bool",
+    "f": "bool",
+    "n": "NoneType",
+    "": "no data",
+}
+
+
+class BufferedText:
+    """
+    Sliding window of decoded text over a binary file handle.
+    """
+
+    def __init__(self, handle: BinaryIO, chunk_size: int, byte_start: int = 0) -> None:
+        self.text = ""
+        self.eof = False
+        self._handle = handle
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._byte_start = byte_start
+
+    def fill(self, pos: int) -> int:
+        """
+        Drop text before ``pos``, append the next chunk and return the new ``pos``.
+        """
+        self._byte_start += len(self.text[:pos].encode("utf-8"))
+        chunk = self._handle.read(self._chunk_size)
+        self.eof = not chunk
+        self.text = self.text[pos:] + self._decoder.decode(chunk, final=self.eof)
+        return 0
+
+    def skip_whitespace(self, pos: int) -> int:
+        while True:
+            pos = _WHITESPACE.match(self.text, pos).end()
+            if pos < len(self.text) or self.eof:
+                return pos
+            pos = self.fill(pos)
+
+    def byte_offset(self, pos: int) -> int:
+        return self._byte_start + len(self.text[:pos].encode("utf-8"))
+
+
+def iter_json_array(
+    reader: BufferedText, file_path: Path | ArchiveMember
+) -> Generator[tuple[int, dict], None, None]:
+    """
+    Yield ``(start, record)`` for each element of a top-level JSON array.
+
+    ``start`` is the record's position in ``reader.text`` and stays valid
+    until the generator is resumed.
+    """
+    pos = reader.skip_whitespace(0)
+    opening = reader.text[pos:pos + 1]
+    if opening != "[":
+        found = _JSON_TYPE_NAMES.get(opening, "number")
+        raise ValueError(
+            f"Expected a list of records in {file_path}, got {found} "
+            f"at byte {reader.byte_offset(pos)}"
+        )
+
+    pos = yield from iter_json_items(reader, file_path, reader.skip_whitespace(pos + 1))
+    pos = reader.skip_whitespace(pos + 1)
+    if pos < len(reader.text):
+        raise ValueError(
+            f"Unexpected data after records in {file_path} at byte {reader.byte_offset(pos)}"
+        )
+
+
+def iter_json_items(
+    reader: BufferedText,
+    file_path: Path | ArchiveMember,
+    pos: int,
+    idx: int = 0,
+    limit: int | None = None,
+) -> Generator[tuple[int, dict], None, int]:
+    """
+    Yield ``(start, record)`` for array elements from ``pos`` on, numbering them from ``idx``.
+
+    Stops after ``limit`` records or at the closing bracket, and returns the
+    position after the last separator read.
+    """
+    end_idx = None if limit is None else idx + limit
+    closed = reader.text[pos:pos + 1] == "]"
+    while not closed and idx != end_idx:
+        item, start, pos = _decode_value(reader, pos, file_path)
+        if not isinstance(item, dict):
+            raise ValueError(
+                f"Expected dict records in {file_path}, item {idx} is {type(item).__name__} "
+                f"at byte {reader.byte_offset(start)}"
+            )
+        yield start, item
+        idx += 1
+
+        pos = reader.skip_whitespace(pos)
+        separator = reader.text[pos:pos + 1]
+        if separator == ",":
+            pos = reader.skip_whitespace(pos + 1)
+        elif separator == "]":
+            closed = True
+        else:
+            raise ValueError(
+                f"Expected ',' or ']' after item {idx - 1} in {file_path} "
+                f"at byte {reader.byte_offset(pos)}"
+            )
+    return pos
+
+
+def _decode_value(
+    reader: BufferedText, pos: int, file_path: Path | ArchiveMember
+) -> tuple[object, int, int]:
+    """
+    Decode one JSON value starting at ``pos``, reading more input as needed.
+
+    Returns the value with its start and end positions in ``reader.text``.
+    """
+    while True:
+        try:
+            value, end = _DECODER.raw_decode(reader.text, pos)
+        except json.JSONDecodeError as error:
+            if reader.eof:
+                raise ValueError(
+                    f"Invalid JSON in {file_path} at byte {reader.byte_offset(error.pos)}: "
+                    f"{error.msg}"
+                ) from None
+        else:
+            # A value that ends exactly at the buffer edge may be a truncated number.
+            if end < len(reader.text) or reader.eof:
+                return value, pos, end
+        pos = reader.fill(pos)
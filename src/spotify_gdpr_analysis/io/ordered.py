@@ -0,0 +1,168 @@
+"""
+Globally time-ordered iteration over the files of a streaming history export.
+
+Export files are written roughly chronologically but their ``ts`` ranges may
+overlap, and records inside a file can be slightly out of order. Each file is
+streamed through a bounded reorder buffer and the buffered streams are merged
+lazily by ``ts``, so at most ``reorder_window + 1`` records per file are held
+at a time. Files whose sidecar time index shows records straying further are
+sorted in memory instead (see ``files_to_sort_in_memory``), and a record that
+still strays further raises ``OutOfOrderError``.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Collection, Iterable, Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from spotify_gdpr_analysis.io.archive import ArchiveMember
+from spotify_gdpr_analysis.io.streaming_history import (
+    iter_streaming_history_json,
+    project_record,
+    record_matches,
+    streaming_history_paths,
+    ts_bound,
+)
+from spotify_gdpr_analysis.io.time_index import BLOCK_RECORDS, indexed_streaming_history_paths
+
+DEFAULT_REORDER_WINDOW = 1024
+
+_TS_KEY = "ts"
+
+
+class OutOfOrderError(ValueError):
+    """
+    A record is further behind its source's time order than the reorder window.
+
+    ``source`` names the file or stream and ``index`` is the record's position in it.
+    """
+
+    def __init__(self, source: object, index: int, ts: str, window: int) -> None:
+        super().__init__(
+            f"Record {index} in {source} at {ts} is more than {window} records "
+            f"out of time order"
+        )
+        self.source = source
+        self.index = index
+
+
+def ordered_streaming_history(
+    data_dir: str | Path,
+    start: datetime | str | None = None,
+    end: datetime | str | None = None,
+    fields: Collection[str] | None = None,
+    reorder_window: int = DEFAULT_REORDER_WINDOW,
+    where: Mapping[str, object] | None = None,
+    sort_in_memory: Collection[Path | ArchiveMember] = (),
+) -> Iterator[dict]:
+    """
+    Yield the records of ``data_dir`` in ``ts`` order across all export files.
+
+    Files are read concurrently, one buffered stream each. A record that is
+    more than ``reorder_window`` records behind its file's time order raises
+    ``OutOfOrderError``; files in ``sort_in_memory``, such as those from
+    ``files_to_sort_in_memory``, are instead read whole and sorted. Records
+    with equal ``ts`` keep file order, then their order within the file.
+    ``start`` (inclusive) and ``end`` (exclusive) bound the
+    play timestamps and ``where`` filters the plays as in
+    ``streaming_history``, without using the time index. With ``fields``, each
+    record keeps only those keys.
+    """
+    start_ts = ts_bound(start)
+    end_ts = ts_bound(end)
+    paths = streaming_history_paths(data_dir)
+    streams = [iter_streaming_history_json(path) for path in paths]
+    for record in merge_by_ts(streams, reorder_window, paths, sort_in_memory):
+        if end_ts is not None and record[_TS_KEY] >= end_ts:
+            return
+        if start_ts is not None and record[_TS_KEY] < start_ts:
+            continue
+        if not record_matches(record, where):
+            continue
+        yield record if fields is None else project_record(record, fields)
+
+
+def files_to_sort_in_memory(
+    data_dir: str | Path, reorder_window: int = DEFAULT_REORDER_WINDOW
+) -> list[Path | ArchiveMember]:
+    """
+    Return the export files of ``data_dir`` that the time index shows out of order.
+
+    A file is listed when a block of ``BLOCK_RECORDS`` records starts before the
+    latest ``ts`` of a block more than ``reorder_window`` records earlier. Disorder
+    within fewer records than a block is not visible in the index.
+    """
+    lag = reorder_window // BLOCK_RECORDS
+    unordered = []
+    for path, entry in indexed_streaming_history_paths(data_dir):
+        blocks = entry["blocks"]
+        latest = None
+        for number, (_, _, min_ts, _) in enumerate(blocks):
+            earlier = number - lag - 1
+            if earlier >= 0 and blocks[earlier][3] is not None:
+                latest = blocks[earlier][3] if latest is None else max(latest, blocks[earlier][3])
+            if latest is not None and min_ts is not None and min_ts < latest:
+                unordered.append(path)
+                break
+    return unordered
+
+
+def merge_by_ts(
+    streams: Iterable[Iterable[dict]],
+    reorder_window: int = DEFAULT_REORDER_WINDOW,
+    sources: Iterable[str | Path | ArchiveMember] | None = None,
+    sort_in_memory: Collection[str | Path | ArchiveMember] = (),
+) -> Iterator[dict]:
+    """
+    Lazily merge record streams that are each in ``ts`` order to within ``reorder_window``.
+
+    ``sources`` names the streams in error messages. Streams whose source is in
+    ``sort_in_memory`` are read whole and sorted instead.
+    """
+    if reorder_window < 0:
+        raise ValueError(f"reorder_window must not be negative, got {reorder_window}")
+    streams = list(streams)
+    names = [f"stream {idx}" for idx in range(len(streams))] if sources is None else list(sources)
+    reordered = [
+        _sorted(stream, name) if name in sort_in_memory else _reorder(stream, reorder_window, name)
+        for stream, name in zip(streams, names)
+    ]
+    return heapq.merge(*reordered, key=lambda record: record[_TS_KEY])
+
+
+def _reorder(records: Iterable[dict], window: int, source: object) -> Iterator[dict]:
+    """
+    Yield ``records`` sorted by ``ts`` using a heap of at most ``window + 1`` records.
+    """
+    heap: list[tuple[str, int, dict]] = []
+    emitted: str | None = None
+    for idx, record in enumerate(records):
+        ts = _record_ts(record, idx, source)
+        if emitted is not None and ts < emitted:
+            raise OutOfOrderError(source, idx, ts, window)
+        heapq.heappush(heap, (ts, idx, record))
+        if len(heap) > window:
+            emitted, _, item = heapq.heappop(heap)
+            yield item
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def _sorted(records: Iterable[dict], source: object) -> Iterator[dict]:
+    """
+    Yield ``records`` sorted by ``ts`` after reading all of them.
+    """
+    keyed = [(_record_ts(record, idx, source), idx, record) for idx, record in enumerate(records)]
+    keyed.sort(key=lambda item: item[:2])
+    for _, _, record in keyed:
+        yield record
+
+
+def _record_ts(record: dict, idx: int, source: object) -> str:
+    ts = record.get(_TS_KEY)
+    if not isinstance(ts, str):
+        raise ValueError(f"Record {idx} in {source} has no {_TS_KEY!r} timestamp")
+    return ts
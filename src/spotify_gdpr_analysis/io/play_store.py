@@ -0,0 +1,425 @@
+"""
+SQLite-backed store of streaming history plays for repeated and filtered queries.
+
+Exports are ingested once into a local database with artists, albums and
+tracks normalized into their own tables. Each play keeps its UTC epoch and its
+local calendar fields, and plays are indexed by timestamp and by artist, so
+analyses run as SQL aggregates (see ``analysis.sql``) without re-parsing JSON.
+Re-ingesting only reads export files that are new or changed. Each play also
+keeps its position in the export, by file order and record index, so ties
+break the same way however often files were re-ingested.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from spotify_gdpr_analysis.io.archive import ArchiveMember, export_source
+from spotify_gdpr_analysis.io.streaming_history import (
+    iter_streaming_history_json,
+    streaming_history_paths,
+    ts_bound,
+)
+from spotify_gdpr_analysis.io.table import (
+    ALBUM_KEY,
+    ARTIST_KEY,
+    TRACK_KEY,
+    URI_KEY,
+    format_epoch_seconds,
+    parse_epoch_seconds,
+)
+from spotify_gdpr_analysis.profiling import Profiler, profile_stage
+
+_SCHEMA_VERSION = 2
+_BATCH_SIZE = 10_000
+# A play's position is its file's position times this stride plus its record index.
+_POSITION_STRIDE = 1 << 32
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artists (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS albums (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    artist_id INTEGER REFERENCES artists (id)
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    artist_id INTEGER REFERENCES artists (id)
+);
+CREATE TABLE IF NOT EXISTS plays (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES sources (id),
+    position INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    ms_played INTEGER,
+    track_id INTEGER REFERENCES tracks (id),
+    artist_id INTEGER REFERENCES artists (id),
+    album_id INTEGER REFERENCES albums (id),
+    track_uri TEXT,
+    skipped INTEGER,
+    day_number INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    weekday INTEGER NOT NULL,
+    iso_year INTEGER NOT NULL,
+    iso_week INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plays_ts ON plays (ts);
+CREATE INDEX IF NOT EXISTS plays_artist_ts ON plays (artist_id, ts);
+CREATE INDEX IF NOT EXISTS plays_source ON plays (source_id);
+"""
+
+
+@dataclass
+class StoreUpdate:
+    """
+    Outcome of ``PlayStore.ingest``.
+    """
+
+    reused: list[Path | ArchiveMember] = field(default_factory=list)
+    ingested: list[Path | ArchiveMember] = field(default_factory=list)
+    dropped: int = 0
+
+
+@dataclass(frozen=True)
+class PlaySelection:
+    """
+    The plays of a store within ``[start, end)`` and, optionally, by one artist
+    or of at least ``min_ms_played`` milliseconds.
+
+    Analyses given a selection run as SQL aggregates over exactly these plays.
+    """
+
+    store: PlayStore
+    start: int | None = None
+    end: int | None = None
+    artist: str | None = None
+    min_ms_played: int | None = None
+
+    def where(self) -> tuple[str, list]:
+        """
+        Return a SQL condition on ``plays`` selecting these plays, and its parameters.
+        """
+        clauses = ["1"]
+        params: list = []
+        if self.start is not None:
+            clauses.append("plays.ts >= ?")
+            params.append(self.start)
+        if self.end is not None:
+            clauses.append("plays.ts < ?")
+            params.append(self.end)
+        if self.artist is not None:
+            clauses.append("plays.artist_id = (SELECT id FROM artists WHERE name = ?)")
+            params.append(self.artist)
+        if self.min_ms_played is not None:
+            clauses.append("COALESCE(plays.ms_played, 0) >= ?")
+            params.append(self.min_ms_played)
+        return " AND ".join(clauses), params
+
+    def records(self) -> Iterator[dict]:
+        """
+        Yield the selected plays as export records, in export order.
+        """
+        condition, params = self.where()
+        rows = self.store.connection.execute(
+            f"""
+            SELECT plays.ts, plays.ms_played, tracks.name, artists.name, albums.name,
+                   plays.track_uri, plays.skipped
+            FROM plays
+            LEFT JOIN tracks ON tracks.id = plays.track_id
+            LEFT JOIN artists ON artists.id = plays.artist_id
+            LEFT JOIN albums ON albums.id = plays.album_id
+            WHERE {condition}
+            ORDER BY plays.position
+            """,
+            params,
+        )
+        for ts, ms_played, track, artist, album, uri, skipped in rows:
+            yield {
+                "ts": format_epoch_seconds(ts),
+                "ms_played": ms_played,
+                TRACK_KEY: track,
+                ARTIST_KEY: artist,
+                ALBUM_KEY: album,
+                URI_KEY: uri,
+                "skipped": None if skipped is None else bool(skipped),
+            }
+
+    def __len__(self) -> int:
+        condition, params = self.where()
+        return self.store.connection.execute(
+            f"SELECT COUNT(*) FROM plays WHERE {condition}", params
+        ).fetchone()[0]
+
+
+class PlayStore:
+    """
+    A SQLite database of ingested plays.
+
+    Local calendar fields are computed at ingestion in the report time zone.
+    Use as a context manager, or call ``close`` when done.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        version = self._schema_version()
+        if version is not None and version != _SCHEMA_VERSION:
+            self.connection.close()
+            raise ValueError(f"Unsupported play store schema version in {self.path}: {version}")
+        with self.connection:
+            self.connection.executescript(_SCHEMA)
+            self.connection.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (str(_SCHEMA_VERSION),),
+            )
+
+    def __enter__(self) -> PlayStore:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def ingest(self, data_dir: str | Path, profiler: Profiler | None = None) -> StoreUpdate:
+        """
+        Bring the store in line with the export files in ``data_dir``.
+
+        Files with an unchanged size and mtime are kept; new and changed files
+        are parsed and their plays replaced; plays of files no longer present
+        are dropped, along with artists, albums and tracks left without plays.
+        """
+        update = StoreUpdate()
+        known = {
+            path: (source_id, size, mtime_ns, position)
+            for source_id, path, size, mtime_ns, position in self.connection.execute(
+                "SELECT id, path, size, mtime_ns, position FROM sources"
+            )
+        }
+        paths = streaming_history_paths(data_dir)
+        current = set()
+        replaced = False
+        with self.connection:
+            for position, path in enumerate(paths):
+                source = export_source(path)
+                key = str(source.resolve())
+                current.add(key)
+                stat = source.stat()
+                entry = known.get(key)
+                if entry and entry[1:3] == (stat.st_size, stat.st_mtime_ns):
+                    if entry[3] != position:
+                        self._move_source(entry[0], position)
+                    update.reused.append(path)
+                    continue
+                if entry:
+                    self._drop_source(entry[0])
+                    replaced = True
+                source_id = self.connection.execute(
+                    "INSERT INTO sources (path, size, mtime_ns, position) VALUES (?, ?, ?, ?)",
+                    (key, stat.st_size, stat.st_mtime_ns, position),
+                ).lastrowid
+                with profile_stage(profiler, f"store ingest {path.name}") as stage:
+                    count = self._insert_plays(
+                        source_id, position, iter_streaming_history_json(path)
+                    )
+                    if stage is not None:
+                        stage.records = count
+                update.ingested.append(path)
+            for key, (source_id, *_) in known.items():
+                if key not in current:
+                    update.dropped += self._drop_source(source_id)
+            if replaced or update.dropped:
+                self._drop_orphans()
+        return update
+
+    def select(
+        self,
+        start: datetime | str | None = None,
+        end: datetime | str | None = None,
+        artist: str | None = None,
+        min_ms_played: int | None = None,
+    ) -> PlaySelection:
+        """
+        Return the plays with ``start <= ts < end``, optionally by ``artist`` alone.
+
+        Bounds are interpreted as in ``streaming_history``. With
+        ``min_ms_played``, shorter plays are left out.
+        """
+        start_ts = ts_bound(start)
+        end_ts = ts_bound(end)
+        return PlaySelection(
+            self,
+            None if start_ts is None else parse_epoch_seconds(start_ts),
+            None if end_ts is None else parse_epoch_seconds(end_ts),
+            artist,
+            min_ms_played,
+        )
+
+    def query(self, sql: str, params: Sequence | dict = ()) -> list[tuple]:
+        """
+        Run an ad-hoc read query against the store's tables and return its rows.
+        """
+        return self.connection.execute(sql, params).fetchall()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM plays").fetchone()[0]
+
+    def _schema_version(self) -> int | None:
+        try:
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'schema_version'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return None if row is None else int(row[0])
+
+    def _drop_source(self, source_id: int) -> int:
+        dropped = self.connection.execute(
+            "DELETE FROM plays WHERE source_id = ?", (source_id,)
+        ).rowcount
+        self.connection.execute("DELETE FROM sources WHERE id = ?", (source_id,))
+        return dropped
+
+    def _move_source(self, source_id: int, position: int) -> None:
+        execute = self.connection.execute
+        execute("UPDATE sources SET position = ? WHERE id = ?", (position, source_id))
+        execute(
+            "UPDATE plays SET position = ? + position % ? WHERE source_id = ?",
+            (position * _POSITION_STRIDE, _POSITION_STRIDE, source_id),
+        )
+
+    def _drop_orphans(self) -> None:
+        """
+        Delete the tracks, albums and artists that no play refers to any more.
+        """
+        execute = self.connection.execute
+        for table, column in (("tracks", "track_id"), ("albums", "album_id")):
+            execute(
+                f"DELETE FROM {table} WHERE id NOT IN "
+                f"(SELECT {column} FROM plays WHERE {column} IS NOT NULL)"
+            )
+        execute(
+            "DELETE FROM artists WHERE id NOT IN "
+            "(SELECT artist_id FROM plays WHERE artist_id IS NOT NULL) "
+            "AND id NOT IN (SELECT artist_id FROM tracks WHERE artist_id IS NOT NULL) "
+            "AND id NOT IN (SELECT artist_id FROM albums WHERE artist_id IS NOT NULL)"
+        )
+
+    def _insert_plays(self, source_id: int, position: int, records: Iterable[dict]) -> int:
+        from spotify_gdpr_analysis.analysis.timestamps import (
+            DEFAULT_TIMEZONE,
+            local_time_converter,
+        )
+
+        converter = local_time_converter(DEFAULT_TIMEZONE)
+        execute = self.connection.execute
+        artists = dict(execute("SELECT name, id FROM artists"))
+        albums = {
+            (name, artist): id_
+            for id_, name, artist in execute("SELECT id, name, artist_id FROM albums")
+        }
+        tracks = {
+            (name, artist): id_
+            for id_, name, artist in execute("SELECT id, name, artist_id FROM tracks")
+        }
+        new_artists: list[tuple[int, str]] = []
+        new_albums: list[tuple[int, str, int | None]] = []
+        new_tracks: list[tuple[int, str, int | None]] = []
+        next_ids = [
+            execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0] + 1
+            for table in ("artists", "albums", "tracks")
+        ]
+
+        def lookup(ids: dict, key, new_rows: list, slot: int, row: tuple) -> int:
+            id_ = ids.get(key)
+            if id_ is None:
+                id_ = ids[key] = next_ids[slot]
+                next_ids[slot] += 1
+                new_rows.append((id_, *row))
+            return id_
+
+        count = 0
+        batch = []
+        first_position = position * _POSITION_STRIDE
+        for index, record in enumerate(records):
+            epoch = parse_epoch_seconds(record.get("ts"))
+            day, hour = converter.local_day_and_hour(epoch)
+            artist_name = record.get(ARTIST_KEY) or None
+            album_name = record.get(ALBUM_KEY) or None
+            track_name = record.get(TRACK_KEY) or None
+            artist_id = None
+            if artist_name:
+                artist_id = lookup(artists, artist_name, new_artists, 0, (artist_name,))
+            album_id = None
+            if album_name:
+                album_id = lookup(
+                    albums, (album_name, artist_id), new_albums, 1, (album_name, artist_id)
+                )
+            track_id = None
+            if track_name:
+                track_id = lookup(
+                    tracks, (track_name, artist_id), new_tracks, 2, (track_name, artist_id)
+                )
+            skipped = record.get("skipped")
+            batch.append((
+                source_id,
+                first_position + index,
+                epoch,
+                record.get("ms_played"),
+                track_id,
+                artist_id,
+                album_id,
+                record.get(URI_KEY) or None,
+                None if skipped is None else int(bool(skipped)),
+                day.day_number,
+                day.year,
+                day.month,
+                hour,
+                day.weekday,
+                day.iso_year,
+                day.iso_week,
+            ))
+            if len(batch) >= _BATCH_SIZE:
+                count += self._flush(batch, new_artists, new_albums, new_tracks)
+        count += self._flush(batch, new_artists, new_albums, new_tracks)
+        return count
+
+    def _flush(
+        self,
+        plays: list[tuple],
+        artists: list[tuple],
+        albums: list[tuple],
+        tracks: list[tuple],
+    ) -> int:
+        executemany = self.connection.executemany
+        executemany("INSERT INTO artists (id, name) VALUES (?, ?)", artists)
+        executemany("INSERT INTO albums (id, name, artist_id) VALUES (?, ?, ?)", albums)
+        executemany("INSERT INTO tracks (id, name, artist_id) VALUES (?, ?, ?)", tracks)
+        executemany(
+            "INSERT INTO plays (source_id, position, ts, ms_played, track_id, artist_id, "
+            "album_id, track_uri, skipped, day_number, year, month, hour, weekday, iso_year, "
+            "iso_week) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            plays,
+        )
+        count = len(plays)
+        for rows in (plays, artists, albums, tracks):
+            rows.clear()
+        return count
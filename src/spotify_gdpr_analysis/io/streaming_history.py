@@ -1,40 +1,129 @@
 from __future__ import annotations
 
-import json
+from collections.abc import Callable, Collection, Mapping
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Iterator
 
+from spotify_gdpr_analysis.io.archive import (
+    ArchiveMember,
+    archive_members,
+    export_source,
+    is_export_archive,
+)
+from spotify_gdpr_analysis.io.json_array import CHUNK_SIZE, BufferedText, iter_json_array
+
+_EXPORT_PATTERN = "Streaming_History_Audio_*.json"
+_TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
 def load_streaming_history_json(path: str | Path) -> list[dict]:
     """
     Load a streaming history JSON file and validate contents.
     """
+    return list(iter_streaming_history_json(path))
+
+def iter_streaming_history_json(
+    path: str | Path | ArchiveMember,
+    chunk_size: int = CHUNK_SIZE,
+    fields: Collection[str] | None = None,
+) -> Iterator[dict]:
+    """
+    Lazily yield validated records from a streaming history JSON file.
+
+    The top-level array is decoded one element at a time from a buffered read,
+    so memory use stays constant regardless of file size. Errors report the
+    byte offset at which they were detected. Archive members are decompressed
+    as they are read. With ``fields``, each record keeps only those keys;
+    projecting copies every decoded record, so it only pays off where the
+    records are kept, such as in a list.
+    """
+    file_path = export_source(path)
+    with file_path.open("rb") as handle:
+        items = iter_json_array(BufferedText(handle, chunk_size), file_path)
+        if fields is None:
+            for _, item in items:
+                yield item
+        else:
+            for _, item in items:
+                yield project_record(item, fields)
+
+def streaming_history_paths(data_dir: str | Path) -> list[Path | ArchiveMember]:
+    """
+    Return the streaming history JSON files in ``data_dir`` in processing order.
 
-    # Load file
-    
-    file_path = Path(path)
-    with file_path.open("r") as handle:
-        data = json.load(handle)
+    ``data_dir`` may also be the ZIP archive of an export, in which case its
+    matching members are returned wherever they sit in the archive.
+    """
+    if is_export_archive(data_dir):
+        return archive_members(data_dir, _EXPORT_PATTERN)
+    return sorted(Path(data_dir).glob(_EXPORT_PATTERN))
 
-    # Validate json format
+def project_record(record: dict, fields: Collection[str]) -> dict:
+    """
+    Return the entries of ``record`` whose keys are in ``fields``.
+    """
+    return {key: record[key] for key in fields if key in record}
 
-    if not isinstance(data, list):
-        raise ValueError(f"Expected a list of records in {file_path}, got {type(data).__name__}")
-    
-    for idx, item in enumerate(data):
-        if not isinstance(item, dict):
-            raise ValueError(
-                f"Expected dict records in {file_path}, item {idx} is {type(item).__name__}"
-            )
-    
-    return data
 
-def streaming_history(data_dir: str | Path) -> Iterator[dict]:
+def min_duration_filter(min_ms_played: int) -> dict[str, Callable[[object], bool]]:
+    """
+    Return a ``where`` filter keeping plays of at least ``min_ms_played`` milliseconds.
+    """
+    return {"ms_played": lambda ms_played: (ms_played or 0) >= min_ms_played}
+
+
+def ts_bound(value: datetime | str | None) -> str | None:
+    """
+    Return a ``start`` or ``end`` bound in the export ``ts`` format, which orders like the instant.
+
+    Naive values are taken as UTC.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime(_TS_FORMAT)
+
+
+def record_matches(record: dict, where: Mapping[str, object] | None) -> bool:
+    """
+    Return whether ``record`` passes a ``where`` filter as ``streaming_history`` applies it.
+    """
+    if not where:
+        return True
+    for field, expected in where.items():
+        value = record.get(field)
+        if not (expected(value) if callable(expected) else value == expected):
+            return False
+    return True
+
+
+def streaming_history(
+    data_dir: str | Path,
+    start: datetime | str | None = None,
+    end: datetime | str | None = None,
+    where: Mapping[str, object] | None = None,
+    fields: Collection[str] | None = None,
+) -> Iterator[dict]:
     """
     Iterate over streaming history JSON files and yield contents.
+
+    ``data_dir`` is an export directory or the export's ZIP archive.
+
+    ``start`` (inclusive) and ``end`` (exclusive) bound the play timestamps;
+    naive values are taken as UTC. ``where`` maps field names to a required
+    value or to a predicate called with the field's value. When any filter is
+    given, a sidecar time index lets whole files and blocks of records outside
+    the window be skipped without parsing (see ``io.time_index``). With
+    ``fields``, each record keeps only those keys, as in ``analysis_fields``.
     """
-    base = Path(data_dir)
-    streaming_history_paths = sorted(base.glob("Streaming_History_Audio_*.json"))
+    if start is not None or end is not None or where:
+        from spotify_gdpr_analysis.io.time_index import filtered_streaming_history
+
+        yield from filtered_streaming_history(data_dir, start, end, where, fields)
+        return
+    for path in streaming_history_paths(data_dir):
+        yield from iter_streaming_history_json(path, fields=fields)
 
-    for path in streaming_history_paths:
-        records = load_streaming_history_json(path)
-        yield from records
@@ -0,0 +1,198 @@
+"""
+Compact columnar storage for streaming history records.
+
+Timestamps and play durations are stored as typed integer arrays, and the
+repetitive string fields are dictionary-encoded: each row holds an integer code
+that indexes a per-column lookup table of distinct values.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from spotify_gdpr_analysis.io.streaming_history import (
+    iter_streaming_history_json,
+    streaming_history,
+    streaming_history_paths,
+)
+from spotify_gdpr_analysis.profiling import Profiler
+
+TRACK_KEY = "master_metadata_track_name"
+ARTIST_KEY = "master_metadata_album_artist_name"
+ALBUM_KEY = "master_metadata_album_album_name"
+URI_KEY = "spotify_track_uri"
+ENCODED_KEYS = (TRACK_KEY, ARTIST_KEY, ALBUM_KEY, URI_KEY)
+TABLE_FIELDS = ("ts", "ms_played", *ENCODED_KEYS)
+
+MISSING = -1
+MS_PER_MINUTE = 60_000
+
+
+class StreamingHistory:
+    """
+    Columnar, dictionary-encoded table of streaming history plays.
+
+    ``ts`` holds UTC epoch seconds and ``ms_played`` the play duration, both as
+    int64 arrays. Track, artist, album and URI columns hold int32 codes into
+    the lookup lists returned by ``encoded``; missing or empty values are
+    stored as ``MISSING``.
+    """
+
+    def __init__(self) -> None:
+        self.ts = array("q")
+        self.ms_played = array("q")
+        self._codes = {key: array("i") for key in ENCODED_KEYS}
+        self._values: dict[str, list[str]] = {key: [] for key in ENCODED_KEYS}
+        self._interned: dict[str, dict[str, int]] = {key: {} for key in ENCODED_KEYS}
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> StreamingHistory:
+        """
+        Build a table from an iterable of raw export records.
+        """
+        table = cls()
+        table.extend(records)
+        return table
+
+    def extend(self, records: Iterable[dict]) -> None:
+        """
+        Append raw export records to the table.
+        """
+        ts_column = self.ts
+        ms_column = self.ms_played
+        columns = [
+            (key, self._codes[key], self._values[key], self._interned[key])
+            for key in ENCODED_KEYS
+        ]
+        for record in records:
+            ts_column.append(parse_epoch_seconds(record.get("ts")))
+            ms_column.append(record.get("ms_played") or 0)
+            for key, codes, values, interned in columns:
+                value = record.get(key)
+                if not value:
+                    codes.append(MISSING)
+                    continue
+                code = interned.get(value)
+                if code is None:
+                    code = interned[value] = len(values)
+                    values.append(value)
+                codes.append(code)
+
+    @classmethod
+    def from_columns(
+        cls,
+        ts: array,
+        ms_played: array,
+        encoded: dict[str, tuple[array, list[str]]],
+    ) -> StreamingHistory:
+        """
+        Build a table around existing columns, as returned by ``encoded``.
+        """
+        table = cls()
+        table.ts = ts
+        table.ms_played = ms_played
+        for key in ENCODED_KEYS:
+            codes, values = encoded[key]
+            table._codes[key] = codes
+            table._values[key] = values
+            table._interned[key] = {value: code for code, value in enumerate(values)}
+        return table
+
+    def extend_table(self, other: StreamingHistory) -> None:
+        """
+        Append the rows of another table, re-encoding its codes into this one.
+        """
+        self.ts.extend(other.ts)
+        self.ms_played.extend(other.ms_played)
+        for key in ENCODED_KEYS:
+            other_codes, other_values = other.encoded(key)
+            codes = self._codes[key]
+            values = self._values[key]
+            interned = self._interned[key]
+            if not values:
+                codes.extend(other_codes)
+                values.extend(other_values)
+                interned.update(other._interned[key])
+                continue
+            remap = []
+            for value in other_values:
+                code = interned.get(value)
+                if code is None:
+                    code = interned[value] = len(values)
+                    values.append(value)
+                remap.append(code)
+            codes.extend(MISSING if code == MISSING else remap[code] for code in other_codes)
+
+    def take(self, rows: Iterable[int]) -> StreamingHistory:
+        """
+        Return a new table holding the given rows, in the given order.
+        """
+        rows = list(rows)
+        ts = self.ts
+        ms_played = self.ms_played
+        encoded = {
+            key: (array("i", [codes[row] for row in rows]), list(self._values[key]))
+            for key, codes in self._codes.items()
+        }
+        return StreamingHistory.from_columns(
+            array("q", [ts[row] for row in rows]),
+            array("q", [ms_played[row] for row in rows]),
+            encoded,
+        )
+
+    def encoded(self, key: str) -> tuple[array, list[str]]:
+        """
+        Return the ``(codes, values)`` pair for a dictionary-encoded column.
+        """
+        return self._codes[key], self._values[key]
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __iter__(self) -> Iterator[dict]:
+        """
+        Yield rows as record dicts holding only the stored fields.
+        """
+        columns = [
+            (key, self._codes[key], self._values[key]) for key in ENCODED_KEYS
+        ]
+        for row, (epoch, ms_played) in enumerate(zip(self.ts, self.ms_played)):
+            record = {"ts": format_epoch_seconds(epoch), "ms_played": ms_played}
+            for key, codes, values in columns:
+                code = codes[row]
+                record[key] = None if code == MISSING else values[code]
+            yield record
+
+
+def streaming_history_table(
+    data_dir: str | Path, profiler: Profiler | None = None
+) -> StreamingHistory:
+    """
+    Load every streaming history file in ``data_dir`` into a columnar table.
+
+    With a ``profiler``, each file is loaded as its own stage.
+    """
+    if profiler is None:
+        return StreamingHistory.from_records(streaming_history(data_dir, fields=TABLE_FIELDS))
+    table = StreamingHistory()
+    for path in streaming_history_paths(data_dir):
+        with profiler.stage(f"load {path.name}") as stage:
+            part = StreamingHistory.from_records(iter_streaming_history_json(path, fields=TABLE_FIELDS))
+            table.extend_table(part)
+            stage.records = len(part)
+    return table
+
+
+def parse_epoch_seconds(timestamp: str) -> int:
+    """
+    Convert an export ``ts`` string such as ``2024-01-31T23:59:59Z`` to epoch seconds.
+    """
+    return int(datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp())
+
+
+def format_epoch_seconds(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
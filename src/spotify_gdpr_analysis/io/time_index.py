@@ -0,0 +1,220 @@
+"""
+Sidecar time index for filtered reads of streaming history exports.
+
+The index records, per export file, its size and mtime, its overall min and
+max ``ts``, and blocks of ``BLOCK_RECORDS`` consecutive records with the byte
+offset of the first record and the block's min and max ``ts``. A filtered read
+skips files whose range misses the window and seeks past blocks that do, so
+only overlapping blocks are parsed. Files without a valid entry are parsed in
+full once and indexed on the way.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Collection, Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from spotify_gdpr_analysis.io.archive import ArchiveMember, is_export_archive
+from spotify_gdpr_analysis.io.cache import atomic_write
+from spotify_gdpr_analysis.io.json_array import (
+    CHUNK_SIZE,
+    BufferedText,
+    iter_json_array,
+    iter_json_items,
+)
+from spotify_gdpr_analysis.io.streaming_history import (
+    project_record,
+    record_matches,
+    streaming_history_paths,
+    ts_bound,
+)
+
+INDEX_FILENAME = ".spotify_gdpr_ts_index.json"
+BLOCK_RECORDS = 1024
+
+_INDEX_VERSION = 1
+
+
+def filtered_streaming_history(
+    data_dir: str | Path,
+    start: datetime | str | None = None,
+    end: datetime | str | None = None,
+    where: Mapping[str, object] | None = None,
+    fields: Collection[str] | None = None,
+) -> Iterator[dict]:
+    """
+    Yield the records of ``data_dir`` with ``start <= ts < end`` that match ``where``.
+
+    Records are projected to ``fields`` after filtering, so ``where`` may test
+    fields that are not kept.
+
+    See ``streaming_history`` for the filter semantics. The index is kept in
+    ``data_dir / INDEX_FILENAME``, or next to a ZIP archive as
+    ``<archive name><INDEX_FILENAME>``; if it cannot be written, reads still
+    work but files are parsed in full.
+    """
+    start_ts = ts_bound(start)
+    end_ts = ts_bound(end)
+    index_path, paths, index = _load_index(data_dir)
+    for path in paths:
+        entry = _fresh_entry(path, index)
+        fresh = entry is not None
+        if fresh:
+            records = _iter_indexed_blocks(path, entry, start_ts, end_ts)
+        else:
+            entry = _new_entry(path)
+            records = _iter_and_index(path, entry)
+        for record in records:
+            if _in_window(record.get("ts"), start_ts, end_ts) and record_matches(record, where):
+                yield record if fields is None else project_record(record, fields)
+        if not fresh:
+            index[path.name] = entry
+            _write_index(index_path, index)
+
+
+def indexed_streaming_history_paths(
+    data_dir: str | Path,
+) -> list[tuple[Path | ArchiveMember, dict]]:
+    """
+    Return each export file of ``data_dir`` in processing order with its index entry.
+
+    An entry holds ``min_ts``, ``max_ts`` and ``blocks`` of ``[offset, count,
+    min_ts, max_ts]``. Files without a valid entry are parsed and indexed first.
+    """
+    index_path, paths, index = _load_index(data_dir)
+    indexed = []
+    changed = False
+    for path in paths:
+        entry = _fresh_entry(path, index)
+        if entry is None:
+            entry = _new_entry(path)
+            for _ in _iter_and_index(path, entry):
+                pass
+            index[path.name] = entry
+            changed = True
+        indexed.append((path, entry))
+    if changed:
+        _write_index(index_path, index)
+    return indexed
+
+
+def _load_index(data_dir: str | Path) -> tuple[Path, list[Path | ArchiveMember], dict]:
+    """
+    Return the index path, the export files and the index entries of files still present.
+    """
+    base = Path(data_dir)
+    if is_export_archive(base):
+        index_path = base.with_name(base.name + INDEX_FILENAME)
+    else:
+        index_path = base / INDEX_FILENAME
+    paths = streaming_history_paths(base)
+    names = {path.name for path in paths}
+    index = {name: entry for name, entry in _read_index(index_path).items() if name in names}
+    return index_path, paths, index
+
+
+def _fresh_entry(path: Path | ArchiveMember, index: dict) -> dict | None:
+    stat = path.stat()
+    entry = index.get(path.name)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry
+    return None
+
+
+def _new_entry(path: Path | ArchiveMember) -> dict:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _iter_indexed_blocks(
+    path: Path | ArchiveMember, entry: dict, start_ts: str | None, end_ts: str | None
+) -> Iterator[dict]:
+    """
+    Yield the records of the blocks of ``path`` that overlap the window.
+
+    Adjacent overlapping blocks are read as one run from a single seek. In an
+    archive member, seeking forward decompresses and discards the bytes
+    skipped, which still avoids parsing them.
+    """
+    if not _overlaps(entry["min_ts"], entry["max_ts"], start_ts, end_ts):
+        return
+    runs: list[list[int]] = []
+    for block_number, (offset, count, min_ts, max_ts) in enumerate(entry["blocks"]):
+        if not _overlaps(min_ts, max_ts, start_ts, end_ts):
+            continue
+        if runs and runs[-1][3] == block_number - 1:
+            runs[-1][1] += count
+            runs[-1][3] = block_number
+        else:
+            runs.append([offset, count, block_number, block_number])
+
+    with path.open("rb") as handle:
+        for offset, count, first_block, _ in runs:
+            handle.seek(offset)
+            reader = BufferedText(handle, CHUNK_SIZE, byte_start=offset)
+            pos = reader.skip_whitespace(0)
+            for _, item in iter_json_items(reader, path, pos, first_block * BLOCK_RECORDS, count):
+                yield item
+
+
+def _iter_and_index(path: Path | ArchiveMember, entry: dict) -> Iterator[dict]:
+    """
+    Yield every record of ``path`` and fill ``entry`` with its blocks once exhausted.
+    """
+    blocks = []
+    block: list | None = None
+    with path.open("rb") as handle:
+        reader = BufferedText(handle, CHUNK_SIZE)
+        for idx, (start, item) in enumerate(iter_json_array(reader, path)):
+            if idx % BLOCK_RECORDS == 0:
+                block = [reader.byte_offset(start), 0, None, None]
+                blocks.append(block)
+            block[1] += 1
+            ts = item.get("ts")
+            if isinstance(ts, str):
+                block[2] = ts if block[2] is None else min(block[2], ts)
+                block[3] = ts if block[3] is None else max(block[3], ts)
+            yield item
+    entry["blocks"] = blocks
+    entry["min_ts"] = min((block[2] for block in blocks if block[2]), default=None)
+    entry["max_ts"] = max((block[3] for block in blocks if block[3]), default=None)
+
+
+def _overlaps(
+    min_ts: str | None, max_ts: str | None, start_ts: str | None, end_ts: str | None
+) -> bool:
+    if start_ts is None and end_ts is None:
+        return True
+    if min_ts is None:
+        return False
+    return (start_ts is None or max_ts >= start_ts) and (end_ts is None or min_ts < end_ts)
+
+
+def _in_window(ts: object, start_ts: str | None, end_ts: str | None) -> bool:
+    if start_ts is None and end_ts is None:
+        return True
+    if not isinstance(ts, str):
+        return False
+    return (start_ts is None or ts >= start_ts) and (end_ts is None or ts < end_ts)
+
+
+def _read_index(path: Path) -> dict:
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            index = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(index, dict) or index.get("version") != _INDEX_VERSION:
+        return {}
+    return index.get("files", {})
+
+
+def _write_index(path: Path, files: dict) -> None:
+    payload = {"version": _INDEX_VERSION, "block_records": BLOCK_RECORDS, "files": files}
+    try:
+        atomic_write(path, json.dumps(payload).encode("utf-8"))
+    except OSError:
+        pass
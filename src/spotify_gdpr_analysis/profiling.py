@@ -0,0 +1,175 @@
+"""
+Per-stage timing and memory instrumentation for the report pipeline.
+
+Pipeline functions accept an optional ``Profiler`` and wrap each unit of work
+(a file load, an analysis, a report section) in ``Profiler.stage``. Every
+finished stage is appended to ``Profiler.stages`` and passed to the attached
+collectors, so callers can stream measurements elsewhere.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import ContextManager, Iterator
+
+
+@dataclass
+class StageTiming:
+    """
+    Measurements of one pipeline stage.
+
+    ``peak_memory_bytes`` is the tracemalloc peak during the stage above the
+    traced memory at its start, or ``None`` when memory tracing is disabled.
+    ``records`` is the number of records processed, when meaningful.
+    """
+
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    records: int | None = None
+    peak_memory_bytes: int | None = None
+
+    @property
+    def records_per_second(self) -> float | None:
+        if self.records is None or not self.wall_seconds:
+            return None
+        return self.records / self.wall_seconds
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the measurements.
+        """
+        return {
+            "name": self.name,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "records": self.records,
+            "records_per_second": self.records_per_second,
+            "peak_memory_bytes": self.peak_memory_bytes,
+        }
+
+
+StageCollector = Callable[[StageTiming], None]
+
+
+class Profiler:
+    """
+    Records wall time, CPU time, throughput and peak memory per pipeline stage.
+
+    Stages may nest. When ``memory`` is set, tracemalloc runs while the
+    outermost stage is open unless the caller already started it.
+    """
+
+    def __init__(self, collectors: Iterable[StageCollector] = (), memory: bool = True) -> None:
+        self.stages: list[StageTiming] = []
+        self.collectors = list(collectors)
+        self.memory = memory
+        self._open: list[list[int]] = []
+        self._owns_tracing = False
+
+    def add_collector(self, collector: StageCollector) -> None:
+        """
+        Call ``collector`` with every stage that finishes from now on.
+        """
+        self.collectors.append(collector)
+
+    @contextmanager
+    def stage(self, name: str, records: int | None = None) -> Iterator[StageTiming]:
+        """
+        Measure the enclosed block as stage ``name``.
+
+        The yielded ``StageTiming`` may have ``records`` set inside the block
+        once the record count is known.
+        """
+        timing = StageTiming(name, records=records)
+        memory = self._enter_memory()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield timing
+        finally:
+            timing.cpu_seconds = time.process_time() - cpu_start
+            timing.wall_seconds = time.perf_counter() - wall_start
+            timing.peak_memory_bytes = self._exit_memory(memory)
+            self.stages.append(timing)
+            for collector in self.collectors:
+                collector(timing)
+
+    def summary(self) -> str:
+        """
+        Return a plain-text table of the recorded stages.
+        """
+        width = max([len("stage"), *(len(stage.name) for stage in self.stages)])
+        header = f"{'stage':<{width}} {'wall s':>9} {'cpu s':>9} {'records/s':>12} {'peak MiB':>9}"
+        lines = [header, "-" * len(header)]
+        for stage in self.stages:
+            rate = stage.records_per_second
+            peak = stage.peak_memory_bytes
+            lines.append(
+                f"{stage.name:<{width}} {stage.wall_seconds:>9.3f} {stage.cpu_seconds:>9.3f} "
+                f"{'-' if rate is None else f'{rate:,.0f}':>12} "
+                f"{'-' if peak is None else f'{peak / 2**20:.1f}':>9}"
+            )
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON-serializable representation of the recorded stages.
+        """
+        return {"stages": [stage.to_dict() for stage in self.stages]}
+
+    def write_json(self, path: str | Path) -> Path:
+        """
+        Write ``to_dict`` output to ``path`` and return the written path.
+        """
+        file_path = Path(path)
+        file_path.write_text(json.dumps(self.to_dict(), indent=2) + "\n", encoding="utf-8")
+        return file_path
+
+    def _enter_memory(self) -> list[int] | None:
+        """
+        Start tracking memory for a new stage; returns [start, running peak].
+        """
+        if not self.memory:
+            return None
+        if not self._open and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        current, peak = tracemalloc.get_traced_memory()
+        if self._open:
+            # The enclosing stage keeps the peak it reached before this one resets it.
+            self._open[-1][1] = max(self._open[-1][1], peak)
+        tracemalloc.reset_peak()
+        memory = [current, current]
+        self._open.append(memory)
+        return memory
+
+    def _exit_memory(self, memory: list[int] | None) -> int | None:
+        if memory is None:
+            return None
+        self._open.pop()
+        start, running_peak = memory
+        peak = max(running_peak, tracemalloc.get_traced_memory()[1])
+        if self._open:
+            self._open[-1][1] = max(self._open[-1][1], peak)
+        elif self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+        return peak - start
+
+
+def profile_stage(
+    profiler: Profiler | None, name: str, records: int | None = None
+) -> ContextManager[StageTiming | None]:
+    """
+    Return ``profiler.stage(name, records)``, or a no-op context without a profiler.
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name, records)
@@ -2,6 +2,48 @@
 Visualization helpers for Spotify GDPR exports.
 """
 
-from spotify_gdpr_analysis.visualize.report import render_html_report, write_html_report
+from spotify_gdpr_analysis.visualize.batch import (
+    BatchJob,
+    BatchResult,
+    expand_data_dirs,
+    plan_batch,
+    read_manifest,
+    run_batch,
+)
+from spotify_gdpr_analysis.visualize.report import (
+    iter_analyses_report,
+    render_analyses_report,
+    render_html_report,
+    report_sections,
+    stream_analyses_report,
+    stream_html_report,
+    write_analyses_report,
+    write_html_report,
+)
+from spotify_gdpr_analysis.visualize.server import (
+    LRUCache,
+    ReportQuery,
+    ReportServer,
+    serve_report,
+)
 
-__all__ = ["render_html_report", "write_html_report"]
+__all__ = [
+    "BatchJob",
+    "BatchResult",
+    "LRUCache",
+    "ReportQuery",
+    "ReportServer",
+    "expand_data_dirs",
+    "iter_analyses_report",
+    "plan_batch",
+    "read_manifest",
+    "render_analyses_report",
+    "render_html_report",
+    "report_sections",
+    "run_batch",
+    "serve_report",
+    "stream_analyses_report",
+    "stream_html_report",
+    "write_analyses_report",
+    "write_html_report",
+]
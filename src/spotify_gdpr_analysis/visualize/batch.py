@@ -0,0 +1,177 @@
+"""
+Report generation for many exports on one shared process pool.
+
+Each account's report (ingestion, analysis and rendering) is one task. Worker
+processes stay alive across tasks, so interpreter start-up and module imports
+are paid once per worker rather than once per account, and throughput scales
+with the number of workers. A failing account is reported and skipped without
+stopping the batch.
+"""
+
+from __future__ import annotations
+
+import glob
+import time
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from spotify_gdpr_analysis.analysis.engine import run_analyses
+from spotify_gdpr_analysis.io.cache import cached_streaming_history_table
+from spotify_gdpr_analysis.io.streaming_history import streaming_history, streaming_history_paths
+from spotify_gdpr_analysis.visualize.report import write_analyses_report
+
+ACCOUNT_PLACEHOLDER = "{account}"
+
+_POOL_RETRIES = 1
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """
+    One account's export and the report written for it.
+    """
+
+    data_dir: Path
+    output_path: Path
+
+    @property
+    def account(self) -> str:
+        return self.output_path.stem
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of one ``BatchJob``; ``error`` is ``None`` on success.
+    """
+
+    job: BatchJob
+    seconds: float = 0.0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def read_manifest(path: str | Path) -> list[Path]:
+    """
+    Return the export paths listed in a manifest file, one per line.
+
+    Blank lines and lines starting with ``#`` are ignored; relative paths are
+    taken relative to the manifest's directory.
+    """
+    manifest = Path(path)
+    data_dirs = []
+    for line in manifest.read_text(encoding="utf-8").splitlines():
+        entry = line.strip()
+        if not entry or entry.startswith("#"):
+            continue
+        data_dirs.append(manifest.parent / entry)
+    return data_dirs
+
+
+def expand_data_dirs(patterns: Iterable[str]) -> list[Path]:
+    """
+    Return the export directories or archives matching glob ``patterns``, in order.
+
+    A pattern that matches nothing raises ``ValueError``; duplicates are dropped.
+    """
+    data_dirs: dict[Path, None] = {}
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or ([pattern] if Path(pattern).exists() else [])
+        if not matches:
+            raise ValueError(f"No exports match {pattern!r}")
+        data_dirs.update(dict.fromkeys(Path(match) for match in matches))
+    return list(data_dirs)
+
+
+def plan_batch(data_dirs: Iterable[str | Path], output_dir: str | Path) -> list[BatchJob]:
+    """
+    Return one job per export, writing ``output_dir/<export name>.html``.
+
+    The export name is the directory name or the archive name without its
+    suffix; two exports with the same name raise ``ValueError``.
+    """
+    jobs = []
+    seen: dict[str, Path] = {}
+    for data_dir in data_dirs:
+        source = Path(data_dir)
+        account = source.stem if source.is_file() else source.name
+        if account in seen:
+            raise ValueError(
+                f"Exports {seen[account]} and {source} would both write {account}.html"
+            )
+        seen[account] = source
+        jobs.append(BatchJob(source, Path(output_dir) / f"{account}.html"))
+    return jobs
+
+
+def run_batch(
+    jobs: Sequence[BatchJob],
+    workers: int | None = None,
+    report_title: str = "Spotify GDPR Listening Report",
+    cache: bool = True,
+) -> Iterator[BatchResult]:
+    """
+    Generate every job's report and yield each result as soon as it finishes.
+
+    ``workers`` caps the pool size and defaults to the CPU count; ``workers=1``
+    runs the jobs in this process. ``ACCOUNT_PLACEHOLDER`` in ``report_title``
+    is replaced with each account's name. With ``cache``, exports are parsed
+    through each account's default ``ExportCache``.
+
+    If a worker process dies, for example killed for running out of memory,
+    the pool is restarted and the unfinished jobs are retried once.
+    """
+    if workers == 1:
+        for job in jobs:
+            yield _run_job(job, report_title, cache)
+        return
+    attempts = dict.fromkeys(jobs, 0)
+    pending = list(jobs)
+    while pending:
+        retry = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_run_job, job, report_title, cache): job for job in pending}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    yield future.result()
+                except BrokenProcessPool as error:
+                    attempts[job] += 1
+                    if attempts[job] > _POOL_RETRIES:
+                        yield BatchResult(job, error=_describe(error))
+                    else:
+                        retry.append(job)
+                except Exception as error:
+                    yield BatchResult(job, error=_describe(error))
+        pending = retry
+
+
+def _run_job(job: BatchJob, report_title: str, cache: bool) -> BatchResult:
+    start = time.perf_counter()
+    try:
+        if not streaming_history_paths(job.data_dir):
+            raise ValueError(f"No streaming history files in {job.data_dir}")
+        if cache:
+            records = cached_streaming_history_table(job.data_dir)
+        else:
+            records = streaming_history(job.data_dir)
+        job.output_path.parent.mkdir(parents=True, exist_ok=True)
+        write_analyses_report(
+            run_analyses(records),
+            job.output_path,
+            report_title.replace(ACCOUNT_PLACEHOLDER, job.account),
+        )
+    except Exception as error:
+        return BatchResult(job, time.perf_counter() - start, _describe(error))
+    return BatchResult(job, time.perf_counter() - start)
+
+
+def _describe(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}"
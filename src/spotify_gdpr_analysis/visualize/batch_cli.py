@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import sys
+
+from spotify_gdpr_analysis.visualize.batch import (
+    ACCOUNT_PLACEHOLDER,
+    expand_data_dirs,
+    plan_batch,
+    read_manifest,
+    run_batch,
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Generate HTML reports for many Spotify GDPR exports on one shared pool "
+            "of worker processes."
+        ),
+    )
+    parser.add_argument(
+        "data_dirs",
+        nargs="*",
+        metavar="DATA_DIR",
+        help="Export directories or ZIP archives; glob patterns are expanded.",
+    )
+    parser.add_argument(
+        "-m",
+        "--manifest",
+        default=None,
+        help="File listing one export directory or archive per line.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        default="spotify_reports",
+        help="Directory for the reports, one NAME.html per export (default: spotify_reports).",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: the CPU count).",
+    )
+    parser.add_argument(
+        "--title",
+        default="Spotify GDPR Listening Report",
+        help=f"Report title; {ACCOUNT_PLACEHOLDER} is replaced with the export name.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every export file from scratch without reading or writing the cache.",
+    )
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    try:
+        data_dirs = expand_data_dirs(args.data_dirs)
+        if args.manifest:
+            data_dirs += read_manifest(args.manifest)
+        jobs = plan_batch(data_dirs, args.output_dir)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if not jobs:
+        parser.error("no exports given; pass DATA_DIR arguments or --manifest")
+
+    failed = 0
+    for done, result in enumerate(
+        run_batch(jobs, args.jobs, args.title, cache=not args.no_cache), start=1
+    ):
+        prefix = f"[{done}/{len(jobs)}] {result.job.account}"
+        if result.ok:
+            print(f"{prefix}: wrote {result.job.output_path} in {result.seconds:.2f}s", flush=True)
+        else:
+            failed += 1
+            print(f"{prefix}: failed: {result.error}", file=sys.stderr, flush=True)
+    print(f"Wrote {len(jobs) - failed} report(s), {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,43 @@
 from __future__ import annotations
 
 import argparse
+import sys
+from collections.abc import Callable
+from datetime import datetime
+from itertools import chain
 from pathlib import Path
 
-from spotify_gdpr_analysis.io.streaming_history import streaming_history
-from spotify_gdpr_analysis.visualize.report import write_html_report
+from spotify_gdpr_analysis.analysis.engine import ReportAnalyses, run_analyses
+from spotify_gdpr_analysis.analysis.incremental import (
+    IncrementalUpdate,
+    incremental_aggregate,
+    snapshot_path_for,
+)
+from spotify_gdpr_analysis.analysis.parallel import parallel_run_analyses
+from spotify_gdpr_analysis.analysis.sessions import (
+    DEFAULT_SESSION_GAP_MINUTES,
+    ListeningSessions,
+    listening_sessions,
+)
+from spotify_gdpr_analysis.io.cache import (
+    DEFAULT_CACHE_DIRNAME,
+    cached_streaming_history_table,
+    default_cache_dir,
+)
+from spotify_gdpr_analysis.io.dedup import DEDUP_MODES, deduplicated_streaming_history
+from spotify_gdpr_analysis.io.ordered import (
+    DEFAULT_REORDER_WINDOW,
+    OutOfOrderError,
+    files_to_sort_in_memory,
+    ordered_streaming_history,
+)
+from spotify_gdpr_analysis.io.play_store import PlayStore, StoreUpdate
+from spotify_gdpr_analysis.io.streaming_history import min_duration_filter, streaming_history
+from spotify_gdpr_analysis.io.table import streaming_history_table
+from spotify_gdpr_analysis.profiling import Profiler, profile_stage
+from spotify_gdpr_analysis.visualize.report import write_analyses_report
+
+PROFILE_SUFFIX = ".profile.json"
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -13,7 +46,10 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "data_dir",
-        help="Directory containing Streaming_History_Audio_*.json files.",
+        help=(
+            "Directory containing Streaming_History_Audio_*.json files, "
+            "or the export's ZIP archive (read without extracting)."
+        ),
     )
     parser.add_argument(
         "-o",
@@ -26,18 +62,367 @@ def build_parser() -> argparse.ArgumentParser:
         default="Spotify GDPR Listening Report",
         help="Custom report title.",
     )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help=(
+            f"Directory for the parsed-export cache (default: DATA_DIR/{DEFAULT_CACHE_DIRNAME}, "
+            "or next to a ZIP archive)."
+        ),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every export file from scratch without reading or writing the cache.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes parsing export files in parallel (default: 1).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Keep an aggregate snapshot next to the output and only ingest export files "
+            "that are new or changed since the last run."
+        ),
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        help=(
+            "SQLite play store to ingest new or changed export files into; the report "
+            "is then computed with SQL queries against it."
+        ),
+    )
+    parser.add_argument(
+        "--also",
+        action="append",
+        default=[],
+        metavar="DATA_DIR",
+        help="Another export directory or archive to pool with DATA_DIR; may be repeated.",
+    )
+    parser.add_argument(
+        "--dedupe",
+        nargs="?",
+        const="exact",
+        default=None,
+        choices=DEDUP_MODES,
+        help=(
+            "Drop plays repeated across overlapping exports, matched on timestamp, track "
+            "and play time; 'bloom' reads the exports twice using a few bytes per play "
+            "(default mode: exact)."
+        ),
+    )
+    parser.add_argument(
+        "--since",
+        default=None,
+        help="Only include plays at or after this ISO date or time (UTC unless an offset is given).",
+    )
+    parser.add_argument(
+        "--until",
+        default=None,
+        help="Only include plays before this ISO date or time (UTC unless an offset is given).",
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=None,
+        help="Only include plays that lasted at least this many seconds.",
+    )
+    parser.add_argument(
+        "--sessions",
+        action="store_true",
+        help=(
+            "Add listening session sections, computed in a second, time-ordered "
+            "pass over the export files."
+        ),
+    )
+    parser.add_argument(
+        "--session-gap",
+        type=float,
+        default=None,
+        help=(
+            "Minutes of silence that end a listening session; requires --sessions "
+            f"(default: {DEFAULT_SESSION_GAP_MINUTES})."
+        ),
+    )
+    parser.add_argument(
+        "--reorder-window",
+        type=int,
+        default=None,
+        help=(
+            "How many records a play may lag behind its export file's time order "
+            "in the --sessions pass; files whose time index shows later plays are sorted "
+            f"in memory; requires --sessions (default: {DEFAULT_REORDER_WINDOW})."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Measure wall time, CPU time, records per second and peak memory of every "
+            f"pipeline stage; print a summary and write OUTPUT{PROFILE_SUFFIX}."
+        ),
+    )
     return parser
 
 
 def main() -> int:
     parser = build_parser()
     args = parser.parse_args()
+    bounds, min_ms_played = _play_filters(parser, args)
+    load = _select_loader(parser, args)
+    profiler = Profiler() if args.profile else None
+    analyses = load(args, bounds, min_ms_played, profiler)
+    if args.sessions:
+        analyses.sessions = _load_sessions(args, bounds, min_ms_played, profiler)
+
     output_path = Path(args.output)
-    records = streaming_history(args.data_dir)
-    write_html_report(records, output_path, args.title)
+    write_analyses_report(analyses, output_path, args.title, profiler)
     print(f"Wrote report to {output_path}")
+    if profiler is not None:
+        profile_path = profiler.write_json(output_path.with_name(output_path.name + PROFILE_SUFFIX))
+        print(profiler.summary())
+        print(f"Wrote profile to {profile_path}")
     return 0
 
 
+def _play_filters(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> tuple[dict[str, datetime], int | None]:
+    """
+    Validate the numeric options and return the time bounds and minimum ``ms_played``.
+    """
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.session_gap is not None and args.session_gap <= 0:
+        parser.error("--session-gap must be positive")
+    if args.reorder_window is not None and args.reorder_window < 0:
+        parser.error("--reorder-window cannot be negative")
+    bounds = {}
+    for option, key in (("since", "start"), ("until", "end")):
+        value = getattr(args, option)
+        if value is None:
+            continue
+        try:
+            bounds[key] = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            parser.error(f"--{option} must be an ISO date or time, got {value!r}")
+    min_ms_played = None
+    if args.min_seconds is not None:
+        if args.min_seconds < 0:
+            parser.error("--min-seconds cannot be negative")
+        min_ms_played = round(args.min_seconds * 1000)
+    return bounds, min_ms_played
+
+
+def _select_loader(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> Callable[..., ReportAnalyses]:
+    """
+    Return the loader of the first mode in ``_LOAD_MODES`` that the given options select.
+
+    Any given option the mode does not accept, or given without the option it
+    depends on, is an error rather than being ignored.
+    """
+    given = [option for option, is_given in _GIVEN_OPTIONS.items() if is_given(args)]
+    for option in given:
+        required = _REQUIRED_OPTIONS.get(option)
+        if required is not None and required not in given:
+            parser.error(f"{option} requires {required}")
+    for selected_by, accepts, load in _LOAD_MODES:
+        if selected_by and not any(option in given for option in selected_by):
+            continue
+        for option in given:
+            if option not in selected_by and option not in accepts:
+                parser.error(f"{option} cannot be combined with {'/'.join(selected_by)}")
+        return load
+    raise AssertionError("The last load mode accepts any options")
+
+
+def _load_store(
+    args: argparse.Namespace,
+    bounds: dict[str, datetime],
+    min_ms_played: int | None,
+    profiler: Profiler | None,
+) -> ReportAnalyses:
+    with PlayStore(args.store) as store:
+        update = store.ingest(args.data_dir, profiler)
+        _print_update(update)
+        selection = store.select(**bounds, min_ms_played=min_ms_played)
+        return run_analyses(selection, profiler=profiler)
+
+
+def _load_incremental(
+    args: argparse.Namespace,
+    bounds: dict[str, datetime],
+    min_ms_played: int | None,
+    profiler: Profiler | None,
+) -> ReportAnalyses:
+    with profile_stage(profiler, "incremental aggregate"):
+        update = incremental_aggregate(
+            args.data_dir,
+            snapshot_path_for(Path(args.output)),
+            jobs=args.jobs,
+            cache_dir=_cache_dir(args),
+        )
+        analyses = update.aggregator.finalize()
+    _print_update(update)
+    return analyses
+
+
+def _load_parallel(
+    args: argparse.Namespace,
+    bounds: dict[str, datetime],
+    min_ms_played: int | None,
+    profiler: Profiler | None,
+) -> ReportAnalyses:
+    with profile_stage(profiler, "parallel aggregate"):
+        return parallel_run_analyses(args.data_dir, args.jobs, cache_dir=_cache_dir(args))
+
+
+def _load_pooled(
+    args: argparse.Namespace,
+    bounds: dict[str, datetime],
+    min_ms_played: int | None,
+    profiler: Profiler | None,
+) -> ReportAnalyses:
+    data_dirs = [args.data_dir, *args.also]
+    where = _duration_filter(min_ms_played)
+    if args.dedupe:
+        records = deduplicated_streaming_history(data_dirs, args.dedupe, where=where, **bounds)
+    else:
+        records = chain.from_iterable(
+            streaming_history(data_dir, where=where, **bounds)
+            for data_dir in data_dirs
+        )
+    return run_analyses(records, profiler=profiler)
+
+
+def _load_filtered(
+    args: argparse.Namespace,
+    bounds: dict[str, datetime],
+    min_ms_played: int | None,
+    profiler: Profiler | None,
+) -> ReportAnalyses:
+    records = streaming_history(args.data_dir, where=_duration_filter(min_ms_played), **bounds)
+    return run_analyses(records, profiler=profiler)
+
+
+def _load_export(
+    args: argparse.Namespace,
+    bounds: dict[str, datetime],
+    min_ms_played: int | None,
+    profiler: Profiler | None,
+) -> ReportAnalyses:
+    if not args.no_cache:
+        records = cached_streaming_history_table(args.data_dir, args.cache_dir, profiler=profiler)
+    elif profiler is not None:
+        records = streaming_history_table(args.data_dir, profiler)
+    else:
+        records = streaming_history(args.data_dir)
+    return run_analyses(records, profiler=profiler)
+
+
+def _load_sessions(
+    args: argparse.Namespace,
+    bounds: dict[str, datetime],
+    min_ms_played: int | None,
+    profiler: Profiler | None,
+) -> ListeningSessions:
+    reorder_window = args.reorder_window
+    if reorder_window is None:
+        reorder_window = DEFAULT_REORDER_WINDOW
+    session_gap = args.session_gap
+    if session_gap is None:
+        session_gap = DEFAULT_SESSION_GAP_MINUTES
+    with profile_stage(profiler, "sessions"):
+        sort_in_memory = files_to_sort_in_memory(args.data_dir, reorder_window)
+        for path in sort_in_memory:
+            print(
+                f"{path} is more than {reorder_window} records out of time order; "
+                "sorting it in memory",
+                file=sys.stderr,
+            )
+        ordered = ordered_streaming_history(
+            args.data_dir,
+            reorder_window=reorder_window,
+            where=_duration_filter(min_ms_played),
+            sort_in_memory=sort_in_memory,
+            **bounds,
+        )
+        try:
+            return listening_sessions(ordered, session_gap)
+        except OutOfOrderError as error:
+            raise SystemExit(f"{error}; rerun with a larger --reorder-window") from None
+
+
+def _cache_dir(args: argparse.Namespace) -> str | Path | None:
+    if args.no_cache:
+        return None
+    return args.cache_dir or default_cache_dir(args.data_dir)
+
+
+def _duration_filter(min_ms_played: int | None) -> dict | None:
+    return None if min_ms_played is None else min_duration_filter(min_ms_played)
+
+
+def _print_update(update: IncrementalUpdate | StoreUpdate) -> None:
+    print(
+        f"Reused {len(update.reused)} export file(s), "
+        f"ingested {len(update.ingested)}, dropped {update.dropped}"
+    )
+
+
+# Options that change how plays are loaded, and whether each was given.
+_GIVEN_OPTIONS: dict[str, Callable[[argparse.Namespace], bool]] = {
+    "--store": lambda args: args.store is not None,
+    "--incremental": lambda args: args.incremental,
+    "--jobs": lambda args: args.jobs > 1,
+    "--also": lambda args: bool(args.also),
+    "--dedupe": lambda args: args.dedupe is not None,
+    "--since": lambda args: args.since is not None,
+    "--until": lambda args: args.until is not None,
+    "--min-seconds": lambda args: args.min_seconds is not None,
+    "--sessions": lambda args: args.sessions,
+    "--session-gap": lambda args: args.session_gap is not None,
+    "--reorder-window": lambda args: args.reorder_window is not None,
+    "--cache-dir": lambda args: args.cache_dir is not None,
+    "--no-cache": lambda args: args.no_cache,
+}
+
+# Options that only apply together with another option.
+_REQUIRED_OPTIONS = {"--session-gap": "--sessions", "--reorder-window": "--sessions"}
+_SESSION_OPTIONS = frozenset({"--sessions", *_REQUIRED_OPTIONS})
+
+# Ways of loading the plays, in order of precedence: the options that select
+# the mode, the other options it accepts, and its loader. The last mode is
+# selected when no other is.
+_LOAD_MODES: tuple[tuple[tuple[str, ...], frozenset[str], Callable[..., ReportAnalyses]], ...] = (
+    (
+        ("--store",),
+        frozenset({"--since", "--until", "--min-seconds", *_SESSION_OPTIONS}),
+        _load_store,
+    ),
+    (
+        ("--incremental",),
+        frozenset({"--jobs", "--cache-dir", "--no-cache", *_SESSION_OPTIONS}),
+        _load_incremental,
+    ),
+    (("--jobs",), frozenset({"--cache-dir", "--no-cache", *_SESSION_OPTIONS}), _load_parallel),
+    (
+        ("--also", "--dedupe"),
+        frozenset({"--since", "--until", "--min-seconds"}),
+        _load_pooled,
+    ),
+    (("--since", "--until", "--min-seconds"), _SESSION_OPTIONS, _load_filtered),
+    ((), frozenset({"--cache-dir", "--no-cache", *_SESSION_OPTIONS}), _load_export),
+)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
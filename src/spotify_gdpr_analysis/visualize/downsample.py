@@ -0,0 +1,86 @@
+"""
+Bucketing and downsampling of long series for bounded-size charts.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import NamedTuple
+
+DOWNSAMPLE_METHODS = ("max", "mean", "lttb")
+
+
+class Bucket(NamedTuple):
+    """
+    A run of consecutive series values shown as one bar.
+
+    ``start`` and ``end`` are the half-open index range of the values;
+    ``value`` is the bar height chosen by the downsampling method.
+    """
+
+    start: int
+    end: int
+    value: float
+    minimum: float
+    maximum: float
+    mean: float
+
+
+def bucket_series(values: Sequence[float], max_buckets: int, method: str = "max") -> list[Bucket]:
+    """
+    Split ``values`` into at most ``max_buckets`` consecutive buckets.
+
+    ``"max"`` keeps each bucket's peak, so spikes survive downsampling;
+    ``"mean"`` averages the bucket; ``"lttb"`` (Largest-Triangle-Three-Buckets)
+    picks the value per bucket that best preserves the visual shape, always
+    keeping the first and last values. Short series get one bucket per value.
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}, expected one of {DOWNSAMPLE_METHODS}")
+    if max_buckets < 1 or (method == "lttb" and max_buckets < 3):
+        raise ValueError(f"Too few buckets for {method!r} downsampling: {max_buckets}")
+
+    count = len(values)
+    if count <= max_buckets:
+        return [_bucket(values, index, index + 1, value) for index, value in enumerate(values)]
+    if method == "lttb":
+        return _lttb_buckets(values, max_buckets)
+
+    buckets = []
+    for index in range(max_buckets):
+        start = index * count // max_buckets
+        end = (index + 1) * count // max_buckets
+        span = values[start:end]
+        value = max(span) if method == "max" else sum(span) / len(span)
+        buckets.append(_bucket(values, start, end, value))
+    return buckets
+
+
+def _lttb_buckets(values: Sequence[float], max_buckets: int) -> list[Bucket]:
+    count = len(values)
+    inner = max_buckets - 2
+    bounds = [1 + index * (count - 2) // inner for index in range(inner + 1)]
+    buckets = [_bucket(values, 0, 1, values[0])]
+    previous = 0
+    for index in range(inner):
+        start, end = bounds[index], bounds[index + 1]
+        next_start, next_end = (bounds[index + 1], bounds[index + 2]) if index + 1 < inner else (count - 1, count)
+        next_x = (next_start + next_end - 1) / 2
+        next_y = sum(values[next_start:next_end]) / (next_end - next_start)
+        previous_y = values[previous]
+        chosen = max(
+            range(start, end),
+            key=lambda point: abs(
+                (previous - next_x) * (values[point] - previous_y)
+                - (previous - point) * (next_y - previous_y)
+            ),
+        )
+        buckets.append(_bucket(values, start, end, values[chosen]))
+        previous = chosen
+    buckets.append(_bucket(values, count - 1, count, values[-1]))
+    return buckets
+
+
+def _bucket(values: Sequence[float], start: int, end: int, value: float) -> Bucket:
+    span = values[start:end]
+    return Bucket(start, end, value, min(span), max(span), sum(span) / len(span))
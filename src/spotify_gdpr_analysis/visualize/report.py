@@ -1,37 +1,145 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
 from html import escape
 from pathlib import Path
+from typing import Iterator, TextIO
 
-from spotify_gdpr_analysis.analysis.temporal import (
-    hourly_average_streams,
-    monthly_average_streams,
-    monthly_new_artists,
-    monthly_unique_artists,
-    weekday_average_streams,
-)
-from spotify_gdpr_analysis.analysis.top import top_albums, top_artists, top_songs
-from spotify_gdpr_analysis.visualize.templates import render_page
+from spotify_gdpr_analysis.analysis.engine import ReportAnalyses, run_analyses
+from spotify_gdpr_analysis.analysis.sessions import ListeningSessions
+from spotify_gdpr_analysis.io.cache import atomic_open
+from spotify_gdpr_analysis.profiling import Profiler, profile_stage
+from spotify_gdpr_analysis.visualize.downsample import Bucket, bucket_series
+from spotify_gdpr_analysis.visualize.templates import render_page_footer, render_page_header
+
+DEFAULT_MAX_BARS = 120
 
 
 def render_html_report(
     records: Iterable[dict],
     report_title: str = "Spotify GDPR Listening Report",
+    profiler: Profiler | None = None,
 ) -> str:
     """
     Return a complete HTML report for all available analyses.
+
+    A ``profiler`` measures each analysis and report section as a stage; attach
+    collectors to it to receive the measurements as they complete.
+    """
+    return render_analyses_report(run_analyses(records, profiler=profiler), report_title, profiler)
+
+
+def render_analyses_report(
+    analyses: ReportAnalyses,
+    report_title: str = "Spotify GDPR Listening Report",
+    profiler: Profiler | None = None,
+) -> str:
+    """
+    Return a complete HTML report for precomputed analyses.
+    """
+    return "".join(iter_analyses_report(analyses, report_title, profiler))
+
+
+def iter_analyses_report(
+    analyses: ReportAnalyses,
+    report_title: str = "Spotify GDPR Listening Report",
+    profiler: Profiler | None = None,
+) -> Iterator[str]:
+    """
+    Yield the HTML report in pieces: the page header, each section, the footer.
+
+    Each section is rendered only when the previous piece has been consumed,
+    so at most one section is held in memory at a time.
+    """
+    yield render_page_header(report_title)
+    first = True
+    for title, render_section in report_sections(analyses):
+        with profile_stage(profiler, f"render {title}"):
+            section_html = render_section()
+        if not section_html:
+            continue
+        if not first:
+            yield "\n"
+        first = False
+        yield section_html
+    yield render_page_footer()
+
+
+def stream_analyses_report(
+    analyses: ReportAnalyses,
+    sink: TextIO,
+    report_title: str = "Spotify GDPR Listening Report",
+    profiler: Profiler | None = None,
+) -> None:
+    """
+    Write the HTML report for precomputed analyses to ``sink`` section by section.
+
+    ``sink`` is any object with a ``write(str)`` method; if it also has
+    ``flush``, it is flushed after every piece so partial output appears early.
+    """
+    flush = getattr(sink, "flush", None)
+    for piece in iter_analyses_report(analyses, report_title, profiler):
+        sink.write(piece)
+        if flush is not None:
+            flush()
+
+
+def stream_html_report(
+    records: Iterable[dict],
+    sink: TextIO,
+    report_title: str = "Spotify GDPR Listening Report",
+    profiler: Profiler | None = None,
+) -> None:
     """
-    records_list = list(records)
+    Write a complete HTML report for all available analyses to ``sink``.
+    """
+    stream_analyses_report(run_analyses(records, profiler=profiler), sink, report_title, profiler)
+
+
+def write_html_report(
+    records: Iterable[dict],
+    output_path: str | Path,
+    report_title: str = "Spotify GDPR Listening Report",
+    profiler: Profiler | None = None,
+) -> Path:
+    """
+    Write an HTML report to disk and return the written path.
+    """
+    return write_analyses_report(
+        run_analyses(records, profiler=profiler), output_path, report_title, profiler
+    )
+
 
-    songs = top_songs(records_list)
-    albums = top_albums(records_list)
-    artists = top_artists(records_list)
-    weekday_averages = weekday_average_streams(records_list)
-    monthly_averages = monthly_average_streams(records_list)
-    hourly_averages = hourly_average_streams(records_list)
-    monthly_artist_counts = monthly_unique_artists(records_list)
-    monthly_new_artist_counts = monthly_new_artists(records_list)
+def write_analyses_report(
+    analyses: ReportAnalyses,
+    output_path: str | Path,
+    report_title: str = "Spotify GDPR Listening Report",
+    profiler: Profiler | None = None,
+) -> Path:
+    """
+    Write an HTML report for precomputed analyses and return the written path.
+
+    The report is streamed into a temporary file beside ``output_path`` that
+    replaces it only once rendering succeeds, so a failed run keeps the old report.
+    """
+    file_path = Path(output_path)
+    with atomic_open(file_path, "w", encoding="utf-8") as handle:
+        stream_analyses_report(analyses, handle, report_title, profiler)
+    return file_path
+
+
+def report_sections(analyses: ReportAnalyses) -> list[tuple[str, Callable[[], str]]]:
+    """
+    Return (title, render function) for each report section, in page order.
+    """
+    songs = analyses.songs
+    albums = analyses.albums
+    artists = analyses.artists
+    weekday_averages = analyses.weekday_averages
+    monthly_averages = analyses.monthly_averages
+    hourly_averages = analyses.hourly_averages
+    monthly_artist_counts = analyses.monthly_unique_artists
+    monthly_new_artist_counts = analyses.monthly_new_artists
     monthly_artist_labels = _year_only_labels(
         [label for label, _ in monthly_artist_counts]
     )
@@ -43,82 +151,233 @@ def render_html_report(
     month_labels = ["J", "F", "M", "A", "M", "J", "J", "A", "S", "O", "N", "D"]
     hour_labels = [f"{hour:02d}" for hour in range(24)]
 
-    html_sections = [
-        _render_table_section(
+    sections = [
+        (
             "Top songs",
-            ["Track", "Artist", "Plays"],
-            [[track, artist, _format_count(count)] for track, artist, count in songs],
+            lambda: _render_table_section(
+                "Top songs",
+                ["Track", "Artist", "Plays"],
+                [[track, artist, _format_count(count)] for track, artist, count in songs],
+            ),
         ),
-        _render_table_section(
+        (
             "Top albums",
-            ["Album", "Artist", "Plays"],
-            [[album, artist, _format_count(count)] for album, artist, count in albums],
+            lambda: _render_table_section(
+                "Top albums",
+                ["Album", "Artist", "Plays"],
+                [[album, artist, _format_count(count)] for album, artist, count in albums],
+            ),
         ),
-        _render_table_section(
+        (
             "Top artists",
-            ["Artist", "Plays"],
-            [[artist, _format_count(count)] for artist, count in artists],
+            lambda: _render_table_section(
+                "Top artists",
+                ["Artist", "Plays"],
+                [[artist, _format_count(count)] for artist, count in artists],
+            ),
         ),
-        _render_chart_section(
+        (
             "Average listens by weekday",
-            _render_bar_chart(
-                weekday_labels,
-                weekday_averages,
-                "Average listens per weekday",
+            lambda: _render_chart_section(
+                "Average listens by weekday",
+                _render_bar_chart(
+                    weekday_labels,
+                    weekday_averages,
+                    "Average listens per weekday",
+                ),
             ),
         ),
-        _render_chart_section(
+        (
             "Average listens by month",
-            _render_bar_chart(
-                month_labels,
-                monthly_averages,
-                "Average listens per month",
+            lambda: _render_chart_section(
+                "Average listens by month",
+                _render_bar_chart(
+                    month_labels,
+                    monthly_averages,
+                    "Average listens per month",
+                ),
             ),
         ),
-        _render_chart_section(
+        (
             "Average listens by hour",
-            _render_bar_chart(
-                hour_labels,
-                hourly_averages,
-                "Average listens per hour",
+            lambda: _render_chart_section(
+                "Average listens by hour",
+                _render_bar_chart(
+                    hour_labels,
+                    hourly_averages,
+                    "Average listens per hour",
+                ),
             ),
         ),
-        _render_chart_section(
+        (
             "Unique artists by month",
-            _render_bar_chart(
-                monthly_artist_labels,
-                [count for _, count in monthly_artist_counts],
-                "Unique artists per month",
+            lambda: _render_chart_section(
+                "Unique artists by month",
+                _render_bar_chart(
+                    monthly_artist_labels,
+                    [count for _, count in monthly_artist_counts],
+                    "Unique artists per month",
+                    tooltip_labels=[label for label, _ in monthly_artist_counts],
+                ),
             ),
         ),
-        _render_chart_section(
+        (
             "New artists discovered by month",
-            _render_bar_chart(
-                monthly_new_artist_labels,
-                [count for _, count in monthly_new_artist_counts],
-                "New artists discovered per month",
+            lambda: _render_chart_section(
+                "New artists discovered by month",
+                _render_bar_chart(
+                    monthly_new_artist_labels,
+                    [count for _, count in monthly_new_artist_counts],
+                    "New artists discovered per month",
+                    tooltip_labels=[label for label, _ in monthly_new_artist_counts],
+                ),
             ),
         ),
     ]
+    if analyses.hourly_minutes:
+        sections.extend(_playtime_sections(analyses, weekday_labels, month_labels, hour_labels))
+    if analyses.sessions is not None:
+        sections.extend(_session_sections(analyses.sessions, weekday_labels, hour_labels))
+    return sections
 
-    html_body = "\n".join(section for section in html_sections if section)
-    return render_page(report_title, html_body)
 
+def _playtime_sections(
+    analyses: ReportAnalyses,
+    weekday_labels: list[str],
+    month_labels: list[str],
+    hour_labels: list[str],
+) -> list[tuple[str, Callable[[], str]]]:
+    """
+    Return (title, render function) for each section weighted by time listened.
+    """
+    songs = analyses.song_minutes
+    albums = analyses.album_minutes
+    artists = analyses.artist_minutes
+    return [
+        (
+            "Top songs by listening time",
+            lambda: _render_table_section(
+                "Top songs by listening time",
+                ["Track", "Artist", "Minutes"],
+                [[track, artist, _format_float(minutes)] for track, artist, minutes in songs],
+            ),
+        ),
+        (
+            "Top albums by listening time",
+            lambda: _render_table_section(
+                "Top albums by listening time",
+                ["Album", "Artist", "Minutes"],
+                [[album, artist, _format_float(minutes)] for album, artist, minutes in albums],
+            ),
+        ),
+        (
+            "Top artists by listening time",
+            lambda: _render_table_section(
+                "Top artists by listening time",
+                ["Artist", "Minutes"],
+                [[artist, _format_float(minutes)] for artist, minutes in artists],
+            ),
+        ),
+        (
+            "Average minutes by weekday",
+            lambda: _render_chart_section(
+                "Average minutes by weekday",
+                _render_bar_chart(
+                    weekday_labels, analyses.weekday_minutes, "Average minutes per weekday"
+                ),
+            ),
+        ),
+        (
+            "Average minutes by month",
+            lambda: _render_chart_section(
+                "Average minutes by month",
+                _render_bar_chart(
+                    month_labels, analyses.monthly_minutes, "Average minutes per month"
+                ),
+            ),
+        ),
+        (
+            "Average minutes by hour",
+            lambda: _render_chart_section(
+                "Average minutes by hour",
+                _render_bar_chart(hour_labels, analyses.hourly_minutes, "Average minutes per hour"),
+            ),
+        ),
+    ]
 
-def write_html_report(
-    records: Iterable[dict],
-    output_path: str | Path,
-    report_title: str = "Spotify GDPR Listening Report",
-) -> Path:
+
+def _session_sections(
+    sessions: ListeningSessions, weekday_labels: list[str], hour_labels: list[str]
+) -> list[tuple[str, Callable[[], str]]]:
     """
-    Write an HTML report to disk and return the written path.
+    Return (title, render function) for each listening session section.
     """
-    file_path = Path(output_path)
-    file_path.write_text(
-        render_html_report(records, report_title),
-        encoding="utf-8",
-    )
-    return file_path
+    summary_rows = [
+        ["Sessions", _format_count(sessions.sessions)],
+        ["Plays", _format_count(sessions.plays)],
+        ["Mean session length", f"{_format_float(sessions.mean_minutes)} min"],
+        ["Mean plays per session", _format_float(sessions.mean_plays)],
+        ["Skip density", f"{_format_float(sessions.skip_density * 100)}%"],
+    ]
+    return [
+        (
+            "Listening sessions",
+            lambda: _render_table_section(
+                "Listening sessions",
+                ["Metric", "Value"],
+                summary_rows if sessions.sessions else [],
+            ),
+        ),
+        (
+            "Session lengths",
+            lambda: _render_chart_section(
+                "Session lengths",
+                _render_bar_chart(
+                    [label for label, _ in sessions.lengths],
+                    [count for _, count in sessions.lengths],
+                    "Sessions per length",
+                ),
+            ),
+        ),
+        (
+            "Plays per session",
+            lambda: _render_chart_section(
+                "Plays per session",
+                _render_bar_chart(
+                    [label for label, _ in sessions.plays_per_session],
+                    [count for _, count in sessions.plays_per_session],
+                    "Sessions per play count",
+                ),
+            ),
+        ),
+        (
+            "Sessions by start hour",
+            lambda: _render_chart_section(
+                "Sessions by start hour",
+                _render_bar_chart(hour_labels, sessions.by_hour, "Sessions started per hour"),
+            ),
+        ),
+        (
+            "Sessions by start weekday",
+            lambda: _render_chart_section(
+                "Sessions by start weekday",
+                _render_bar_chart(
+                    weekday_labels, sessions.by_weekday, "Sessions started per weekday"
+                ),
+            ),
+        ),
+        (
+            "Skip density by session length",
+            lambda: _render_chart_section(
+                "Skip density by session length",
+                _render_bar_chart(
+                    [label for label, _ in sessions.skip_density_by_length],
+                    [density * 100 for _, density in sessions.skip_density_by_length],
+                    "Skipped plays per session length (%)",
+                ),
+            ),
+        ),
+    ]
 
 
 def _render_table_section(title: str, headers: list[str], rows: list[list[str]]) -> str:
@@ -148,9 +407,35 @@ def _year_only_labels(labels: list[str]) -> list[str]:
     return [label.split("-")[0] if label.endswith("-01") else "" for label in labels]
 
 
-def _render_bar_chart(labels: list[str], values: list[float], chart_title: str) -> str:
+def _render_bar_chart(
+    labels: list[str],
+    values: list[float],
+    chart_title: str,
+    tooltip_labels: list[str] | None = None,
+    max_bars: int = DEFAULT_MAX_BARS,
+    method: str = "max",
+) -> str:
+    """
+    Return an SVG bar chart of at most ``max_bars`` bars.
+
+    Longer series are bucketed with ``bucket_series``; each bar then shows
+    its bucket's ``method`` value, is labelled with the first non-empty axis
+    label in the bucket, and has a tooltip summarizing the bucket between its
+    first and last ``tooltip_labels`` (the axis labels by default).
+    """
     if not labels or not values or len(labels) != len(values):
         return ""
+    if len(values) > max_bars:
+        tooltip_labels = labels if tooltip_labels is None else tooltip_labels
+        buckets = bucket_series(values, max_bars, method)
+        labels = [
+            next((label for label in labels[bucket.start:bucket.end] if label), "")
+            for bucket in buckets
+        ]
+        tooltips = [_bucket_tooltip(bucket, tooltip_labels) for bucket in buckets]
+        values = [bucket.value for bucket in buckets]
+    else:
+        tooltips = [f"{escape(label)}: {_format_float(value)}" for label, value in zip(labels, values)]
 
     chart_width = 760
     chart_height = 260
@@ -169,17 +454,16 @@ def _render_bar_chart(labels: list[str], values: list[float], chart_title: str)
 
     bars = []
     labels_html = []
-    for index, (label, value) in enumerate(zip(labels, values)):
+    for index, (label, value, tooltip) in enumerate(zip(labels, values, tooltips)):
         height = 0 if maximum_value == 0 else (value / maximum_value) * usable_height
         x = padding + index * (bar_width + bar_gap)
         y = padding + usable_height - height
         safe_label = escape(label)
-        formatted_value = _format_float(value)
         bars.append(
             "<rect class='bar' "
             f"x='{x:.2f}' y='{y:.2f}' "
             f"width='{bar_width:.2f}' height='{height:.2f}'>"
-            f"<title>{safe_label}: {formatted_value}</title>"
+            f"<title>{tooltip}</title>"
             "</rect>"
         )
         label_x = x + bar_width / 2
@@ -199,6 +483,18 @@ def _render_bar_chart(labels: list[str], values: list[float], chart_title: str)
     )
 
 
+def _bucket_tooltip(bucket: Bucket, labels: list[str]) -> str:
+    first = escape(labels[bucket.start])
+    if bucket.end - bucket.start == 1:
+        return f"{first}: {_format_float(bucket.value)}"
+    last = escape(labels[bucket.end - 1])
+    return (
+        f"{first} – {last}: max {_format_float(bucket.maximum)}, "
+        f"mean {_format_float(bucket.mean)}, min {_format_float(bucket.minimum)} "
+        f"({bucket.end - bucket.start} values)"
+    )
+
+
 def _format_count(count: int) -> str:
     return f"{count:,}"
 
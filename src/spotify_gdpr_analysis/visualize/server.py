@@ -0,0 +1,358 @@
+"""
+A local HTTP server for exploring one export interactively.
+
+The export is loaded once into an in-memory ``StreamingHistory`` table and the
+full-range aggregate is computed at start-up. Each request names a date range,
+time zone and top-list limit in its query string. Aggregates, finalized
+analyses and rendered report sections are kept in LRU caches keyed by those
+parameters. A repeated request is answered from memory, and a new range or time
+zone costs one aggregation pass over the in-memory rows, without reading the
+export again.
+
+Routes:
+
+- ``/``: the full HTML report.
+- ``/sections/<slug>``: one report section as an HTML fragment, e.g. ``/sections/top-songs``.
+- ``/api``: the available analyses.
+- ``/api/<analysis>``: one analysis as JSON, e.g. ``/api/songs``.
+
+Every route accepts ``since``, ``until`` (ISO dates or times, UTC unless an
+offset is given), ``tz`` (an IANA time zone name) and ``limit``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from collections import OrderedDict
+from collections.abc import Hashable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from html import escape
+from pathlib import Path
+from typing import Callable
+from urllib.parse import parse_qs, unquote, urlsplit
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from spotify_gdpr_analysis.analysis.engine import ReportAggregator, ReportAnalyses
+from spotify_gdpr_analysis.analysis.timestamps import DEFAULT_TIMEZONE
+from spotify_gdpr_analysis.io.cache import cached_streaming_history_table
+from spotify_gdpr_analysis.io.streaming_history import ts_bound
+from spotify_gdpr_analysis.io.table import (
+    StreamingHistory,
+    parse_epoch_seconds,
+    streaming_history_table,
+)
+from spotify_gdpr_analysis.visualize.report import report_sections
+from spotify_gdpr_analysis.visualize.templates import render_page_footer, render_page_header
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 1000
+DEFAULT_SECTION_CACHE_SIZE = 256
+
+ANALYSIS_NAMES = tuple(
+    report_field.name for report_field in fields(ReportAnalyses) if report_field.name != "sessions"
+)
+
+_AGGREGATE_CACHE_SIZE = 8
+_ANALYSES_CACHE_SIZE = 64
+_STATUS_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+_HTML = "text/html; charset=utf-8"
+_JSON = "application/json"
+
+
+class LRUCache:
+    """
+    Mapping of at most ``maxsize`` entries that evicts the least recently used.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, got {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, object] = OrderedDict()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], object]) -> object:
+        """
+        Return the value cached for ``key``, calling ``compute`` to fill a miss.
+        """
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        value = self._entries[key] = compute()
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@dataclass(frozen=True)
+class ReportQuery:
+    """
+    The parameters of one request.
+
+    ``start`` and ``end`` bound the plays in UTC epoch seconds, ``timezone``
+    is the IANA name local times are bucketed in and ``limit`` caps top lists.
+    """
+
+    start: int | None = None
+    end: int | None = None
+    timezone: str = str(DEFAULT_TIMEZONE)
+    limit: int = DEFAULT_LIMIT
+
+    @classmethod
+    def from_query_string(cls, query: str) -> ReportQuery:
+        """
+        Parse ``since``, ``until``, ``tz`` and ``limit`` from a URL query string.
+
+        Missing parameters keep their defaults; invalid ones raise ``ValueError``.
+        """
+        params = {name: values[-1] for name, values in parse_qs(query).items()}
+        bounds = {}
+        for name in ("since", "until"):
+            if name not in params:
+                continue
+            try:
+                bounds[name] = parse_epoch_seconds(ts_bound(params[name]))
+            except ValueError:
+                raise ValueError(
+                    f"{name} must be an ISO date or time, got {params[name]!r}"
+                ) from None
+        timezone = params.get("tz", cls.timezone)
+        try:
+            ZoneInfo(timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown time zone {timezone!r}") from None
+        limit = params.get("limit", str(DEFAULT_LIMIT))
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_LIMIT:
+            raise ValueError(f"limit must be an integer from 1 to {MAX_LIMIT}, got {limit!r}")
+        return cls(bounds.get("since"), bounds.get("until"), timezone, int(limit))
+
+    @property
+    def range_key(self) -> tuple[int | None, int | None, str]:
+        return self.start, self.end, self.timezone
+
+
+class ReportServer:
+    """
+    Serves the report and per-analysis JSON for one export loaded in memory.
+
+    Aggregation and rendering run on a single worker thread, so the event
+    loop keeps accepting connections while a new parameter set is computed.
+    """
+
+    def __init__(
+        self,
+        table: StreamingHistory,
+        report_title: str = "Spotify GDPR Listening Report",
+        section_cache_size: int = DEFAULT_SECTION_CACHE_SIZE,
+    ) -> None:
+        self.table = table
+        self.report_title = report_title
+        self.aggregates = LRUCache(_AGGREGATE_CACHE_SIZE)
+        self.analyses = LRUCache(_ANALYSES_CACHE_SIZE)
+        self.sections = LRUCache(section_cache_size)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.aggregate(ReportQuery())
+
+    @classmethod
+    def load(
+        cls,
+        data_dir: str | Path,
+        report_title: str = "Spotify GDPR Listening Report",
+        cache: bool = True,
+        cache_dir: str | Path | None = None,
+        section_cache_size: int = DEFAULT_SECTION_CACHE_SIZE,
+    ) -> ReportServer:
+        """
+        Load ``data_dir`` once, through its ``ExportCache`` unless ``cache`` is false.
+        """
+        if cache:
+            table = cached_streaming_history_table(data_dir, cache_dir)
+        else:
+            table = streaming_history_table(data_dir)
+        return cls(table, report_title, section_cache_size)
+
+    def aggregate(self, query: ReportQuery) -> ReportAggregator:
+        """
+        Return the aggregate of the plays in ``query``'s range and time zone.
+        """
+        return self.aggregates.get_or_compute(query.range_key, lambda: self._aggregate(query))
+
+    def report_analyses(self, query: ReportQuery) -> ReportAnalyses:
+        """
+        Return every analysis for ``query``.
+        """
+        key = (*query.range_key, query.limit)
+        return self.analyses.get_or_compute(
+            key, lambda: self.aggregate(query).finalize(query.limit)
+        )
+
+    def section_slugs(self) -> list[str]:
+        """
+        Return the slug of every report section, in page order.
+        """
+        return [_slug(title) for title, _ in report_sections(self.report_analyses(ReportQuery()))]
+
+    def render_section(self, slug: str, query: ReportQuery) -> str | None:
+        """
+        Return the HTML of one report section, or ``None`` for an unknown slug.
+
+        A section with nothing to show renders as an empty string.
+        """
+        renderers = {
+            _slug(title): render for title, render in report_sections(self.report_analyses(query))
+        }
+        if slug not in renderers:
+            return None
+        key = (slug, *query.range_key, query.limit)
+        return self.sections.get_or_compute(key, renderers[slug])
+
+    def render_page(self, query: ReportQuery) -> str:
+        """
+        Return the full HTML report for ``query``, assembled from cached sections.
+        """
+        pieces = (self.render_section(slug, query) for slug in self.section_slugs())
+        return (
+            render_page_header(self.report_title)
+            + "\n".join(piece for piece in pieces if piece)
+            + render_page_footer()
+        )
+
+    def respond(self, method: str, target: str) -> tuple[int, str, bytes]:
+        """
+        Return ``(status, content type, body)`` for a request.
+        """
+        if method not in ("GET", "HEAD"):
+            return _error(405, f"Method {method} is not allowed")
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip("/") or "/"
+        try:
+            query = ReportQuery.from_query_string(url.query)
+        except ValueError as error:
+            return _error(400, str(error))
+        if path == "/":
+            return 200, _HTML, self.render_page(query).encode("utf-8")
+        if path.startswith("/sections/"):
+            section_html = self.render_section(path[len("/sections/"):], query)
+            if section_html is None:
+                return _error(404, f"No report section {path}", _HTML)
+            return 200, _HTML, section_html.encode("utf-8")
+        if path == "/api":
+            return 200, _JSON, _json_body({"analyses": list(ANALYSIS_NAMES)})
+        if path.startswith("/api/"):
+            name = path[len("/api/"):]
+            if name not in ANALYSIS_NAMES:
+                return _error(404, f"No analysis named {name!r}")
+            result = getattr(self.report_analyses(query), name)
+            return 200, _JSON, _json_body({"analysis": name, **asdict(query), "result": result})
+        return _error(404, f"Nothing at {path}")
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.Server:
+        """
+        Start listening and return the ``asyncio`` server; ``port=0`` picks a free port.
+        """
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        """
+        Serve requests until cancelled.
+        """
+        server = await self.start(host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """
+        Stop the worker thread.
+        """
+        self._executor.shutdown(wait=False)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) != 3:
+                status, content_type, body = _error(400, "Malformed request line")
+                method = "GET"
+            else:
+                method, target, _ = parts
+                loop = asyncio.get_running_loop()
+                try:
+                    status, content_type, body = await loop.run_in_executor(
+                        self._executor, self.respond, method, target
+                    )
+                except Exception as error:
+                    status, content_type, body = _error(500, f"{type(error).__name__}: {error}")
+            head = (
+                f"HTTP/1.1 {status} {_STATUS_REASONS[status]}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(head.encode("latin-1") + (b"" if method == "HEAD" else body))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _aggregate(self, query: ReportQuery) -> ReportAggregator:
+        table = self.table
+        if query.start is not None or query.end is not None:
+            start = float("-inf") if query.start is None else query.start
+            end = float("inf") if query.end is None else query.end
+            table = table.take(row for row, epoch in enumerate(table.ts) if start <= epoch < end)
+        aggregator = ReportAggregator(ZoneInfo(query.timezone))
+        aggregator.update(table)
+        return aggregator
+
+
+def serve_report(
+    data_dir: str | Path,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    report_title: str = "Spotify GDPR Listening Report",
+    cache: bool = True,
+) -> None:
+    """
+    Load ``data_dir`` and serve its report until interrupted.
+    """
+    asyncio.run(ReportServer.load(data_dir, report_title, cache).serve(host, port))
+
+
+def _slug(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+
+
+def _json_body(payload: dict) -> bytes:
+    return json.dumps(payload).encode("utf-8")
+
+
+def _error(status: int, message: str, content_type: str = _JSON) -> tuple[int, str, bytes]:
+    if content_type == _HTML:
+        return status, _HTML, f"<p>{escape(message)}</p>".encode("utf-8")
+    return status, _JSON, _json_body({"error": message})
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from spotify_gdpr_analysis.io.cache import DEFAULT_CACHE_DIRNAME
+from spotify_gdpr_analysis.visualize.server import (
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    DEFAULT_SECTION_CACHE_SIZE,
+    ReportServer,
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Serve an interactive report and JSON analyses for a Spotify GDPR export, "
+            "loaded once and kept in memory."
+        ),
+    )
+    parser.add_argument(
+        "data_dir",
+        help=(
+            "Directory containing Streaming_History_Audio_*.json files, "
+            "or the export's ZIP archive (read without extracting)."
+        ),
+    )
+    parser.add_argument(
+        "--host",
+        default=DEFAULT_HOST,
+        help=f"Address to listen on (default: {DEFAULT_HOST}).",
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port to listen on (default: {DEFAULT_PORT}).",
+    )
+    parser.add_argument(
+        "--title",
+        default="Spotify GDPR Listening Report",
+        help="Custom report title.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help=(
+            f"Directory for the parsed-export cache (default: DATA_DIR/{DEFAULT_CACHE_DIRNAME}, "
+            "or next to a ZIP archive)."
+        ),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every export file from scratch without reading or writing the cache.",
+    )
+    parser.add_argument(
+        "--section-cache-size",
+        type=int,
+        default=DEFAULT_SECTION_CACHE_SIZE,
+        help=(
+            "Rendered report sections to keep, across all parameter sets "
+            f"(default: {DEFAULT_SECTION_CACHE_SIZE})."
+        ),
+    )
+    return parser
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.section_cache_size < 1:
+        parser.error("--section-cache-size must be at least 1")
+    server = ReportServer.load(
+        args.data_dir,
+        args.title,
+        cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        section_cache_size=args.section_cache_size,
+    )
+    print(
+        f"Loaded {len(server.table):,} plays; serving on http://{args.host}:{args.port}/",
+        flush=True,
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -144,6 +144,13 @@ svg {
 
 
 def render_page(report_title: str, body_html: str) -> str:
+    return render_page_header(report_title) + body_html + render_page_footer()
+
+
+def render_page_header(report_title: str) -> str:
+    """
+    Return the page up to where the body HTML starts.
+    """
     title = escape(report_title)
     return f"""<!doctype html>
 <html lang="en">
@@ -161,7 +168,14 @@ def render_page(report_title: str, body_html: str) -> str:
     <p>Generated from Spotify streaming history exports.</p>
   </header>
   <main>
-    {body_html}
+    """
+
+
+def render_page_footer() -> str:
+    """
+    Return the page from where the body HTML ends.
+    """
+    return """
   </main>
 </body>
 </html>
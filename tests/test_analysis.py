@@ -0,0 +1,445 @@
+from __future__ import annotations
+
+import importlib.util
+import json
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from spotify_gdpr_analysis.analysis import (
+    ApproximateTopArtistsState,
+    HourlyAverageState,
+    HourlyPlaytimeState,
+    ListeningSessionsState,
+    MonthlyAverageState,
+    MonthlyNewArtistsState,
+    MonthlyPlaytimeState,
+    MonthlyUniqueArtistsSketchState,
+    MonthlyUniqueArtistsState,
+    ReportAggregator,
+    TopAlbumsPlaytimeState,
+    TopAlbumsState,
+    TopArtistsPlaytimeState,
+    TopArtistsState,
+    TopSongsPlaytimeState,
+    TopSongsState,
+    WeekdayAverageState,
+    WeekdayPlaytimeState,
+    approximate_top_songs,
+    hourly_average_minutes,
+    hourly_average_streams,
+    iter_monthly_new_artists,
+    listening_sessions,
+    monthly_average_minutes,
+    monthly_average_streams,
+    monthly_new_artists,
+    monthly_unique_artists,
+    parallel_run_analyses,
+    run_analyses,
+    top_albums,
+    top_albums_by_playtime,
+    top_artists,
+    top_artists_by_playtime,
+    top_songs,
+    top_songs_by_playtime,
+    weekday_average_minutes,
+    weekday_average_streams,
+)
+from spotify_gdpr_analysis.analysis import temporal
+from spotify_gdpr_analysis.analysis.engine import REPORT_FIELDS, analysis_fields
+from spotify_gdpr_analysis.analysis.incremental import incremental_aggregate
+from spotify_gdpr_analysis.analysis.timestamps import LocalTimeConverter
+from spotify_gdpr_analysis.io import OutOfOrderError, StreamingHistory, ordered_streaming_history
+from spotify_gdpr_analysis.io.streaming_history import project_record
+
+
+def _record(ts: str, track: str | None, artist: str | None, album: str | None) -> dict:
+    return {
+        "ts": ts,
+        "ms_played": 180000,
+        "master_metadata_track_name": track,
+        "master_metadata_album_artist_name": artist,
+        "master_metadata_album_album_name": album,
+        "spotify_track_uri": f"spotify:track:{track}" if track else None,
+    }
+
+
+def _records() -> list[dict]:
+    return [
+        _record("2023-03-12T09:30:00Z", "Song A", "Artist 1", "Album X"),
+        _record("2023-03-12T10:30:00Z", "Song A", "Artist 1", "Album X"),
+        _record("2023-03-31T23:59:59Z", "Song B", "Artist 2", "Album Y"),
+        _record("2023-04-01T07:00:00Z", "Song C", "Artist 1", None),
+        _record("2023-11-05T08:30:00Z", None, None, None),
+        _record("2024-01-01T07:59:59Z", "Song D", "Artist 3", "Album Z"),
+        _record("2024-01-01T08:00:00Z", "Song B", "Artist 2", "Album Y"),
+    ]
+
+
+def test_run_analyses_matches_individual_functions() -> None:
+    records = _records()
+
+    analyses = run_analyses(iter(records))
+
+    assert analyses.songs == top_songs(records)
+    assert analyses.albums == top_albums(records)
+    assert analyses.artists == top_artists(records)
+    assert analyses.weekday_averages == weekday_average_streams(records)
+    assert analyses.monthly_averages == monthly_average_streams(records)
+    assert analyses.hourly_averages == hourly_average_streams(records)
+    assert analyses.monthly_unique_artists == monthly_unique_artists(records)
+    assert analyses.monthly_new_artists == monthly_new_artists(records)
+
+
+def test_analysis_fields_project_records_without_changing_results() -> None:
+    records = [{**record, "ip_addr": "10.0.0.1", "platform": "ios"} for record in _records()]
+    fields = analysis_fields([top_artists, monthly_new_artists])
+
+    assert fields == ("master_metadata_album_artist_name", "ts")
+    assert set(REPORT_FIELDS) == {
+        "ts",
+        "ms_played",
+        "master_metadata_track_name",
+        "master_metadata_album_artist_name",
+        "master_metadata_album_album_name",
+    }
+    projected = [project_record(record, REPORT_FIELDS) for record in records]
+    assert run_analyses(projected) == run_analyses(records)
+    with pytest.raises(ValueError):
+        analysis_fields([len])
+
+
+def test_playtime_analyses_weight_plays_by_ms_played() -> None:
+    records = _records()
+    records[2] = {**records[2], "ms_played": 3_000_000}
+    records[3] = {**records[3], "ms_played": None}
+    table = StreamingHistory.from_records(records)
+
+    assert top_artists(records)[0] == ("Artist 1", 3)
+    assert top_artists_by_playtime(records) == [
+        ("Artist 2", 53.0),
+        ("Artist 1", 6.0),
+        ("Artist 3", 3.0),
+    ]
+    assert top_songs_by_playtime(records)[:2] == [
+        ("Song B", "Artist 2", 53.0),
+        ("Song A", "Artist 1", 6.0),
+    ]
+    assert weekday_average_minutes(records)[4] == 50.0 / 5
+    assert hourly_average_minutes(records)[16] == 50.0 / 6
+
+    analyses = run_analyses(iter(records))
+    assert analyses == run_analyses(table)
+    assert analyses.artist_minutes == top_artists_by_playtime(table)
+    assert analyses.monthly_minutes == monthly_average_minutes(records)
+
+
+def test_temporal_analyses_use_local_time() -> None:
+    records = _records()
+
+    assert monthly_new_artists(records) == [
+        ("2023-03", 2),
+        ("2023-12", 1),
+    ]
+    assert monthly_unique_artists(records)[-1] == ("2024-01", 1)
+
+
+def test_streaming_history_table_matches_record_dicts() -> None:
+    records = _records()
+
+    table = StreamingHistory.from_records(records)
+
+    assert len(table) == len(records)
+    assert list(table) == records
+    assert run_analyses(table) == run_analyses(records)
+
+
+def test_local_time_converter_matches_astimezone_across_transitions() -> None:
+    zone = ZoneInfo("America/Los_Angeles")
+    converter = LocalTimeConverter(zone)
+    spring_forward = 1678615200  # 2023-03-12T10:00:00Z
+    fall_back = 1699174800  # 2023-11-05T09:00:00Z
+
+    for transition in (spring_forward, fall_back):
+        for epoch in range(transition - 7200, transition + 7200, 599):
+            expected = datetime.fromtimestamp(epoch, timezone.utc).astimezone(zone)
+            day, hour = converter.local_day_and_hour(epoch)
+            iso_year, iso_week, _ = expected.isocalendar()
+
+            assert (day.year, day.month, day.day, hour) == (
+                expected.year,
+                expected.month,
+                expected.day,
+                expected.hour,
+            )
+            assert (day.weekday, day.iso_year, day.iso_week) == (
+                expected.weekday(),
+                iso_year,
+                iso_week,
+            )
+
+
+@pytest.mark.parametrize(
+    "analysis",
+    [
+        weekday_average_streams,
+        monthly_average_streams,
+        hourly_average_streams,
+        monthly_unique_artists,
+        monthly_new_artists,
+    ],
+)
+def test_numpy_backend_matches_python_backend(analysis) -> None:
+    pytest.importorskip("numpy")
+    records = _records()
+    table = StreamingHistory.from_records(records)
+
+    assert analysis(records, backend="numpy") == analysis(records, backend="python")
+    assert analysis(table, backend="numpy") == analysis(table, backend="python")
+
+
+@pytest.mark.parametrize(
+    "analysis",
+    [
+        weekday_average_streams,
+        monthly_average_streams,
+        hourly_average_streams,
+        monthly_unique_artists,
+        monthly_new_artists,
+    ],
+)
+def test_record_dicts_are_localized_in_chunks(analysis, monkeypatch) -> None:
+    records = _records()
+    expected = analysis(StreamingHistory.from_records(records), backend="python")
+    monkeypatch.setattr(temporal, "_LOCAL_TIME_CHUNK_SIZE", 3)
+
+    assert analysis(iter(records), backend="python") == expected
+    if importlib.util.find_spec("numpy") is not None:
+        assert analysis(iter(records), backend="numpy") == expected
+
+
+def test_monthly_new_artists_stream_from_time_ordered_files(tmp_path: Path) -> None:
+    records = _records()
+    # Overlapping file ranges with a swapped pair inside the second file.
+    chunks = (records[0::2], [records[3], records[1], records[5]])
+    for index, chunk in enumerate(chunks):
+        path = tmp_path / f"Streaming_History_Audio_{index}.json"
+        path.write_text(json.dumps(chunk), encoding="utf-8")
+
+    ordered = list(ordered_streaming_history(tmp_path, reorder_window=1))
+    assert [record["ts"] for record in ordered] == sorted(record["ts"] for record in ordered)
+    assert len(ordered) == 7
+    assert list(iter_monthly_new_artists(ordered)) == monthly_new_artists(records)
+    with pytest.raises(OutOfOrderError, match="out of time order") as error:
+        list(ordered_streaming_history(tmp_path, reorder_window=0))
+    assert error.value.source.name == "Streaming_History_Audio_1.json"
+    resorted = ordered_streaming_history(
+        tmp_path, reorder_window=0, sort_in_memory={error.value.source}
+    )
+    assert list(resorted) == ordered
+    with pytest.raises(ValueError, match="not in time order"):
+        list(iter_monthly_new_artists(reversed(records)))
+
+
+def test_listening_sessions_split_on_gaps() -> None:
+    records = [
+        {"ts": "2024-01-01T18:03:00Z", "ms_played": 180000, "skipped": False},
+        {"ts": "2024-01-01T18:05:00Z", "ms_played": 60000, "skipped": True},
+        {"ts": "2024-01-01T18:40:00Z", "ms_played": 180000, "skipped": None},
+        {"ts": "2024-01-02T20:00:00Z", "ms_played": 3600000},
+    ]
+
+    sessions = listening_sessions(records)
+
+    assert sessions.sessions == 3
+    assert sessions.skip_density == 0.25
+    assert sessions.mean_minutes == (5 + 3 + 60) / 3
+    assert dict(sessions.lengths) == {
+        "<15 min": 2, "15–30 min": 0, "30–60 min": 0, "1–2 h": 1, "2–4 h": 0, "4 h+": 0
+    }
+    assert dict(sessions.plays_per_session)["2–5"] == 1
+    assert dict(sessions.skip_density_by_length)["<15 min"] == 1 / 3
+    # Local starts in America/Los_Angeles: Monday 10:00 and 10:37, Tuesday 11:00.
+    assert sessions.by_hour[10] == 2 and sessions.by_hour[11] == 1
+    assert sessions.by_weekday[:2] == [2, 1]
+
+    state = ListeningSessionsState(gap_minutes=40)
+    state.update(records[:2])
+    state.update(records[2:])
+    assert state.finalize().sessions == 2
+    with pytest.raises(ValueError, match="not in time order"):
+        listening_sessions(reversed(records))
+
+
+def test_parallel_run_analyses_matches_serial(tmp_path: Path) -> None:
+    records = _records()
+    for index, chunk in enumerate((records[:3], records[3:5], records[5:])):
+        path = tmp_path / f"Streaming_History_Audio_{index}.json"
+        path.write_text(json.dumps(chunk), encoding="utf-8")
+
+    assert parallel_run_analyses(tmp_path, jobs=2) == run_analyses(records)
+
+
+def test_parallel_run_analyses_reads_zip_archives(tmp_path: Path) -> None:
+    records = _records()
+    archive = tmp_path / "my_spotify_data.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as handle:
+        for index, chunk in enumerate((records[:4], records[4:])):
+            handle.writestr(f"Spotify Extended Streaming History/Streaming_History_Audio_{index}.json", json.dumps(chunk))
+
+    assert parallel_run_analyses(archive, jobs=2) == run_analyses(records)
+    assert parallel_run_analyses(archive, jobs=2, cache_dir=tmp_path / "cache") == run_analyses(records)
+
+
+@pytest.mark.parametrize(
+    ("state_type", "analysis"),
+    [
+        (TopSongsState, top_songs),
+        (TopAlbumsState, top_albums),
+        (TopArtistsState, top_artists),
+        (WeekdayAverageState, weekday_average_streams),
+        (MonthlyAverageState, monthly_average_streams),
+        (HourlyAverageState, hourly_average_streams),
+        (MonthlyUniqueArtistsState, monthly_unique_artists),
+        (MonthlyNewArtistsState, monthly_new_artists),
+        (TopSongsPlaytimeState, top_songs_by_playtime),
+        (TopAlbumsPlaytimeState, top_albums_by_playtime),
+        (TopArtistsPlaytimeState, top_artists_by_playtime),
+        (WeekdayPlaytimeState, weekday_average_minutes),
+        (MonthlyPlaytimeState, monthly_average_minutes),
+        (HourlyPlaytimeState, hourly_average_minutes),
+    ],
+)
+def test_states_merge_and_serialize_chunks(state_type, analysis) -> None:
+    records = _records()
+    first = state_type()
+    first.update(records[:4])
+    second = state_type()
+    second.update(StreamingHistory.from_records(records[4:]))
+
+    first.merge(state_type.from_dict(json.loads(json.dumps(second.to_dict()))))
+
+    assert first.finalize() == analysis(records)
+
+
+def test_report_aggregator_round_trips_through_json() -> None:
+    records = _records()
+    aggregator = ReportAggregator()
+    aggregator.update(records)
+
+    restored = ReportAggregator.from_dict(json.loads(json.dumps(aggregator.to_dict())))
+
+    assert restored.finalize() == run_analyses(records)
+
+
+def test_report_aggregator_round_trips_its_time_zone() -> None:
+    records = _records()
+    berlin = ZoneInfo("Europe/Berlin")
+    aggregator = ReportAggregator(berlin)
+    aggregator.update(records)
+
+    restored = ReportAggregator.from_dict(json.loads(json.dumps(aggregator.to_dict())))
+
+    assert restored.timezone == berlin
+    assert restored.finalize() == aggregator.finalize()
+    restored.merge(aggregator)
+    with pytest.raises(ValueError):
+        ReportAggregator().merge(restored)
+
+
+def test_incremental_aggregate_only_ingests_new_files(tmp_path: Path) -> None:
+    records = _records()
+    data_dir = tmp_path / "export"
+    data_dir.mkdir()
+    snapshot = tmp_path / "report.html.snapshot.json"
+    (data_dir / "Streaming_History_Audio_0.json").write_text(json.dumps(records[:4]))
+
+    first = incremental_aggregate(data_dir, snapshot)
+    (data_dir / "Streaming_History_Audio_1.json").write_text(json.dumps(records[4:]))
+    second = incremental_aggregate(data_dir, snapshot)
+
+    assert [path.name for path in first.ingested] == ["Streaming_History_Audio_0.json"]
+    assert [path.name for path in second.reused] == ["Streaming_History_Audio_0.json"]
+    assert [path.name for path in second.ingested] == ["Streaming_History_Audio_1.json"]
+    assert second.aggregator.finalize() == run_analyses(records)
+
+
+def test_incremental_aggregate_folds_a_re_split_export_and_rebuilds_on_change(
+    tmp_path: Path,
+) -> None:
+    records = _records()
+    data_dir = tmp_path / "export"
+    data_dir.mkdir()
+    snapshot = tmp_path / "report.html.snapshot.json"
+    old_files = [data_dir / f"Streaming_History_Audio_{name}.json" for name in ("2023_0", "2023_1")]
+    old_files[0].write_text(json.dumps(records[:3]))
+    old_files[1].write_text(json.dumps(records[3:5]))
+    incremental_aggregate(data_dir, snapshot)
+
+    for path in old_files:
+        path.unlink()
+    resplit = data_dir / "Streaming_History_Audio_2023-2024_0.json"
+    resplit.write_text(json.dumps(records[:6]))
+    (data_dir / "Streaming_History_Audio_2024_1.json").write_text(json.dumps(records[6:]))
+    folded = incremental_aggregate(data_dir, snapshot)
+
+    assert not folded.rebuilt and folded.dropped == 2 and folded.reused == []
+    assert folded.aggregator.finalize() == run_analyses(records)
+
+    resplit.write_text(json.dumps(records[1:6]))
+    rebuilt = incremental_aggregate(data_dir, snapshot)
+
+    assert rebuilt.rebuilt and len(rebuilt.ingested) == 2
+    assert rebuilt.aggregator.finalize() == run_analyses(records[1:])
+
+
+def test_approximate_top_k_is_exact_within_capacity_and_bounded_beyond() -> None:
+    records = [
+        _record(f"2024-01-01T00:{minute:02d}:00Z", "Track", f"Artist {artist}", "Album")
+        for minute, artist in enumerate([0] * 20 + [1] * 10 + list(range(2, 30)))
+    ]
+    exact = dict(top_artists(records, limit=100))
+
+    assert approximate_top_songs(_records(), capacity=100) == [
+        (*row, 0) for row in top_songs(_records())
+    ]
+
+    left = ApproximateTopArtistsState(capacity=5)
+    left.update(records[:29])
+    right = ApproximateTopArtistsState(capacity=5)
+    right.update(StreamingHistory.from_records(records[29:]))
+    left.merge(ApproximateTopArtistsState.from_dict(json.loads(json.dumps(right.to_dict()))))
+
+    top = left.finalize(limit=2)
+    assert [artist for artist, _, _ in top] == ["Artist 0", "Artist 1"]
+    for artist, count, error in left.finalize(limit=5):
+        assert count - error <= exact.get(artist, 0) <= count
+        assert error <= len(records) / 5
+
+
+def test_monthly_unique_artist_sketches_estimate_and_merge() -> None:
+    records = [
+        _record(f"2024-0{month}-15T12:00:00Z", "Track", f"Artist {artist}", "Album")
+        for month in (1, 2)
+        for artist in range(month * 500)
+    ]
+
+    assert monthly_unique_artists(_records(), sketch_precision=12) == monthly_unique_artists(_records())
+
+    left = MonthlyUniqueArtistsSketchState(precision=10)
+    left.update(records[:700])
+    right = MonthlyUniqueArtistsSketchState(precision=10)
+    right.update(StreamingHistory.from_records(records[300:]))
+    left.merge(MonthlyUniqueArtistsSketchState.from_dict(json.loads(json.dumps(right.to_dict()))))
+
+    estimates = dict(left.finalize())
+    assert estimates.keys() == {"2024-01", "2024-02"}
+    assert abs(estimates["2024-01"] - 500) <= 50
+    assert abs(estimates["2024-02"] - 1000) <= 100
+    coarser = MonthlyUniqueArtistsSketchState(precision=8)
+    coarser.update(records[:1])
+    with pytest.raises(ValueError):
+        left.merge(coarser)
@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from spotify_gdpr_analysis.visualize import (
+    expand_data_dirs,
+    plan_batch,
+    read_manifest,
+    render_html_report,
+    run_batch,
+)
+
+
+def _write_export(data_dir: Path, artist: str) -> list[dict]:
+    records = [
+        {
+            "ts": f"2024-01-0{day}T12:00:00Z",
+            "ms_played": 1000,
+            "master_metadata_track_name": f"Track {day}",
+            "master_metadata_album_artist_name": artist,
+            "master_metadata_album_album_name": "Album",
+        }
+        for day in range(1, 4)
+    ]
+    data_dir.mkdir()
+    (data_dir / "Streaming_History_Audio_2024.json").write_text(json.dumps(records))
+    return records
+
+
+def test_run_batch_reports_every_account_and_isolates_failures(tmp_path: Path) -> None:
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    alice = _write_export(exports / "alice", "Artist A")
+    _write_export(exports / "bob", "Artist B")
+    broken = exports / "carol"
+    broken.mkdir()
+    (broken / "Streaming_History_Audio_2024.json").write_text("{}")
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("# accounts\nexports/carol\n\n")
+
+    data_dirs = expand_data_dirs([str(exports / "[ab]*")]) + read_manifest(manifest)
+    jobs = plan_batch(data_dirs, tmp_path / "reports")
+    results = {result.job.account: result for result in run_batch(jobs, workers=2)}
+
+    assert sorted(results) == ["alice", "bob", "carol"]
+    assert results["alice"].ok and results["bob"].ok
+    assert "Expected a list of records" in results["carol"].error
+    assert (tmp_path / "reports" / "alice.html").read_text() == render_html_report(alice)
+    with pytest.raises(ValueError, match="both write"):
+        plan_batch([exports / "alice", tmp_path / "alice"], tmp_path / "reports")
+    with pytest.raises(ValueError, match="No exports match"):
+        expand_data_dirs([str(exports / "zed*")])
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from spotify_gdpr_analysis.benchmark import (
+    find_regressions,
+    generate_streaming_history,
+    load_results,
+    run_benchmarks,
+    write_results,
+)
+from spotify_gdpr_analysis.io.streaming_history import streaming_history
+
+
+def test_synthetic_exports_are_deterministic_and_match_schema(tmp_path: Path) -> None:
+    first = generate_streaming_history(tmp_path / "a", 2500, seed=7, records_per_file=1000)
+    second = generate_streaming_history(tmp_path / "b", 2500, seed=7, records_per_file=1000)
+
+    assert [path.name for path in first.paths] == [path.name for path in second.paths]
+    assert all(a.read_bytes() == b.read_bytes() for a, b in zip(first.paths, second.paths))
+
+    records = list(streaming_history(first.data_dir))
+    assert len(records) == 2500
+    assert len(first.paths) == 3
+    assert {"ts", "ms_played", "spotify_track_uri", "incognito_mode"} <= records[0].keys()
+    assert [record["ts"] for record in records] == sorted(record["ts"] for record in records)
+    assert {record["ts"][:4] for record in records} == {"2016", "2017", "2018", "2019"}
+
+
+def test_run_benchmarks_writes_comparable_results(tmp_path: Path) -> None:
+    results = run_benchmarks(tmp_path / "work", scales=[300], memory=False)
+    output = tmp_path / "results.json"
+    write_results(results, output)
+
+    stages = [result.stage for result in results]
+    assert stages[:2] == ["ingest", "ingest_cached"]
+    assert "monthly_new_artists" in stages and "render_html_report" in stages
+    assert load_results(output) == results
+    assert find_regressions(results, results) == []
@@ -0,0 +1,100 @@
+import json
+import os
+from pathlib import Path
+
+from spotify_gdpr_analysis.io import cache as cache_module
+from spotify_gdpr_analysis.io import (
+    ExportCache,
+    StreamingHistory,
+    cached_streaming_history_table,
+    streaming_history,
+)
+
+
+def _write_export(path: Path, artist: str, count: int) -> None:
+    records = [
+        {
+            "ts": f"2024-01-{day % 28 + 1:02d}T12:00:00Z",
+            "ms_played": 1000 * day,
+            "master_metadata_track_name": f"Track {day % 3}",
+            "master_metadata_album_artist_name": artist if day % 5 else None,
+            "master_metadata_album_album_name": "Album",
+            "spotify_track_uri": f"spotify:track:{day % 3}",
+        }
+        for day in range(count)
+    ]
+    path.write_text(json.dumps(records), encoding="utf-8")
+
+
+def test_cached_table_skips_json_decoding_on_rerun(tmp_path: Path, monkeypatch) -> None:
+    _write_export(tmp_path / "Streaming_History_Audio_2023.json", "Artist é", 40)
+    _write_export(tmp_path / "Streaming_History_Audio_2024.json", "Artist ✓", 25)
+    expected = list(StreamingHistory.from_records(streaming_history(tmp_path)))
+
+    first = cached_streaming_history_table(tmp_path)
+
+    def fail(path):
+        raise AssertionError(f"decoded {path} despite a warm cache")
+
+    monkeypatch.setattr(cache_module, "iter_streaming_history_json", fail)
+    second = cached_streaming_history_table(tmp_path)
+
+    assert list(first) == expected
+    assert list(second) == expected
+
+
+def test_cache_invalidates_changed_files(tmp_path: Path) -> None:
+    path = tmp_path / "Streaming_History_Audio_2024.json"
+    cache = ExportCache(tmp_path / "cache")
+    _write_export(path, "Before", 10)
+    cache.load(path)
+
+    _write_export(path, "After", 12)
+
+    table = cache.load(path)
+    assert len(table) == 12
+    assert table.encoded("master_metadata_album_artist_name")[1] == ["After"]
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path: Path) -> None:
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"Streaming_History_Audio_{index}.json"
+        _write_export(path, f"Artist {index}", 200)
+        paths.append(path)
+    cache = ExportCache(tmp_path / "cache", max_bytes=1)
+
+    for path in paths:
+        cache.load(path)
+
+    assert len(list((tmp_path / "cache").glob("*.bin"))) == 1
+    assert len(cache.load(paths[0])) == 200
+
+
+def test_cache_round_trips_names_with_nul_and_empty_strings(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "Streaming_History_Audio_2024.json"
+    _write_export(path, "Artist\0with NUL", 10)
+    records = json.loads(path.read_text(encoding="utf-8"))
+    records[0]["master_metadata_album_album_name"] = ""
+    path.write_text(json.dumps(records), encoding="utf-8")
+    cache = ExportCache(tmp_path / "cache")
+
+    cache.load(path)
+    monkeypatch.setattr(cache_module, "iter_streaming_history_json", None)
+    table = cache.load(path)
+    monkeypatch.undo()
+
+    assert list(table) == list(StreamingHistory.from_records(streaming_history(path.parent)))
+    assert not (tmp_path / "cache" / "index.lock").exists()
+
+
+def test_atomic_write_creates_files_with_the_current_umask(tmp_path: Path) -> None:
+    previous = os.umask(0o027)
+    try:
+        cache_module.atomic_write(tmp_path / "entry.bin", b"payload")
+    finally:
+        os.umask(previous)
+
+    assert (tmp_path / "entry.bin").read_bytes() == b"payload"
+    assert (tmp_path / "entry.bin").stat().st_mode & 0o777 == 0o640
+    assert [path.name for path in tmp_path.iterdir()] == ["entry.bin"]
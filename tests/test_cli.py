@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from spotify_gdpr_analysis.analysis import listening_sessions
+from spotify_gdpr_analysis.io.time_index import BLOCK_RECORDS
+from spotify_gdpr_analysis.visualize import cli
+
+
+def _loader(*argv: str):
+    parser = cli.build_parser()
+    return cli._select_loader(parser, parser.parse_args(["data", *argv]))
+
+
+@pytest.mark.parametrize(
+    ("argv", "loader"),
+    [
+        ((), cli._load_export),
+        (("--no-cache", "--sessions"), cli._load_export),
+        (("--store", "plays.db", "--since", "2024-01-01"), cli._load_store),
+        (("--incremental", "--jobs", "4"), cli._load_incremental),
+        (("--jobs", "4", "--sessions", "--reorder-window", "16"), cli._load_parallel),
+        (("--also", "other", "--dedupe"), cli._load_pooled),
+        (("--dedupe", "bloom", "--min-seconds", "30"), cli._load_pooled),
+        (("--until", "2024-01-01", "--sessions", "--session-gap", "5"), cli._load_filtered),
+    ],
+)
+def test_select_loader_picks_the_first_selected_mode(argv: tuple[str, ...], loader) -> None:
+    assert _loader(*argv) is loader
+
+
+@pytest.mark.parametrize(
+    ("argv", "message"),
+    [
+        (("--store", "plays.db", "--jobs", "2"), "--jobs cannot be combined with --store"),
+        (("--incremental", "--since", "2024"), "--since cannot be combined with --incremental"),
+        (("--jobs", "2", "--also", "other"), "--also cannot be combined with --jobs"),
+        (("--also", "other", "--sessions"), "--sessions cannot be combined with --also/--dedupe"),
+        (("--min-seconds", "5", "--no-cache"), "--no-cache cannot be combined with"),
+        (("--session-gap", "5"), "--session-gap requires --sessions"),
+        (("--jobs", "2", "--reorder-window", "8"), "--reorder-window requires --sessions"),
+    ],
+)
+def test_select_loader_rejects_options_the_mode_ignores(
+    argv: tuple[str, ...], message: str, capsys: pytest.CaptureFixture[str]
+) -> None:
+    with pytest.raises(SystemExit):
+        _loader(*argv)
+    assert message in capsys.readouterr().err
+
+
+def _plays(start_minute: int, count: int) -> list[dict]:
+    first = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=start_minute)
+    return [
+        {
+            "ts": (first + timedelta(minutes=3 * idx)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "ms_played": 60_000,
+        }
+        for idx in range(count)
+    ]
+
+
+def test_load_sessions_sorts_files_the_time_index_shows_out_of_order(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    shuffled = _plays(0, BLOCK_RECORDS) + _plays(-600, 10)
+    ordered = _plays(1, 20)
+    for name, plays in (("0", shuffled), ("1", ordered)):
+        (tmp_path / f"Streaming_History_Audio_2024_{name}.json").write_text(json.dumps(plays))
+    parser = cli.build_parser()
+    args = parser.parse_args([str(tmp_path), "--sessions", "--reorder-window", "8"])
+
+    sessions = cli._load_sessions(args, {}, None, None)
+
+    expected = listening_sessions(sorted(shuffled + ordered, key=lambda play: play["ts"]))
+    assert sessions == expected
+    diagnostics = capsys.readouterr()
+    assert diagnostics.out == ""
+    assert "Streaming_History_Audio_2024_0.json" in diagnostics.err
+    assert "Streaming_History_Audio_2024_1.json" not in diagnostics.err
+
+
+def test_load_sessions_fails_on_disorder_the_time_index_misses(tmp_path: Path) -> None:
+    plays = _plays(0, 20) + _plays(-600, 1)
+    (tmp_path / "Streaming_History_Audio_2024_0.json").write_text(json.dumps(plays))
+    args = cli.build_parser().parse_args([str(tmp_path), "--sessions", "--reorder-window", "8"])
+
+    with pytest.raises(SystemExit, match="rerun with a larger --reorder-window"):
+        cli._load_sessions(args, {}, None, None)
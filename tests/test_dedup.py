@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from spotify_gdpr_analysis.analysis import run_analyses
+from spotify_gdpr_analysis.io import (
+    PlayKeySet,
+    deduplicate_plays,
+    deduplicated_streaming_history,
+    play_key_hash,
+)
+
+
+def _record(ts: str, track: str | None, ms_played: int = 180000) -> dict:
+    return {
+        "ts": ts,
+        "ms_played": ms_played,
+        "master_metadata_track_name": track,
+        "master_metadata_album_artist_name": "Artist 1" if track else None,
+        "master_metadata_album_album_name": "Album X" if track else None,
+        "spotify_track_uri": f"spotify:track:{track}" if track else None,
+        "skipped": False,
+    }
+
+
+def _write_export(data_dir: Path, chunks: list[list[dict]]) -> None:
+    data_dir.mkdir()
+    for index, chunk in enumerate(chunks):
+        path = data_dir / f"Streaming_History_Audio_{index}.json"
+        path.write_text(json.dumps(chunk), encoding="utf-8")
+
+
+def test_play_key_set_grows_and_rejects_repeats() -> None:
+    keys = PlayKeySet(capacity=2)
+    hashes = [
+        play_key_hash(_record(f"2023-03-12T09:{minute:02d}:00Z", "Song A")) for minute in range(60)
+    ]
+    assert all(keys.add(key_hash) for key_hash in hashes)
+    assert not any(keys.add(key_hash) for key_hash in hashes)
+    assert len(keys) == 60 and all(key_hash in keys for key_hash in hashes)
+    assert keys.nbytes >= 2 * 60 * 8
+
+
+def test_deduplicated_streaming_history_pools_overlapping_exports(tmp_path: Path) -> None:
+    plays = [
+        _record("2023-03-12T09:30:00Z", "Song A"),
+        _record("2023-03-12T09:33:00Z", "Song B"),
+        _record("2023-03-12T09:33:00Z", "Song B", ms_played=5000),
+        _record("2023-04-01T07:00:00Z", None),
+        _record("2023-12-01T10:00:00Z", "Song C"),
+    ]
+    _write_export(tmp_path / "old", [plays[:2], plays[2:4]])
+    _write_export(tmp_path / "new", [plays[1:3] + plays[1:2], plays[3:]])
+    data_dirs = [tmp_path / "old", tmp_path / "new"]
+
+    assert list(deduplicate_plays(plays + plays)) == plays
+    for mode in ("exact", "bloom"):
+        pooled = deduplicated_streaming_history(data_dirs, mode)
+        assert list(pooled) == plays
+    fields = ("ts", "master_metadata_track_name")
+    projected = list(deduplicated_streaming_history(data_dirs, fields=fields, start="2023-04-01"))
+    assert projected == [{field: play[field] for field in fields} for play in plays[3:]]
+    assert run_analyses(deduplicated_streaming_history(data_dirs)) == run_analyses(plays)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from spotify_gdpr_analysis.analysis import (
+    monthly_new_artists,
+    run_analyses,
+    top_artists_by_playtime,
+    top_songs,
+)
+from spotify_gdpr_analysis.io import PlayStore, min_duration_filter, streaming_history
+
+
+def _record(ts: str, track: str | None, artist: str | None, album: str | None) -> dict:
+    return {
+        "ts": ts,
+        "ms_played": 180000,
+        "master_metadata_track_name": track,
+        "master_metadata_album_artist_name": artist,
+        "master_metadata_album_album_name": album,
+        "spotify_track_uri": f"spotify:track:{track}" if track else None,
+        "skipped": track == "Song B",
+    }
+
+
+def _records() -> list[dict]:
+    return [
+        _record("2023-03-12T09:30:00Z", "Song A", "Artist 1", "Album X"),
+        _record("2023-03-31T23:59:59Z", "Song B", "Artist 2", "Album Y"),
+        _record("2023-04-01T07:00:00Z", "Song C", "Artist 1", None),
+        _record("2023-11-05T08:30:00Z", None, None, None),
+        _record("2023-12-01T10:00:00Z", "Song A", "Artist 3", "Album Z"),
+        _record("2024-01-01T07:59:59Z", "Song D", "Artist 3", "Album Z"),
+        _record("2024-01-01T08:00:00Z", "Song B", "Artist 2", "Album Y"),
+    ]
+
+
+def _write_export(data_dir: Path, records: list[dict]) -> None:
+    data_dir.mkdir(exist_ok=True)
+    for index, chunk in enumerate((records[:4], records[4:])):
+        path = data_dir / f"Streaming_History_Audio_{index}.json"
+        path.write_text(json.dumps(chunk), encoding="utf-8")
+
+
+def test_play_store_answers_analyses_with_sql(tmp_path: Path) -> None:
+    records = _records()
+    data_dir = tmp_path / "export"
+    _write_export(data_dir, records)
+
+    with PlayStore(tmp_path / "plays.db") as store:
+        update = store.ingest(data_dir)
+        assert len(update.ingested) == 2 and len(store) == len(records)
+        assert run_analyses(store) == run_analyses(records)
+        assert list(store.select().records()) == records
+
+        window = store.select(start="2023-04-01", end="2024-01-01T08:00:00Z")
+        in_window = records[2:6]
+        assert run_analyses(window) == run_analyses(in_window)
+        assert top_songs(store.select(artist="Artist 3")) == [
+            ("Song A", "Artist 3", 1),
+            ("Song D", "Artist 3", 1),
+        ]
+        assert store.query("SELECT COUNT(*) FROM artists") == [(3,)]
+
+
+def test_play_store_ingests_only_changed_files(tmp_path: Path) -> None:
+    records = _records()
+    data_dir = tmp_path / "export"
+    _write_export(data_dir, records)
+    store_path = tmp_path / "plays.db"
+    with PlayStore(store_path) as store:
+        store.ingest(data_dir)
+
+    changed = data_dir / "Streaming_History_Audio_1.json"
+    changed.write_text(json.dumps(records[4:6]), encoding="utf-8")
+    os.utime(changed, ns=(0, 1))
+    (data_dir / "Streaming_History_Audio_0.json").unlink()
+
+    with PlayStore(store_path) as store:
+        update = store.ingest(data_dir)
+        assert update.ingested == [changed]
+        assert update.reused == [] and update.dropped == 4
+        assert monthly_new_artists(store) == monthly_new_artists(records[4:6])
+
+
+def test_play_store_keeps_export_order_when_a_file_is_re_ingested(tmp_path: Path) -> None:
+    records = _records()
+    data_dir = tmp_path / "export"
+    _write_export(data_dir, records)
+    store_path = tmp_path / "plays.db"
+    with PlayStore(store_path) as store:
+        store.ingest(data_dir)
+
+    first = data_dir / "Streaming_History_Audio_0.json"
+    os.utime(first, ns=(0, 1))
+    with PlayStore(store_path) as store:
+        assert store.ingest(data_dir).ingested == [first]
+        assert run_analyses(store) == run_analyses(records)
+        assert list(store.select().records()) == records
+
+    without_artist_1 = [records[1], *records[3:]]
+    first.write_text(json.dumps(without_artist_1[:2]), encoding="utf-8")
+    with PlayStore(store_path) as store:
+        store.ingest(data_dir)
+        assert run_analyses(store) == run_analyses(without_artist_1)
+        artists = store.query("SELECT name FROM artists ORDER BY name")
+        assert artists == [("Artist 2",), ("Artist 3",)]
+        assert store.query("SELECT COUNT(*) FROM albums") == [(2,)]
+        assert store.query("SELECT COUNT(*) FROM tracks") == [(3,)]
+
+
+def test_play_store_weights_by_playtime_and_filters_short_plays(tmp_path: Path) -> None:
+    records = _records()
+    for index, ms_played in enumerate((4000, 2_400_000, None, 90_000, 300_000, 29_999, 600_000)):
+        records[index]["ms_played"] = ms_played
+    data_dir = tmp_path / "export"
+    _write_export(data_dir, records)
+
+    with PlayStore(tmp_path / "plays.db") as store:
+        store.ingest(data_dir)
+        assert run_analyses(store) == run_analyses(records)
+        assert top_artists_by_playtime(store) == [
+            ("Artist 2", 50.0),
+            ("Artist 3", 5.0 + 29_999 / 60_000),
+            ("Artist 1", 4000 / 60_000),
+        ]
+
+        long_plays = store.select(min_ms_played=30_000)
+        filtered = list(streaming_history(data_dir, where=min_duration_filter(30_000)))
+        assert len(long_plays) == len(filtered) == 4
+        assert run_analyses(long_plays) == run_analyses(filtered)
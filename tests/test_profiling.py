@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+from spotify_gdpr_analysis.profiling import Profiler
+from spotify_gdpr_analysis.visualize import render_html_report
+
+
+def _record(ts: str, artist: str) -> dict:
+    return {
+        "ts": ts,
+        "ms_played": 1000,
+        "master_metadata_track_name": "Track",
+        "master_metadata_album_artist_name": artist,
+        "master_metadata_album_album_name": "Album",
+        "spotify_track_uri": "spotify:track:1",
+    }
+
+
+def test_render_html_report_reports_stages_to_collectors(tmp_path: Path) -> None:
+    records = [_record("2024-03-10T09:30:00Z", "A"), _record("2024-11-03T09:30:00Z", "B")]
+    seen = []
+    profiler = Profiler(collectors=[seen.append])
+
+    html = render_html_report(iter(records), profiler=profiler)
+
+    assert html == render_html_report(records)
+    names = [stage.name for stage in profiler.stages]
+    assert seen == profiler.stages
+    assert names[:2] == ["decode", "local_time"]
+    assert "analysis monthly_new_artists" in names
+    assert "render Top songs" in names and names[-1] == "render Average minutes by hour"
+    decode = profiler.stages[0]
+    assert decode.records == 2 and decode.peak_memory_bytes is not None
+
+    written = json.loads(profiler.write_json(tmp_path / "profile.json").read_text())
+    assert [stage["name"] for stage in written["stages"]] == names
+
+
+def test_nested_stages_fold_peak_memory_into_parent() -> None:
+    profiler = Profiler()
+    with profiler.stage("outer"):
+        with profiler.stage("inner"):
+            block = bytearray(4 << 20)
+            del block
+
+    inner, outer = profiler.stages
+    assert inner.peak_memory_bytes >= 4 << 20
+    assert outer.peak_memory_bytes >= inner.peak_memory_bytes
@@ -0,0 +1,102 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from spotify_gdpr_analysis.analysis import listening_sessions, run_analyses
+from spotify_gdpr_analysis.visualize import (
+    render_analyses_report,
+    stream_analyses_report,
+    write_analyses_report,
+)
+from spotify_gdpr_analysis.visualize.downsample import bucket_series
+from spotify_gdpr_analysis.visualize.report import _render_bar_chart
+
+
+def _records() -> list[dict]:
+    return [
+        {
+            "ts": f"2024-0{month}-0{day}T12:00:00Z",
+            "ms_played": 1000,
+            "master_metadata_track_name": f"Track {day}",
+            "master_metadata_album_artist_name": f"Artist {month}",
+            "master_metadata_album_album_name": "Album",
+            "spotify_track_uri": f"spotify:track:{day}",
+        }
+        for month in range(1, 4)
+        for day in range(1, 6)
+    ]
+
+
+class _RecordingSink(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.flushed_sizes = []
+
+    def flush(self) -> None:
+        self.flushed_sizes.append(self.tell())
+
+
+def test_stream_analyses_report_writes_sections_incrementally() -> None:
+    analyses = run_analyses(_records())
+    sink = _RecordingSink()
+
+    stream_analyses_report(analyses, sink, "Streamed")
+
+    assert sink.getvalue() == render_analyses_report(analyses, "Streamed")
+    assert sink.getvalue().startswith("<!doctype html>")
+    assert len(sink.flushed_sizes) > 10
+    assert sink.flushed_sizes == sorted(sink.flushed_sizes)
+
+
+def test_long_series_are_bucketed_to_a_bounded_bar_count() -> None:
+    values = [float(index % 7) for index in range(1000)]
+    values[500] = 99.0
+    labels = [f"{2000 + index // 12}-{index % 12 + 1:02d}" for index in range(1000)]
+
+    for method in ("max", "lttb"):
+        buckets = bucket_series(values, 50, method)
+        assert len(buckets) == 50
+        assert [bucket.start for bucket in buckets[1:]] == [bucket.end for bucket in buckets[:-1]]
+        assert max(bucket.value for bucket in buckets) == 99.0
+
+    svg = _render_bar_chart(labels, values, "Long", max_bars=40)
+    assert svg.count("<rect") == 40
+    assert "2000-01 – " in svg and "(25 values)" in svg
+    assert bucket_series(values[:10], 50) == [
+        (index, index + 1, value, value, value, value) for index, value in enumerate(values[:10])
+    ]
+
+
+def test_session_sections_render_only_when_computed() -> None:
+    analyses = run_analyses(_records())
+    assert "Listening sessions" not in render_analyses_report(analyses)
+
+    analyses.sessions = listening_sessions(_records())
+    html = render_analyses_report(analyses)
+
+    assert "<td>Sessions</td><td>15</td>" in html
+    assert "Sessions by start weekday" in html
+    assert "Skip density by session length" in html
+
+
+def test_playtime_sections_render_minutes() -> None:
+    html = render_analyses_report(run_analyses(_records()))
+
+    assert "<th>Minutes</th>" in html
+    assert "Top artists by listening time" in html
+    assert "Average minutes by hour" in html
+
+
+def test_failed_report_write_keeps_the_previous_report(tmp_path: Path) -> None:
+    output_path = tmp_path / "report.html"
+    analyses = run_analyses(_records())
+    write_analyses_report(analyses, output_path, "First")
+    previous = output_path.read_text(encoding="utf-8")
+
+    analyses.songs = [None]
+    with pytest.raises(TypeError):
+        write_analyses_report(analyses, output_path, "Second")
+
+    assert output_path.read_text(encoding="utf-8") == previous
+    assert [path.name for path in tmp_path.iterdir()] == ["report.html"]
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+
+from spotify_gdpr_analysis.analysis import run_analyses
+from spotify_gdpr_analysis.io import StreamingHistory
+from spotify_gdpr_analysis.visualize import (
+    LRUCache,
+    ReportQuery,
+    ReportServer,
+    render_analyses_report,
+)
+
+
+def _records() -> list[dict]:
+    return [
+        {
+            "ts": f"2023-{month:02d}-{day:02d}T{hour:02d}:30:00Z",
+            "ms_played": 60_000 * day,
+            "master_metadata_track_name": f"Track {day}",
+            "master_metadata_album_artist_name": f"Artist {month}",
+            "master_metadata_album_album_name": f"Album {month}",
+            "spotify_track_uri": f"spotify:track:{month}-{day}",
+        }
+        for month in (1, 2, 3)
+        for day in range(1, 1 + month * 2)
+        for hour in (6, 23)
+    ]
+
+
+async def _get(port: int, target: str) -> tuple[int, bytes]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), body
+
+
+def test_report_server_serves_cached_analyses_by_parameters() -> None:
+    records = _records()
+    server = ReportServer(StreamingHistory.from_records(records), "Test report")
+
+    async def exercise() -> list[tuple[int, bytes]]:
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            return [
+                await _get(port, target)
+                for target in (
+                    "/",
+                    "/api/artists?limit=2",
+                    "/api/artists?limit=2",
+                    "/api/hourly_averages?since=2023-02-01&until=2023-03-01&tz=UTC",
+                    "/sections/top-songs?limit=1",
+                    "/api/songs?limit=nope",
+                    "/api/nothing",
+                )
+            ]
+
+    try:
+        responses = asyncio.run(exercise())
+    finally:
+        server.close()
+
+    (page, artists, repeated, february, section, bad_limit, unknown) = responses
+    expected_page = render_analyses_report(run_analyses(records), "Test report")
+    assert page == (200, expected_page.encode("utf-8"))
+    assert artists == repeated
+    assert json.loads(artists[1])["result"] == [["Artist 3", 12], ["Artist 2", 8]]
+    assert server.analyses.hits >= 1
+
+    hourly = json.loads(february[1])["result"]
+    assert hourly[6] == hourly[23] == 1.0 and sum(hourly) == 2.0
+    assert section[0] == 200 and section[1].count(b"<tr>") == 2
+    assert bad_limit[0] == 400 and "limit" in json.loads(bad_limit[1])["error"]
+    assert unknown[0] == 404
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache = LRUCache(2)
+    for key in ("a", "b", "a", "c"):
+        cache.get_or_compute(key, key.upper)
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert (cache.hits, cache.misses, len(cache)) == (1, 3, 2)
+    with pytest.raises(ValueError):
+        ReportQuery.from_query_string("tz=Not/AZone")
@@ -1,6 +1,18 @@
+import json
+import os
+import pickle
+import zipfile
+from datetime import datetime, timezone
 from pathlib import Path
 
-from spotify_gdpr_analysis.io.streaming_history import streaming_history
+import pytest
+
+from spotify_gdpr_analysis.io import time_index
+from spotify_gdpr_analysis.io.streaming_history import (
+    iter_streaming_history_json,
+    streaming_history,
+    streaming_history_paths,
+)
 
 
 def _data_dir() -> Path:
@@ -87,3 +99,94 @@ def test_streaming_history_sample_record_schema() -> None:
     assert record["skipped"] is None or isinstance(record["skipped"], bool), (
         f"Unexpected type for skipped: {type(record['skipped']).__name__}"
     )
+
+
+def test_iter_streaming_history_json_matches_json_load(tmp_path: Path) -> None:
+    records = [
+        {"ts": "2024-01-01T00:00:00Z", "ms_played": index, "name": "Café ✓" * index}
+        for index in range(50)
+    ]
+    path = tmp_path / "Streaming_History_Audio_2024.json"
+    path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    for chunk_size in (1, 7, 4096):
+        assert list(iter_streaming_history_json(path, chunk_size)) == records
+
+
+def test_iter_streaming_history_json_reports_byte_offsets(tmp_path: Path) -> None:
+    path = tmp_path / "Streaming_History_Audio_2024.json"
+    path.write_text('[{"name": "é"}, 3]', encoding="utf-8")
+
+    with pytest.raises(ValueError, match="item 1 is int at byte 17"):
+        list(iter_streaming_history_json(path, chunk_size=4))
+
+    path.write_text('[{"name": "é"}, {"name": tru}]', encoding="utf-8")
+
+    with pytest.raises(ValueError, match="Invalid JSON .* at byte 26"):
+        list(iter_streaming_history_json(path, chunk_size=4))
+
+
+def test_streaming_history_filters_and_skips_indexed_blocks(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(time_index, "BLOCK_RECORDS", 3)
+    records = [
+        {"ts": f"2024-{month:02d}-15T12:00:00Z", "ms_played": month, "skipped": month % 2 == 0}
+        for month in range(1, 13)
+    ]
+    path = tmp_path / "Streaming_History_Audio_2024.json"
+    path.write_text(json.dumps(records, indent=2), encoding="utf-8")
+
+    window = dict(start="2024-04-01", end=datetime(2024, 7, 1, tzinfo=timezone.utc))
+    expected = records[3:6]
+    assert list(streaming_history(tmp_path, **window)) == expected
+    assert (tmp_path / time_index.INDEX_FILENAME).exists()
+
+    # Corrupt a record outside the window without invalidating the index entry.
+    stat = path.stat()
+    text = path.read_text(encoding="utf-8")
+    path.write_text(text.replace('"ms_played": 11', '"ms_played": !!'), encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert list(streaming_history(tmp_path, **window)) == expected
+    assert list(streaming_history(tmp_path, end="2024-03-01", where={"skipped": True})) == [
+        records[1]
+    ]
+    assert list(streaming_history(tmp_path, start="2025-01-01")) == []
+
+
+def test_streaming_history_reads_zip_archive_members(tmp_path: Path) -> None:
+    records = [{"ts": f"2024-01-0{day}T00:00:00Z", "ms_played": day} for day in range(1, 6)]
+    archive = tmp_path / "my_spotify_data.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as handle:
+        folder = "Spotify Extended Streaming History"
+        handle.writestr(f"{folder}/Streaming_History_Audio_2024_1.json", json.dumps(records[3:]))
+        handle.writestr(f"{folder}/Streaming_History_Audio_2024_0.json", json.dumps(records[:3]))
+        handle.writestr(f"{folder}/Streaming_History_Video_2024.json", json.dumps([{"ts": "x"}]))
+
+    paths = streaming_history_paths(archive)
+
+    assert [path.name for path in paths] == [
+        "Streaming_History_Audio_2024_0.json",
+        "Streaming_History_Audio_2024_1.json",
+    ]
+    assert pickle.loads(pickle.dumps(paths[0])) == paths[0]
+    assert list(streaming_history(archive)) == records
+    assert list(streaming_history(archive, start="2024-01-03")) == records[2:]
+    assert not list(tmp_path.rglob("Streaming_History_*"))
+
+
+def test_streaming_history_projects_records_to_requested_fields(tmp_path: Path) -> None:
+    records = [
+        {"ts": "2024-01-01T00:00:00Z", "ip_addr": "10.0.0.1", "skipped": True, "ms_played": 5},
+        {"ts": "2024-02-01T00:00:00Z", "ip_addr": None, "skipped": False},
+    ]
+    (tmp_path / "Streaming_History_Audio_2024.json").write_text(json.dumps(records))
+
+    assert list(streaming_history(tmp_path, fields=("ts", "ms_played"))) == [
+        {"ts": "2024-01-01T00:00:00Z", "ms_played": 5},
+        {"ts": "2024-02-01T00:00:00Z"},
+    ]
+    assert list(streaming_history(tmp_path, where={"skipped": True}, fields=("ts",))) == [
+        {"ts": "2024-01-01T00:00:00Z"}
+    ]